@@ -0,0 +1,504 @@
+"""
+Reproducción sin conexión del SIGA y benchmark de Piedmont.
+
+Trabaja sobre una grabación hecha con `piedmont-webscraper.py --grabar DIR`
+(listado + HTML de cada horario) y permite:
+
+  - servir:    levantar un servidor HTTP local que imita el SIGA (login, menú,
+               frames del listado y popups de horario) con latencia configurable.
+  - benchmark: medir scrapingSIGA, extraerHorario, guardarJSON e
+               insertarJsonHaciaBDD contra ese servidor y una BDD local
+               (SQLite por defecto, o MySQL/MariaDB con --mysql), reportando
+               tiempos por fase y filas por segundo.
+
+Así las regresiones y optimizaciones se pueden medir sin credenciales ni acceso
+al SIGA real.
+
+@author frostodev
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+import importlib.util
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, parse_qsl
+
+from lxml import html as lxmlHtml
+
+############################################################################
+#                           GRABACIONES                                    #
+
+def cargarPiedmont():
+    """Carga piedmont-webscraper.py como módulo (su nombre no es importable directamente)."""
+    ruta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "piedmont-webscraper.py")
+    spec = importlib.util.spec_from_file_location("piedmont", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    modulo.activarColores()
+    return modulo
+
+def clavePeticion(campos):
+    """Clave de un envío de formulario, independiente del orden de los campos."""
+    return tuple(sorted((nombre, valor) for nombre, valor in campos))
+
+def cargarGrabacion(directorio):
+    """
+    Lee una grabación: objetivo.json, listado.html y horario-N.html.
+    Retorna un diccionario con el objetivo, el HTML del listado, los horarios por
+    N y el mapa {campos del formN: N} para reconocer los envíos de formularios.
+    """
+    with open(os.path.join(directorio, "objetivo.json"), "r", encoding="utf-8") as f:
+        objetivo = json.load(f)
+    with open(os.path.join(directorio, "listado.html"), "r", encoding="utf-8") as f:
+        listado = f.read()
+
+    horarios = {}
+    for nombre in os.listdir(directorio):
+        coincidencia = re.fullmatch(r"horario-(\d+)\.html", nombre)
+        if coincidencia:
+            with open(os.path.join(directorio, nombre), "r", encoding="utf-8") as f:
+                horarios[int(coincidencia.group(1))] = f.read()
+
+    formularios = {}
+    for formulario in lxmlHtml.fromstring(listado).xpath("//form[@name]"):
+        coincidencia = re.fullmatch(r"form(\d+)", formulario.get("name"))
+        if coincidencia:
+            campos = [(campo.get("name"), campo.get("value") or "") for campo in formulario.xpath(".//input[@name]")]
+            formularios[clavePeticion(campos)] = int(coincidencia.group(1))
+
+    return {"objetivo": objetivo, "listado": listado, "horarios": horarios, "formularios": formularios}
+
+
+############################################################################
+#                        SERVIDOR DE REPRODUCCIÓN                          #
+
+# Respaldo por si la función Envia del SIGA venía en un .js que no se grabó
+scriptEnvia = '<script>window.Envia = window.Envia || function (f) { f.target = "_blank"; f.submit(); };</script>'
+
+class ManejadorSIGA(BaseHTTPRequestHandler):
+    """
+    Imita las páginas del SIGA que recorre `abrirListadoSIGA` y sirve el listado y
+    los horarios grabados. Los envíos de `formN` se reconocen por sus campos.
+    """
+    grabacion = None
+    latencia = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def responder(self, cuerpo, estado=200, encabezados=()):
+        if self.latencia:
+            time.sleep(self.latencia)
+        datos = cuerpo.encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        for nombre, valor in encabezados:
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def redirigir(self, destino, encabezados=()):
+        self.send_response(302)
+        self.send_header("Location", destino)
+        self.send_header("Content-Length", "0")
+        for nombre, valor in encabezados:
+            self.send_header(nombre, valor)
+        self.end_headers()
+
+    def base(self):
+        return f"http://{self.headers['Host']}"
+
+    def localizar(self, htmlTexto):
+        """Apunta al servidor local las URLs absolutas del SIGA y agrega `Envia` si falta."""
+        htmlTexto = htmlTexto.replace("https://siga.usm.cl", self.base())
+        if "</body>" in htmlTexto:
+            return htmlTexto.replace("</body>", scriptEnvia + "</body>", 1)
+        return htmlTexto + scriptEnvia
+
+    def framesetHorario(self, n):
+        return f'<html><frameset rows="0,*"><frame name="encabezado" src="about:blank"><frame name="cuerpo" src="/replay/horario?n={n}"></frameset></html>'
+
+    def opciones(self, nombre, valor):
+        return f'<select name="{nombre}"><option value="">--</option><option value="{valor}">{valor}</option></select>'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = parse_qs(url.query)
+        objetivo = self.grabacion["objetivo"]
+
+        if url.path == "/pag/home.jsp":
+            self.responder(
+                '<html><body><form><input name="login"><input name="passwd" type="password"></form>'
+                '<a href="/pag/ValidaLogin.jsp">Ingresar</a></body></html>'
+            )
+        elif url.path == "/pag/ValidaLogin.jsp":
+            self.redirigir("/pag/menu.jsp", [("Set-Cookie", "JSESSIONID=replay; Path=/")])
+        elif url.path == "/pag/menu.jsp":
+            if "JSESSIONID=replay" not in (self.headers.get("Cookie") or ""):
+                self.redirigir("/pag/home.jsp")
+                return
+            self.responder('<html><body><a href="/pag/insc_procesos.jsp">Horario Asignaturas</a></body></html>')
+        elif url.path == "/pag/insc_procesos.jsp":
+            self.responder(
+                '<html><frameset rows="20%,20%,*"><frame name="frame1" src="/replay/frame1">'
+                '<frame name="frame5" src="/replay/frame5"><frame name="frame3" src="/replay/vacio"></frameset></html>'
+            )
+        elif url.path == "/replay/frame1":
+            self.responder(
+                "<html><body><form>" + self.opciones("periodo", objetivo["periodo"]) +
+                self.opciones("jornada", objetivo["jornada"]) + self.opciones("sede", objetivo["campus"]) +
+                "</form></body></html>"
+            )
+        elif url.path == "/replay/frame5":
+            self.responder(
+                '<html><body><form name="form_f1" method="post" action="/replay/listado" target="frame3">' +
+                self.opciones("op", "1") + self.opciones("op_asig", "1") + "</form></body></html>"
+            )
+        elif url.path == "/replay/vacio":
+            self.responder("<html><body></body></html>")
+        elif url.path == "/replay/listado":
+            self.responder(self.localizar(self.grabacion["listado"]))
+        elif url.path == "/replay/popup":
+            self.responder(self.framesetHorario(int(parametros["n"][0])))
+        elif url.path == "/replay/horario":
+            n = int(parametros["n"][0])
+            if n in self.grabacion["horarios"]:
+                self.responder(self.grabacion["horarios"][n])
+            else:
+                self.responder("<html><body>Sin grabación</body></html>", 404)
+        else:
+            self.responder("<html><body>No encontrado</body></html>", 404)
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        campos = parse_qsl(self.rfile.read(largo).decode("latin-1"), keep_blank_values=True)
+
+        if urlparse(self.path).path == "/replay/listado":
+            self.responder(self.localizar(self.grabacion["listado"]))
+            return
+
+        # Envío de un formN (popup de horario o descarga directa)
+        n = self.grabacion["formularios"].get(clavePeticion(campos))
+        if n is None or n not in self.grabacion["horarios"]:
+            self.responder("<html><body>Formulario no grabado</body></html>", 404)
+            return
+        self.responder(self.framesetHorario(n))
+
+def iniciarServidor(grabacion, puerto=0, latencia=0.0):
+    """Inicia el servidor de reproducción en un hilo. Retorna (servidor, urlBase)."""
+    manejador = type("ManejadorGrabacion", (ManejadorSIGA,), {"grabacion": grabacion, "latencia": latencia})
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+############################################################################
+#                         BDD SQLITE DE PRUEBA                             #
+
+esquemaSQLite = """
+CREATE TABLE campus (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL);
+CREATE TABLE semestre (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campus_id INTEGER NOT NULL REFERENCES campus(id) ON DELETE CASCADE,
+    codigo TEXT NOT NULL,
+    UNIQUE (campus_id, codigo)
+);
+CREATE TABLE asignatura (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    semestre_id INTEGER NOT NULL REFERENCES semestre(id) ON DELETE CASCADE,
+    codigo TEXT NOT NULL, nombre TEXT NOT NULL, departamento TEXT NOT NULL,
+    UNIQUE (semestre_id, codigo)
+);
+CREATE TABLE paralelo (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asignatura_id INTEGER NOT NULL REFERENCES asignatura(id) ON DELETE CASCADE,
+    paralelo TEXT NOT NULL, cupos INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (asignatura_id, paralelo)
+);
+CREATE TABLE profesor (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL UNIQUE);
+CREATE TABLE paralelo_profesor (
+    paralelo_id INTEGER NOT NULL REFERENCES paralelo(id) ON DELETE CASCADE,
+    profesor_id INTEGER NOT NULL REFERENCES profesor(id) ON DELETE CASCADE,
+    PRIMARY KEY (paralelo_id, profesor_id)
+);
+CREATE TABLE horario (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    paralelo_id INTEGER NOT NULL REFERENCES paralelo(id) ON DELETE CASCADE,
+    dia_semana INTEGER NOT NULL, bloque_inicio INTEGER NOT NULL, sala TEXT NOT NULL
+);
+CREATE TABLE ocupacion_sala (
+    semestre_id INTEGER NOT NULL REFERENCES semestre(id) ON DELETE CASCADE,
+    sala TEXT NOT NULL, ocupacion BLOB NOT NULL,
+    PRIMARY KEY (semestre_id, sala)
+);
+CREATE TABLE estadisticas_semestre (
+    semestre_id INTEGER PRIMARY KEY REFERENCES semestre(id) ON DELETE CASCADE,
+    datos TEXT NOT NULL, generado TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE indice_busqueda (
+    semestre_id INTEGER NOT NULL REFERENCES semestre(id) ON DELETE CASCADE,
+    termino TEXT NOT NULL,
+    asignatura_id INTEGER NOT NULL REFERENCES asignatura(id) ON DELETE CASCADE,
+    PRIMARY KEY (semestre_id, termino, asignatura_id)
+);
+CREATE INDEX idx_paralelo_dia_bloque ON horario (paralelo_id, dia_semana, bloque_inicio);
+"""
+
+def traducirSQL(sql):
+    """Traduce el dialecto MySQL que usa Piedmont al de SQLite."""
+    sql = sql.replace("%s", "?").replace(" FOR UPDATE", "")
+    sql = sql.replace("INSERT IGNORE", "INSERT OR IGNORE")
+    duplicado = re.search(r"ON DUPLICATE KEY UPDATE(.*)$", sql, re.S)
+    if duplicado:
+        asignaciones = re.sub(r"VALUES\((\w+)\)", r"excluded.\1", duplicado.group(1))
+        sql = sql[:duplicado.start()] + "ON CONFLICT DO UPDATE SET" + asignaciones
+    return sql
+
+class CursorSQLite:
+    """Cursor con la interfaz de mysql.connector que usa Piedmont, sobre SQLite."""
+    def __init__(self, conexion):
+        self.cursor = conexion.cursor()
+
+    def execute(self, sql, parametros=()):
+        self.cursor.execute(traducirSQL(sql), parametros)
+
+    def executemany(self, sql, filas):
+        self.cursor.executemany(traducirSQL(sql), filas)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def close(self):
+        self.cursor.close()
+
+class ConexionSQLite:
+    """Conexión SQLite en memoria con el esquema de Sedona, en reemplazo de MySQL."""
+    def __init__(self):
+        self.conexion = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conexion.execute("PRAGMA foreign_keys = ON")
+        self.conexion.executescript(esquemaSQLite)
+
+    def cursor(self):
+        return CursorSQLite(self.conexion)
+
+    def commit(self):
+        self.conexion.commit()
+
+    def rollback(self):
+        self.conexion.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.conexion.close()
+
+
+############################################################################
+#                              BENCHMARK                                   #
+
+def medir(resultados, fase, funcion, filas=0):
+    """Ejecuta `funcion`, guarda su duración y filas/s en `resultados` y retorna su valor."""
+    inicio = time.perf_counter()
+    valor = funcion()
+    duracion = time.perf_counter() - inicio
+    resultados[fase] = {
+        "segundos": round(duracion, 4),
+        "filas": filas,
+        "filas_por_segundo": round(filas / duracion, 1) if filas and duracion else None,
+    }
+    return valor
+
+def construirDatosSinNavegador(pm, objetivo, grabacion):
+    """
+    Arma `objetivo.baseDatos` directamente desde el HTML grabado, con el mismo
+    `procesarFila` del scraper. Se usa cuando no hay navegador disponible.
+    """
+    filasDatos = pm.parsearListado(grabacion["listado"])
+    contexto = None
+    for contadorGlobal, fila in enumerate(filasDatos):
+        horario = grabacion["horarios"].get(contadorGlobal)
+        precargado = pm.parsearDetalleHorario(horario) if horario else (None, [])
+        if fila is None or precargado[0] is None:
+            contexto = None
+            continue
+
+        if contexto is None:
+            contexto = pm.contextoPrevio(filasDatos, contadorGlobal)
+        exito, resultado = pm.procesarFila(None, fila, contadorGlobal, contexto, precargado)
+        if exito and resultado:
+            pm.aplicarRegistro(objetivo, {
+                "contador": contadorGlobal,
+                "campus": objetivo.nombreCampus,
+                "periodo": objetivo.periodo,
+                "sigla": resultado[0],
+                "paralelo": resultado[1],
+            })
+
+def escalarDatos(datos, escala, nombreCampus):
+    """Replica las asignaturas `escala` veces (con siglas distintas) bajo un campus de prueba."""
+    escalados = {}
+    for periodos in datos.values():
+        for periodo, asignaturas in periodos.items():
+            destino = escalados.setdefault(nombreCampus, {}).setdefault(periodo, {})
+            for copia in range(escala):
+                for sigla, paralelos in asignaturas.items():
+                    destino[sigla if copia == 0 else f"{sigla}~{copia}"] = paralelos
+    return escalados
+
+def contarParalelos(datos):
+    return sum(len(paralelos) for periodos in datos.values() for asignaturas in periodos.values() for paralelos in asignaturas.values())
+
+def benchmark(args):
+    pm = cargarPiedmont()
+    pm.fechaActual = "benchmark"
+    pm.nivelLog = "debug" if args.detalle else "advertencia" # Sin el detalle por fila, que pesa en los tiempos
+    pm.usarCacheHorarios = False
+    pm.directorioGrabacion = None
+    pm.usuarioSIGA = pm.passwordSIGA = "replay"
+
+    grabacion = cargarGrabacion(args.grabacion)
+    servidor, urlBase = iniciarServidor(grabacion, latencia=args.latencia / 1000)
+    pm.urlSIGA = urlBase
+
+    # Checkpoints, snapshot y caché del benchmark quedan en un directorio temporal
+    directorioOriginal = os.getcwd()
+    temporal = tempfile.mkdtemp(prefix="piedmont-benchmark-")
+    os.chdir(temporal)
+
+    info = grabacion["objetivo"]
+    objetivo = pm.Objetivo(info["campus"], info["jornada"], info["periodo"])
+    objetivo.archivoJSON = os.path.join(temporal, "bdd_general-benchmark.json")
+    resultados = {}
+
+    try:
+        filasDatos = medir(resultados, "parsearListado", lambda: pm.parsearListado(grabacion["listado"]))
+        resultados["parsearListado"]["filas"] = len(filasDatos)
+
+        horarios = list(grabacion["horarios"].values())
+        medir(resultados, "extraerHorario (parseo)", lambda: [pm.parsearDetalleHorario(h) for h in horarios], len(horarios))
+
+        if not args.sin_navegador:
+            try:
+                pm.configurarNavegador()
+                if not medir(resultados, "scrapingSIGA", lambda: pm.scrapingSIGA(objetivo)):
+                    del resultados["scrapingSIGA"]
+                    raise RuntimeError("scrapingSIGA no terminó (¿Chrome/chromedriver instalados?)")
+                resultado = resultados["scrapingSIGA"]
+                resultado["filas"] = len(objetivo.completados)
+                resultado["filas_por_segundo"] = round(resultado["filas"] / resultado["segundos"], 1) if resultado["segundos"] else None
+
+                # Popup completo con Selenium: frameset -> frame "cuerpo" -> parseo
+                muestra = sorted(grabacion["horarios"])[:args.muestra_popups]
+                driver = pm.iniciarNavegador()
+                try:
+                    def popups():
+                        for n in muestra:
+                            driver.get(f"{urlBase}/replay/popup?n={n}")
+                            pm.extraerHorario(driver)
+                    medir(resultados, "extraerHorario (navegador)", popups, len(muestra))
+                finally:
+                    driver.quit()
+            except Exception as e:
+                print(f"Fases con navegador omitidas: {e}")
+                objetivo.baseDatos = None
+
+        if not objetivo.baseDatos:
+            construirDatosSinNavegador(pm, objetivo, grabacion)
+
+        objetivo.baseDatos = escalarDatos(objetivo.baseDatos or {}, args.escala, objetivo.nombreCampus)
+        paralelos = contarParalelos(objetivo.baseDatos)
+
+        medir(resultados, "guardarJSON", lambda: pm.guardarJSON(objetivo), paralelos)
+        resultados["guardarJSON"]["bytes"] = os.path.getsize(objetivo.archivoJSON)
+
+        # Importación bajo un campus propio del benchmark, en una transacción que se descarta
+        datos = escalarDatos(objetivo.baseDatos, 1, "Piedmont Benchmark")
+        if args.mysql:
+            pm.config = pm.cargarConfigBDD()
+            if not pm.config:
+                sys.exit(1)
+            conexion = pm.mysql.connector.connect(**pm.config)
+        else:
+            conexion = ConexionSQLite()
+        cursor = conexion.cursor()
+        try:
+            medir(resultados, "insertarJsonHaciaBDD", lambda: pm.insertarJsonHaciaBDD(cursor, datos), paralelos)
+        finally:
+            conexion.rollback()
+            cursor.close()
+            conexion.close()
+
+    finally:
+        os.chdir(directorioOriginal)
+        shutil.rmtree(temporal, ignore_errors=True)
+        servidor.shutdown()
+
+    # Reporte
+    print(f"\nBenchmark de {objetivo} (latencia {args.latencia} ms, escala x{args.escala}, BDD {'MySQL' if args.mysql else 'SQLite'})")
+    print(f"{'Fase':<28}{'Segundos':>12}{'Filas':>10}{'Filas/s':>12}")
+    for fase, resultado in resultados.items():
+        filasPorSegundo = resultado["filas_por_segundo"] if resultado["filas_por_segundo"] is not None else "-"
+        print(f"{fase:<28}{resultado['segundos']:>12.4f}{resultado['filas']:>10}{filasPorSegundo:>12}")
+
+    if args.reporte:
+        with open(args.reporte, "w", encoding="utf-8") as f:
+            json.dump({"objetivo": info, "latencia_ms": args.latencia, "escala": args.escala, "fases": resultados}, f, indent=4, ensure_ascii=False)
+        print(f"Reporte guardado en {args.reporte}")
+
+def servir(args):
+    grabacion = cargarGrabacion(args.grabacion)
+    servidor, urlBase = iniciarServidor(grabacion, args.puerto, args.latencia / 1000)
+    print(f"SIGA grabado ({len(grabacion['horarios'])} horarios) disponible en {urlBase}/pag/home.jsp")
+    print("Ctrl+C para detener.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+#####################################################################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Piedmont Replay: SIGA grabado sin conexión y benchmark del scraper.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    parserServir = subcomandos.add_parser("servir", help="Servir una grabación como si fuera el SIGA.")
+    parserServir.add_argument("grabacion", help="Directorio creado con piedmont-webscraper.py --grabar")
+    parserServir.add_argument("--puerto", type=int, default=8088)
+    parserServir.add_argument("--latencia", type=float, default=0, metavar="MS", help="Latencia agregada a cada respuesta.")
+    parserServir.set_defaults(funcion=servir)
+
+    parserBenchmark = subcomandos.add_parser("benchmark", help="Medir las fases del scraper contra una grabación.")
+    parserBenchmark.add_argument("grabacion", help="Directorio creado con piedmont-webscraper.py --grabar")
+    parserBenchmark.add_argument("--latencia", type=float, default=0, metavar="MS", help="Latencia agregada a cada respuesta.")
+    parserBenchmark.add_argument("--mysql", action="store_true", help="Importar contra la BDD de sedona_config (en una transacción que se descarta) en vez de SQLite.")
+    parserBenchmark.add_argument("--sin-navegador", action="store_true", help="Omitir las fases que requieren Chrome.")
+    parserBenchmark.add_argument("--escala", type=int, default=1, help="Replicar los datos N veces para guardarJSON e insertarJsonHaciaBDD.")
+    parserBenchmark.add_argument("--muestra-popups", type=int, default=50, help="Popups a abrir en la fase extraerHorario (navegador).")
+    parserBenchmark.add_argument("--reporte", metavar="ARCHIVO", help="Guardar los resultados como JSON.")
+    parserBenchmark.add_argument("--detalle", action="store_true", help="Mostrar el log por fila del scraper.")
+    parserBenchmark.set_defaults(funcion=benchmark)
+
+    args = parser.parse_args()
+    args.funcion(args)
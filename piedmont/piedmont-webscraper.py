@@ -12,28 +12,510 @@ Los datos extraídos son normalizados y almacenados en una base de datos MySQL.
 import os
 import re
 import json
+import argparse
+import gzip
+import queue
+import atexit
+import logging
 import math
 import time
+import random
 import sys
 import shutil
+import threading
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import urljoin
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
+import orjson
 
 import mysql.connector
 from mysql.connector import Error
-from colorama import Fore, Style, init
+
+try:
+    import brotli # Opcional: sin él la API estática sólo se precomprime con gzip
+except ImportError:
+    brotli = None
+
+# Selenium y colorama se cargan al preparar el scraping (ver `cargarSelenium` y
+# `activarColores`), así la importación de snapshots (--importar) no depende de ellos.
+
+
+############################################################################
+#                            MODELO DE DATOS                               #
+
+def internarTexto(texto):
+    """Una sola copia en memoria de cada texto repetido (salas, profesores, nombres)."""
+    return sys.intern(texto) if type(texto) is str else texto
+
+class Paralelo:
+    """
+    Paralelo de `baseDatos` en forma compacta: atributos fijos (__slots__), los
+    textos internados y el horario disperso, como una tupla de bloques
+    (dia, bloque, sala) con índices desde 1 y la sala ya normalizada, en vez de
+    la matriz de 10 x 7 del SIGA, que casi siempre está vacía.
+    
+    En los snapshots y el diario se guarda como una lista
+    [nombre, departamento, paralelo, profesores, cupos, bloques] (ver `aJSON`);
+    `desdeJSON` también acepta el diccionario con "Horario" de los archivos antiguos.
+    """
+    __slots__ = ("nombre", "departamento", "paralelo", "profesores", "cupos", "bloques")
+    
+    def __init__(self, nombre, departamento, paralelo, profesores, cupos, bloques):
+        self.nombre = internarTexto(nombre)
+        self.departamento = internarTexto(departamento)
+        self.paralelo = internarTexto(paralelo)
+        self.profesores = tuple(map(internarTexto, profesores))
+        self.cupos = cupos
+        self.bloques = tuple((dia, bloque, internarTexto(sala)) for dia, bloque, sala in bloques)
+    
+    @classmethod
+    def desdeHorario(cls, nombre, departamento, paralelo, profesores, cupos, horario):
+        """Crea el paralelo a partir de la matriz de horario [bloque][dia] del SIGA."""
+        bloques = []
+        for bloque_idx, dias in enumerate(horario):
+            for dia_idx, sala in enumerate(dias):
+                sala_norm = normalizarSala(sala) if sala else ""
+                if sala_norm:
+                    bloques.append((dia_idx + 1, bloque_idx + 1, sala_norm))
+        return cls(nombre, departamento, paralelo, profesores, cupos, bloques)
+    
+    @classmethod
+    def desdeJSON(cls, datos):
+        """Lee un paralelo de un snapshot o diario, en formato compacto o antiguo."""
+        if isinstance(datos, cls):
+            return datos
+        if isinstance(datos, list) and len(datos) == 6:
+            return cls(*datos[:5], datos[5])
+        if isinstance(datos, dict) and "Horario" in datos:
+            return cls.desdeHorario(
+                datos["Nombre"], datos["Departamento"], datos["Paralelo"],
+                datos["Profesores"], datos["Cupos"], datos["Horario"]
+            )
+        raise ValueError(f"Paralelo con formato desconocido: {str(datos)[:80]}")
+    
+    def aJSON(self):
+        return [self.nombre, self.departamento, self.paralelo, self.profesores, self.cupos, self.bloques]
+    
+    def horario(self):
+        """Matriz [bloque][dia] equivalente, para la caché de horarios."""
+        matriz = [["" for _ in range(7)] for _ in range(bloquesPorDia)]
+        for dia, bloque, sala in self.bloques:
+            matriz[bloque - 1][dia - 1] = sala
+        return matriz
+    
+    def __eq__(self, otro):
+        return isinstance(otro, Paralelo) and self.aJSON() == otro.aJSON()
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"Paralelo({self.nombre!r}, P{self.paralelo}, {len(self.bloques)} bloques)"
+
+def serializarDatos(datos):
+    """`baseDatos` (o un registro del diario) como JSON compacto en bytes."""
+    return orjson.dumps(datos, default=Paralelo.aJSON)
+
+def convertirDatos(datos):
+    """
+    Convierte en el lugar los paralelos de una estructura {campus: {periodo:
+    {sigla: [paralelos]}}} leída de un snapshot, sea compacto o antiguo.
+    """
+    for periodos in datos.values():
+        for asignaturas in periodos.values():
+            for sigla, paralelos in asignaturas.items():
+                asignaturas[sigla] = [Paralelo.desdeJSON(paralelo) for paralelo in paralelos]
+    return datos
 
 
 ############################################################################
 #                             MANEJO DE BDD                                #
 
+def normalizarSala(sala):
+    """Limpia el nombre de una sala tal como viene en la matriz de horario."""
+    sala = sala.strip()
+    if sala.startswith("Sala "):
+        sala = sala[5:]
+    return sala
+
+def normalizarProfesor(nombre):
+    """Limpia el nombre de un profesor tal como viene del popup de horario."""
+    return nombre.replace(" null", "").strip()
+
+def plegarTexto(texto):
+    """
+    Forma de comparación de un texto sin tildes ni mayúsculas, como la collation
+    utf8mb4_unicode_ci de la BDD (dos textos con la misma forma chocan en un UNIQUE).
+    """
+    descompuesto = unicodedata.normalize("NFD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+def ejecutarEnLotes(cursor, sql, filas):
+    """
+    Ejecuta una sentencia INSERT para todas las filas usando `executemany`.
+    
+    mysql.connector reescribe `executemany` de un INSERT ... VALUES como un único
+    INSERT multi-fila, por lo que cada lote de `tamanoLoteBDD` filas es un solo
+    viaje a la BDD en vez de uno por fila.
+    """
+    for i in range(0, len(filas), tamanoLoteBDD):
+        cursor.executemany(sql, filas[i:i + tamanoLoteBDD])
+    return len(filas)
+
+def consultarEnLotes(cursor, sql, valores, parametros=()):
+    """
+    Ejecuta un SELECT con cláusula IN sobre `valores`, partiéndolo en lotes.
+    El SQL debe contener un `{}` donde irán los placeholders del IN; `parametros`
+    se anteponen a los valores de cada lote.
+    """
+    valores = list(valores)
+    resultado = []
+    for i in range(0, len(valores), tamanoLoteBDD):
+        lote = valores[i:i + tamanoLoteBDD]
+        cursor.execute(sql.format(", ".join(["%s"] * len(lote))), tuple(parametros) + tuple(lote))
+        resultado.extend(cursor.fetchall())
+    return resultado
+
+def asegurarProfesores(cursor, nombres, cache_profesores):
+    """
+    Registra en bloque los profesores de `nombres` que aún no están en la caché
+    {nombre: id} y la actualiza con sus IDs. Retorna la cantidad de profesores nuevos.
+    """
+    profesores_nuevos = []
+    for profesor_nombre in nombres:
+        profesor_nombre = normalizarProfesor(profesor_nombre)
+        if profesor_nombre and profesor_nombre not in cache_profesores and profesor_nombre not in profesores_nuevos:
+            profesores_nuevos.append(profesor_nombre)
+
+    if not profesores_nuevos:
+        return 0
+
+    ejecutarEnLotes(
+        cursor,
+        "INSERT IGNORE INTO profesor (nombre) VALUES (%s)",
+        [(nombre,) for nombre in profesores_nuevos]
+    )
+    filas = consultarEnLotes(cursor, "SELECT nombre, id FROM profesor WHERE nombre IN ({})", profesores_nuevos)
+    cache_profesores.update({row[0]: row[1] for row in filas})
+    
+    # La collation de la BDD no distingue tildes ni mayúsculas, así que un nombre
+    # puede haber coincidido con otro ya existente escrito distinto.
+    for profesor_nombre in profesores_nuevos:
+        if profesor_nombre not in cache_profesores:
+            cursor.execute("SELECT id FROM profesor WHERE nombre = %s", (profesor_nombre,))
+            fila = cursor.fetchone()
+            if fila:
+                cache_profesores[profesor_nombre] = fila[0]
+    
+    for profesor_nombre in profesores_nuevos:
+        printInfo(f"    + Nuevo Profesor registrado: {profesor_nombre}", color="info", caja=False, nivel="debug")
+    
+    return len(profesores_nuevos)
+
+def insertarLoteParalelos(cursor, semestre_id, lote, cache_profesores, cache_asignaturas=None, ocupacion=None):
+    """
+    Inserta un lote de paralelos [(codigo_asignatura, paralelo_data), ...] de un semestre.
+    
+    Las filas se agrupan por tabla y se envían con `ejecutarEnLotes`, y los IDs
+    generados (asignaturas, profesores, paralelos) se resuelven con un SELECT por
+    lote en vez de un LAST_INSERT_ID por fila. El número de viajes a la BDD depende
+    de la cantidad de lotes, no de la cantidad de filas.
+    
+    Si se entrega `ocupacion` ({sala: bitmap}), se le suman los bloques de
+    horario del lote (ver `marcarOcupacion`) para guardarla al final del semestre.
+    
+    Retorna un diccionario con la cantidad de filas enviadas por tabla; el tiempo
+    de cada tabla queda en la métrica `piedmont_bdd_insercion_segundos`.
+    """
+    conteo = {"asignatura": 0, "profesor": 0, "paralelo": 0, "paralelo_profesor": 0, "horario": 0}
+    if not lote:
+        return conteo
+
+    # Asignaturas nuevas (los datos generales se toman del primer paralelo visto)
+    if cache_asignaturas is None:
+        cursor.execute("SELECT codigo, id FROM asignatura WHERE semestre_id = %s", (semestre_id,))
+        cache_asignaturas = {row[0]: row[1] for row in cursor.fetchall()}
+
+    asignaturas_nuevas = {}
+    for codigo_asig, paralelo_data in lote:
+        if codigo_asig not in cache_asignaturas and codigo_asig not in asignaturas_nuevas:
+            asignaturas_nuevas[codigo_asig] = (semestre_id, codigo_asig, paralelo_data.nombre, paralelo_data.departamento)
+
+    if asignaturas_nuevas:
+        with medirFase("piedmont_bdd_insercion_segundos", tabla="asignatura"):
+            conteo["asignatura"] = ejecutarEnLotes(
+                cursor,
+                "INSERT INTO asignatura (semestre_id, codigo, nombre, departamento) VALUES (%s, %s, %s, %s)",
+                list(asignaturas_nuevas.values())
+            )
+            filas = consultarEnLotes(
+                cursor,
+                "SELECT codigo, id FROM asignatura WHERE semestre_id = %s AND codigo IN ({})",
+                asignaturas_nuevas.keys(),
+                (semestre_id,)
+            )
+            cache_asignaturas.update({row[0]: row[1] for row in filas})
+
+    # Profesores nuevos
+    with medirFase("piedmont_bdd_insercion_segundos", tabla="profesor"):
+        conteo["profesor"] = asegurarProfesores(
+            cursor,
+            [nombre for _, paralelo_data in lote for nombre in paralelo_data.profesores],
+            cache_profesores
+        )
+
+    # Paralelos
+    filas_paralelo = [
+        (cache_asignaturas[codigo_asig], paralelo_data.paralelo, paralelo_data.cupos)
+        for codigo_asig, paralelo_data in lote
+    ]
+    with medirFase("piedmont_bdd_insercion_segundos", tabla="paralelo"):
+        conteo["paralelo"] = ejecutarEnLotes(
+            cursor,
+            """
+            INSERT INTO paralelo (asignatura_id, paralelo, cupos)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE cupos = VALUES(cupos)
+            """,
+            filas_paralelo
+        )
+        
+        # Resolución de IDs de paralelo en bloque, acotada a las asignaturas del lote
+        filas = consultarEnLotes(
+            cursor,
+            "SELECT asignatura_id, paralelo, id FROM paralelo WHERE asignatura_id IN ({})",
+            {fila[0] for fila in filas_paralelo}
+        )
+        cache_paralelos = {(row[0], row[1]): row[2] for row in filas}
+
+    # Relaciones profesor y bloques de horario
+    filas_paralelo_profesor = []
+    filas_horario = []
+    for (asignatura_id, paralelo, _), (codigo_asig, paralelo_data) in zip(filas_paralelo, lote):
+        paralelo_id = cache_paralelos.get((asignatura_id, paralelo))
+        if paralelo_id is None:
+            printInfo(f"No se pudo resolver el ID de {codigo_asig} - P{paralelo}", color="error")
+            continue
+
+        for profesor_nombre in paralelo_data.profesores:
+            profesor_id = cache_profesores.get(normalizarProfesor(profesor_nombre))
+            if profesor_id is not None:
+                filas_paralelo_profesor.append((paralelo_id, profesor_id))
+
+        for dia, bloque, sala in paralelo_data.bloques:
+            filas_horario.append((paralelo_id, dia, bloque, sala))
+            if ocupacion is not None:
+                marcarOcupacion(ocupacion, sala, dia, bloque)
+
+    with medirFase("piedmont_bdd_insercion_segundos", tabla="paralelo_profesor"):
+        conteo["paralelo_profesor"] = ejecutarEnLotes(
+            cursor,
+            "INSERT IGNORE INTO paralelo_profesor (paralelo_id, profesor_id) VALUES (%s, %s)",
+            filas_paralelo_profesor
+        )
+    with medirFase("piedmont_bdd_insercion_segundos", tabla="horario"):
+        conteo["horario"] = ejecutarEnLotes(
+            cursor,
+            "INSERT INTO horario (paralelo_id, dia_semana, bloque_inicio, sala) VALUES (%s, %s, %s, %s)",
+            filas_horario
+        )
+    
+    for tabla, filas in conteo.items():
+        contarMetrica("piedmont_bdd_filas_total", filas, tabla=tabla)
+    return conteo
+
+def marcarOcupacion(ocupacion, sala, dia, bloque):
+    """
+    Marca un bloque (dia 1-7, bloque 1-10) como ocupado en el bitmap de la sala
+    dentro de `ocupacion` {sala: int}. El bit es (dia - 1) * 10 + (bloque - 1).
+    """
+    ocupacion[sala] = ocupacion.get(sala, 0) | 1 << ((dia - 1) * bloquesPorDia + bloque - 1)
+
+def guardarOcupacionSalas(cursor, semestre_id, ocupacion, acumular=False):
+    """
+    Escribe la tabla derivada `ocupacion_sala`: una fila por (semestre, sala) con
+    los 70 bloques de la semana en `bytesOcupacion` bytes (little-endian), para que
+    Sedona busque salas vacías sin recorrer `horario`.
+    
+    Con `acumular` los bloques se suman a los ya guardados (paralelos nuevos de un
+    semestre publicado); si no, reemplazan el bitmap de cada sala.
+    """
+    # Las salas que la collation considera iguales comparten fila: se unen sus bitmaps
+    salas = {}
+    for sala, bitmap in ocupacion.items():
+        salas.setdefault(plegarTexto(sala), [sala, 0])[1] |= bitmap
+    
+    if acumular and salas:
+        for sala, bitmap in consultarEnLotes(
+            cursor,
+            "SELECT sala, ocupacion FROM ocupacion_sala WHERE semestre_id = %s AND sala IN ({})",
+            [sala for sala, _ in salas.values()],
+            (semestre_id,)
+        ):
+            entrada = salas.get(plegarTexto(sala))
+            if entrada:
+                entrada[1] |= int.from_bytes(bitmap, "little")
+    
+    with medirFase("piedmont_bdd_insercion_segundos", tabla="ocupacion_sala"):
+        return ejecutarEnLotes(
+            cursor,
+            """
+            INSERT INTO ocupacion_sala (semestre_id, sala, ocupacion)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE ocupacion = VALUES(ocupacion)
+            """,
+            [(semestre_id, sala, bitmap.to_bytes(bytesOcupacion, "little")) for sala, bitmap in sorted(salas.values())]
+        )
+
+def nuevasEstadisticas():
+    """Acumulador de las estadísticas de un semestre (ver `resumirEstadisticas`)."""
+    return {"asignaturas": {}, "profesores": {}, "dias": [0] * 7, "salas": {}}
+
+def acumularEstadisticas(estadisticas, codigo_asig, paralelo_data):
+    """
+    Suma un paralelo a las estadísticas del semestre, con la misma semántica que
+    las consultas de estadisticas.php: profesores y salas se agrupan como lo haría
+    la collation de la BDD y se excluye al profesor "NN".
+    """
+    asignatura = estadisticas["asignaturas"].setdefault(
+        codigo_asig, {"nombre": paralelo_data.nombre, "paralelos": set(), "profesores": set()}
+    )
+    asignatura["paralelos"].add(paralelo_data.paralelo)
+    
+    for profesor_nombre in paralelo_data.profesores:
+        profesor_nombre = normalizarProfesor(profesor_nombre)
+        clave = plegarTexto(profesor_nombre)
+        if not profesor_nombre or clave == "nn":
+            continue
+        profesor = estadisticas["profesores"].setdefault(
+            clave, {"nombre": profesor_nombre, "paralelos": set(), "asignaturas": set()}
+        )
+        profesor["paralelos"].add((codigo_asig, paralelo_data.paralelo))
+        profesor["asignaturas"].add(codigo_asig)
+        asignatura["profesores"].add(clave)
+    
+    for dia, _, sala in paralelo_data.bloques:
+        estadisticas["dias"][dia - 1] += 1
+        estadisticas["salas"].setdefault(plegarTexto(sala), [sala, 0])[1] += 1
+
+def resumirEstadisticas(estadisticas):
+    """
+    Totales y rankings de un semestre, con las mismas claves que usa
+    estadisticas.php (un ranking sin datos queda en None).
+    """
+    def mayor(elementos, medida):
+        # Empates: el primero en orden alfabético, para que el resultado sea estable
+        elementos = list(elementos)
+        if not elementos:
+            return None
+        return min(elementos, key=lambda elemento: (-medida(elemento), elemento["nombre"]))
+    
+    asignaturas = [dict(a, codigo=codigo) for codigo, a in estadisticas["asignaturas"].items()]
+    profesores = list(estadisticas["profesores"].values())
+    
+    profesor_paralelos = mayor(profesores, lambda p: len(p["paralelos"]))
+    profesor_asignaturas = mayor(profesores, lambda p: len(p["asignaturas"]))
+    asignatura_profesores = mayor([a for a in asignaturas if a["profesores"]], lambda a: len(a["profesores"]))
+    asignatura_paralelos = mayor(asignaturas, lambda a: len(a["paralelos"]))
+    sala_usos = mayor([{"nombre": sala, "usos": usos} for sala, usos in estadisticas["salas"].values()], lambda s: s["usos"])
+    dia = max(range(7), key=lambda i: estadisticas["dias"][i])
+    
+    return {
+        "asignaturas": len(asignaturas),
+        "paralelos": sum(len(a["paralelos"]) for a in asignaturas),
+        "profesores": len(profesores),
+        "profesor_mas_paralelos": profesor_paralelos and {"nombre": profesor_paralelos["nombre"], "total_paralelos": len(profesor_paralelos["paralelos"])},
+        "profesor_mas_asignaturas": profesor_asignaturas and {"nombre": profesor_asignaturas["nombre"], "total_asignaturas": len(profesor_asignaturas["asignaturas"])},
+        "dia_mas_ocupado": {"dia_semana": dia + 1, "total_bloques": estadisticas["dias"][dia]} if estadisticas["dias"][dia] else None,
+        "asignatura_mas_profesores": asignatura_profesores and {"nombre": asignatura_profesores["nombre"], "total_profesores": len(asignatura_profesores["profesores"])},
+        "sala_mas_usada": sala_usos and {"sala": sala_usos["nombre"], "usos": sala_usos["usos"]},
+        "asignatura_mas_paralelos": asignatura_paralelos and {"nombre": asignatura_paralelos["nombre"], "total_paralelos": len(asignatura_paralelos["paralelos"])},
+        "bloques_por_dia": estadisticas["dias"],
+    }
+
+def guardarEstadisticas(cursor, semestre_id, estadisticas):
+    """
+    Escribe el resumen de `estadisticas` en la tabla derivada `estadisticas_semestre`
+    como JSON, para que estadisticas.php no repita las agregaciones en cada visita.
+    """
+    with medirFase("piedmont_bdd_insercion_segundos", tabla="estadisticas_semestre"):
+        cursor.execute(
+            """
+            INSERT INTO estadisticas_semestre (semestre_id, datos)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE datos = VALUES(datos)
+            """,
+            (semestre_id, json.dumps(resumirEstadisticas(estadisticas), ensure_ascii=False))
+        )
+
+def terminosBusqueda(texto):
+    """
+    Trigramas de búsqueda de un texto: cada palabra (letras y dígitos) plegada con
+    `plegarTexto` aporta sus secuencias de 3 caracteres. Las palabras más cortas
+    no se indexan. buscar_asignaturas.php divide la consulta de la misma forma.
+    """
+    terminos = set()
+    for palabra in re.findall(r"[^\W_]+", plegarTexto(texto)):
+        terminos.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return terminos
+
+def indexarBusqueda(cursor, semestre_id, asignaturas=None):
+    """
+    Reconstruye el índice de búsqueda (`indice_busqueda`) de un semestre desde sus
+    filas ya insertadas: trigramas del código (también sin guiones ni espacios),
+    del nombre y de los profesores (salvo "NN") de cada asignatura.
+    
+    buscar_asignaturas.php lo usa para acotar las asignaturas candidatas con
+    búsquedas por índice, en vez de recorrer el semestre con LIKE '%...%'.
+    Con `asignaturas` (IDs) sólo se rehacen las filas de esas asignaturas.
+    Retorna la cantidad de filas del índice escritas.
+    """
+    consulta = """
+        SELECT a.id, a.codigo, a.nombre, pr.nombre
+        FROM asignatura a
+        LEFT JOIN paralelo p ON p.asignatura_id = a.id
+        LEFT JOIN paralelo_profesor pp ON pp.paralelo_id = p.id
+        LEFT JOIN profesor pr ON pr.id = pp.profesor_id
+        WHERE a.semestre_id = %s
+        """
+    if asignaturas is None:
+        cursor.execute(consulta, (semestre_id,))
+        filas = cursor.fetchall()
+    else:
+        asignaturas = sorted(set(asignaturas))
+        if not asignaturas:
+            return 0
+        filas = consultarEnLotes(cursor, consulta + "AND a.id IN ({})", asignaturas, (semestre_id,))
+    
+    terminos = {}
+    for asignatura_id, codigo, nombre, profesor in filas:
+        if asignatura_id not in terminos:
+            terminos[asignatura_id] = (
+                terminosBusqueda(codigo) | terminosBusqueda(re.sub(r"[\W_]+", "", codigo)) | terminosBusqueda(nombre)
+            )
+        if profesor and profesor != "NN":
+            terminos[asignatura_id] |= terminosBusqueda(profesor)
+    
+    with medirFase("piedmont_bdd_insercion_segundos", tabla="indice_busqueda"):
+        if asignaturas is None:
+            cursor.execute("DELETE FROM indice_busqueda WHERE semestre_id = %s", (semestre_id,))
+        else:
+            for i in range(0, len(asignaturas), tamanoLoteBDD):
+                lote = asignaturas[i:i + tamanoLoteBDD]
+                cursor.execute(
+                    f"DELETE FROM indice_busqueda WHERE semestre_id = %s AND asignatura_id IN ({', '.join(['%s'] * len(lote))})",
+                    (semestre_id,) + tuple(lote)
+                )
+        return ejecutarEnLotes(
+            cursor,
+            "INSERT INTO indice_busqueda (semestre_id, termino, asignatura_id) VALUES (%s, %s, %s)",
+            [(semestre_id, termino, asignatura_id) for asignatura_id, conjunto in terminos.items() for termino in sorted(conjunto)]
+        )
+
 def insertarJsonHaciaBDD(cursor, data):
     """
     Inserta los datos extraídos (JSON) en la base de datos MySQL.
@@ -41,6 +523,10 @@ def insertarJsonHaciaBDD(cursor, data):
     En lugar de consultar la BDD por cada asignatura/profesor (lo que generaría 
     miles de queries), cargamos todos los IDs existentes en memoria al inicio.
     Esto convierte un proceso O(N) de red en un proceso O(1) de memoria RAM.
+    
+    Las filas de cada tabla se envían en lotes multi-fila (ver `insertarLoteParalelos`),
+    y la ocupación de salas y las estadísticas del semestre se calculan de los
+    mismos datos en memoria.
     """
     # Procesar campus
     campus_name = next(iter(data.keys()))
@@ -82,163 +568,580 @@ def insertarJsonHaciaBDD(cursor, data):
             semestre_id = cursor.lastrowid
         else:
             semestre_id = semestre_result[0]
-            
-        # Cargar asignaturas de ESTE semestre a memoria para evitar duplicados sin consultar BDD
-        cursor.execute("SELECT codigo, id FROM asignatura WHERE semestre_id = %s", (semestre_id,))
-        cache_asignaturas = {row[0]: row[1] for row in cursor.fetchall()}
 
-        # Procesar asignaturas
+        lote = [
+            (codigo_asig, paralelo_data)
+            for codigo_asig, paralelos in semestre_data.items()
+            for paralelo_data in paralelos
+        ]
+        ocupacion = {}
+        conteo = insertarLoteParalelos(cursor, semestre_id, lote, cache_profesores, ocupacion=ocupacion)
+        conteo["ocupacion_sala"] = guardarOcupacionSalas(cursor, semestre_id, ocupacion)
+        
+        estadisticas = nuevasEstadisticas()
+        for codigo_asig, paralelo_data in lote:
+            acumularEstadisticas(estadisticas, codigo_asig, paralelo_data)
+        guardarEstadisticas(cursor, semestre_id, estadisticas)
+        conteo["indice_busqueda"] = indexarBusqueda(cursor, semestre_id)
+        
+        for tabla, filas in conteo.items():
+            printInfo(f"SQL: {tabla}: {filas} filas enviadas.", color="info", nivel="debug")
+
+def obtenerCampusId(cursor, campus_name):
+    """Retorna el ID del campus, creándolo si no existe."""
+    cursor.execute("SELECT id FROM campus WHERE nombre = %s", (campus_name,))
+    campus_result = cursor.fetchone()
+    
+    if campus_result:
+        return campus_result[0]
+    
+    printInfo(f"Creando campus {campus_name}...", color="info")
+    cursor.execute("INSERT INTO campus (nombre) VALUES (%s)", (campus_name,))
+    return cursor.lastrowid
+
+def codigoGeneracion(codigo_semestre, sufijo):
+    """
+    Código de semestre para una generación no publicada (staging o retirada).
+    Sedona sólo consulta semestres por su código exacto, así que estas filas son
+    invisibles para las páginas mientras no se publiquen.
+    """
+    return f"{codigo_semestre}{separadorGeneracion}{sufijo}"
+
+def retirarGeneracion(connection, cursor, semestre_id):
+    """
+    Elimina una generación de semestre ya despublicada, de abajo hacia arriba y en
+    lotes con commit propio. Así se evita el DELETE en cascada de una sola
+    transacción larga que bloquea a los lectores.
+    """
+    cursor.execute("SELECT id FROM asignatura WHERE semestre_id = %s", (semestre_id,))
+    asignatura_ids = [row[0] for row in cursor.fetchall()]
+    paralelo_ids = [
+        row[0] for row in consultarEnLotes(cursor, "SELECT id FROM paralelo WHERE asignatura_id IN ({})", asignatura_ids)
+    ]
+
+    for tabla, columna, ids in (
+        ("horario", "paralelo_id", paralelo_ids),
+        ("paralelo_profesor", "paralelo_id", paralelo_ids),
+        ("paralelo", "id", paralelo_ids),
+        ("asignatura", "id", asignatura_ids),
+    ):
+        for i in range(0, len(ids), tamanoLoteBDD):
+            lote = ids[i:i + tamanoLoteBDD]
+            cursor.execute(
+                f"DELETE FROM {tabla} WHERE {columna} IN ({', '.join(['%s'] * len(lote))})",
+                tuple(lote)
+            )
+            connection.commit()
+
+    cursor.execute("DELETE FROM semestre WHERE id = %s", (semestre_id,))
+    connection.commit()
+
+def limpiarGeneraciones(connection, cursor, campus_id, codigo_semestre):
+    """Retira generaciones huérfanas (staging interrumpido o retiradas a medias)."""
+    cursor.execute(
+        "SELECT id, codigo FROM semestre WHERE campus_id = %s AND codigo LIKE %s",
+        (campus_id, codigoGeneracion(codigo_semestre, "%"))
+    )
+    for semestre_id, codigo in cursor.fetchall():
+        printInfo(f"Retirando generación huérfana {codigo}...", color="advertencia")
+        retirarGeneracion(connection, cursor, semestre_id)
+
+def nuevoConteoEsperado():
+    """Acumulador de lo que debería quedar en la BDD tras cargar un semestre."""
+    return {"asignaturas": set(), "paralelos": set(), "horario": 0}
+
+def acumularConteoEsperado(esperado, codigo_asig, paralelo_data):
+    """Suma un paralelo al conteo esperado (ver `validarStaging`)."""
+    esperado["asignaturas"].add(codigo_asig)
+    esperado["paralelos"].add((codigo_asig, paralelo_data.paralelo))
+    esperado["horario"] += len(paralelo_data.bloques)
+
+def validarStaging(cursor, semestre_id, conteo_esperado):
+    """
+    Compara lo cargado en la generación staging contra el conteo esperado de los
+    datos extraídos. Retorna (True, None) si coincide, o (False, motivo) si no.
+    """
+    esperado = {
+        "asignatura": len(conteo_esperado["asignaturas"]),
+        "paralelo": len(conteo_esperado["paralelos"]),
+        "horario": conteo_esperado["horario"],
+    }
+    
+    cursor.execute("SELECT COUNT(*) FROM asignatura WHERE semestre_id = %s", (semestre_id,))
+    asignaturas = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT COUNT(*) FROM paralelo p JOIN asignatura a ON p.asignatura_id = a.id WHERE a.semestre_id = %s",
+        (semestre_id,)
+    )
+    paralelos = cursor.fetchone()[0]
+    cursor.execute(
+        """SELECT COUNT(*) FROM horario h
+        JOIN paralelo p ON h.paralelo_id = p.id
+        JOIN asignatura a ON p.asignatura_id = a.id
+        WHERE a.semestre_id = %s""",
+        (semestre_id,)
+    )
+    horarios = cursor.fetchone()[0]
+    
+    obtenido = {"asignatura": asignaturas, "paralelo": paralelos, "horario": horarios}
+    for tabla, cantidad in esperado.items():
+        # Los horarios de paralelos repetidos se acumulan, por eso se acepta igual o mayor
+        if obtenido[tabla] < cantidad or (tabla != "horario" and obtenido[tabla] != cantidad):
+            return False, f"{tabla}: se esperaban {cantidad} filas y hay {obtenido[tabla]}"
+    
+    return True, None
+
+def crearGeneracionStaging(connection, cursor, campus_id, codigo_semestre):
+    """Crea (vacía) la generación staging de un semestre y retorna su ID."""
+    limpiarGeneraciones(connection, cursor, campus_id, codigo_semestre)
+    
+    printInfo(f"Cargando semestre {codigo_semestre} en staging...", color="info")
+    cursor.execute(
+        "INSERT INTO semestre (campus_id, codigo) VALUES (%s, %s)",
+        (campus_id, codigoGeneracion(codigo_semestre, "staging"))
+    )
+    staging_id = cursor.lastrowid
+    connection.commit()
+    return staging_id
+
+def publicarGeneracion(connection, cursor, campus_id, codigo_semestre, staging_id, conteo_esperado):
+    """
+    Valida una generación staging y, si es correcta, la publica intercambiando
+    códigos con la generación vigente en una transacción corta. Luego retira la
+    generación anterior. Retorna True si se publicó.
+    """
+    valido, motivo = validarStaging(cursor, staging_id, conteo_esperado)
+    if not valido:
+        printInfo(f"Staging inválido para {codigo_semestre} ({motivo}). No se publica.", color="error")
+        retirarGeneracion(connection, cursor, staging_id)
+        return False
+    
+    # Publicación atómica (cambio de puntero)
+    cursor.execute(
+        "SELECT id FROM semestre WHERE campus_id = %s AND codigo = %s FOR UPDATE",
+        (campus_id, codigo_semestre)
+    )
+    publicado = cursor.fetchone()
+    if publicado:
+        cursor.execute(
+            "UPDATE semestre SET codigo = %s WHERE id = %s",
+            (codigoGeneracion(codigo_semestre, f"r{publicado[0]}"), publicado[0])
+        )
+    cursor.execute("UPDATE semestre SET codigo = %s WHERE id = %s", (codigo_semestre, staging_id))
+    connection.commit()
+    printInfo(f"Semestre {codigo_semestre} publicado (generación {staging_id}).", color="exito")
+    
+    # Retiro de la generación anterior
+    if publicado:
+        try:
+            retirarGeneracion(connection, cursor, publicado[0])
+            printInfo(f"Generación anterior {publicado[0]} eliminada.", color="advertencia")
+        except Error as e:
+            # No es crítico: se limpiará en la próxima importación
+            printInfo(f"No se pudo retirar la generación {publicado[0]}: {e}", color="advertencia")
+            connection.rollback()
+    
+    return True
+
+def importarConStaging(connection, cursor, data):
+    """
+    Importa cada semestre a una generación staging y la publica de forma atómica.
+    
+    1. Los datos se cargan bajo un semestre con código de staging (invisible para
+       Sedona), con commits por lote para no mantener una transacción larga.
+    2. Se valida la generación contra los datos extraídos.
+    3. En una transacción corta se intercambian los códigos: la generación vieja
+       pasa a un código de retiro y la nueva toma el código real.
+    4. La generación vieja se elimina en lotes, ya fuera de la vista de los lectores.
+    """
+    campus_name = next(iter(data.keys()))
+    campus_id = obtenerCampusId(cursor, campus_name)
+    connection.commit()
+    
+    cursor.execute("SELECT nombre, id FROM profesor")
+    cache_profesores = {row[0]: row[1] for row in cursor.fetchall()}
+
+    for semestre_key, semestre_data in data[campus_name].items():
+        codigo_semestre = f"{semestre_key[:4]}-{semestre_key[4]}"
+        staging_id = crearGeneracionStaging(connection, cursor, campus_id, codigo_semestre)
+        
+        lote = []
+        conteo_esperado = nuevoConteoEsperado()
+        estadisticas = nuevasEstadisticas()
         for codigo_asig, paralelos in semestre_data.items():
-            # Verificamos en RAM primero
-            asignatura_id = cache_asignaturas.get(codigo_asig)
-            
-            # Datos generales de la asignatura (tomamos del primer paralelo)
-            meta_data = paralelos[0]
+            for paralelo_data in paralelos:
+                lote.append((codigo_asig, paralelo_data))
+                acumularConteoEsperado(conteo_esperado, codigo_asig, paralelo_data)
+                acumularEstadisticas(estadisticas, codigo_asig, paralelo_data)
+        
+        cache_asignaturas = {}
+        ocupacion = {}
+        for i in range(0, len(lote), tamanoLoteStaging):
+            insertarLoteParalelos(cursor, staging_id, lote[i:i + tamanoLoteStaging], cache_profesores, cache_asignaturas, ocupacion)
+            connection.commit()
+        guardarOcupacionSalas(cursor, staging_id, ocupacion)
+        guardarEstadisticas(cursor, staging_id, estadisticas)
+        indexarBusqueda(cursor, staging_id)
+        connection.commit()
+        
+        if not publicarGeneracion(connection, cursor, campus_id, codigo_semestre, staging_id, conteo_esperado):
+            return False
+    
+    return True
 
-            if not asignatura_id:
-                # Si no existe, insertamos y actualizamos la caché RAM
-                printInfo(f"SQL: Creando Asignatura {codigo_asig} - {meta_data['Nombre']}", color="info")
-                cursor.execute(
-                    "INSERT INTO asignatura (semestre_id, codigo, nombre, departamento) VALUES (%s, %s, %s, %s)",
-                    (semestre_id, codigo_asig, meta_data['Nombre'], meta_data['Departamento'])
-                )
-                asignatura_id = cursor.lastrowid
-                cache_asignaturas[codigo_asig] = asignatura_id # Actualizamos caché al vuelo
+def sincronizarDiferencial(connection, cursor, data):
+    """
+    Sincroniza cada semestre contra la BDD enviando sólo las diferencias.
+    
+    Se cargan en memoria las filas actuales del semestre, indexadas por
+    (codigo, paralelo), y se comparan con los datos extraídos. Sólo se emiten los
+    INSERT/UPDATE/DELETE necesarios, en lotes, dentro de una transacción corta.
+    Retorna un diccionario {tabla: {"insert": n, "update": n, "delete": n}}.
+    """
+    conteo = {
+        tabla: {"insert": 0, "update": 0, "delete": 0}
+        for tabla in ("asignatura", "profesor", "paralelo", "paralelo_profesor", "horario")
+    }
+    
+    campus_name = next(iter(data.keys()))
+    campus_id = obtenerCampusId(cursor, campus_name)
+    
+    cursor.execute("SELECT nombre, id FROM profesor")
+    cache_profesores = {row[0]: row[1] for row in cursor.fetchall()}
+
+    for semestre_key, semestre_data in data[campus_name].items():
+        codigo_semestre = f"{semestre_key[:4]}-{semestre_key[4]}"
+        printInfo(f"Sincronizando diferencias del semestre {codigo_semestre}...", color="info")
+        
+        cursor.execute("SELECT id FROM semestre WHERE campus_id = %s AND codigo = %s", (campus_id, codigo_semestre))
+        semestre_result = cursor.fetchone()
+        if semestre_result:
+            semestre_id = semestre_result[0]
+        else:
+            cursor.execute("INSERT INTO semestre (campus_id, codigo) VALUES (%s, %s)", (campus_id, codigo_semestre))
+            semestre_id = cursor.lastrowid
+
+        # Estado actual en la BDD
+        cursor.execute("SELECT codigo, id, nombre, departamento FROM asignatura WHERE semestre_id = %s", (semestre_id,))
+        actual_asignaturas = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+        
+        cursor.execute(
+            """SELECT a.codigo, p.paralelo, p.id, p.cupos, p.asignatura_id
+            FROM paralelo p JOIN asignatura a ON p.asignatura_id = a.id
+            WHERE a.semestre_id = %s""",
+            (semestre_id,)
+        )
+        actual_paralelos = {(row[0], row[1]): (row[2], row[3], row[4]) for row in cursor.fetchall()}
+        
+        cursor.execute(
+            """SELECT pp.paralelo_id, pp.profesor_id
+            FROM paralelo_profesor pp
+            JOIN paralelo p ON pp.paralelo_id = p.id
+            JOIN asignatura a ON p.asignatura_id = a.id
+            WHERE a.semestre_id = %s""",
+            (semestre_id,)
+        )
+        actual_profesores = {}
+        for paralelo_id, profesor_id in cursor.fetchall():
+            actual_profesores.setdefault(paralelo_id, set()).add(profesor_id)
+        
+        cursor.execute(
+            """SELECT h.paralelo_id, h.id, h.dia_semana, h.bloque_inicio, h.sala
+            FROM horario h
+            JOIN paralelo p ON h.paralelo_id = p.id
+            JOIN asignatura a ON p.asignatura_id = a.id
+            WHERE a.semestre_id = %s""",
+            (semestre_id,)
+        )
+        actual_horarios = {}
+        for paralelo_id, horario_id, dia, bloque, sala in cursor.fetchall():
+            actual_horarios.setdefault(paralelo_id, []).append((horario_id, (dia, bloque, sala)))
+
+        # Estado deseado según los datos extraídos (los paralelos repetidos se fusionan)
+        deseado = {}
+        for codigo_asig, paralelos in semestre_data.items():
+            for paralelo_data in paralelos:
+                clave = (codigo_asig, paralelo_data.paralelo)
+                if clave in deseado:
+                    previo = deseado[clave]
+                    previo['cupos'] = paralelo_data.cupos
+                    previo['profesores'] += paralelo_data.profesores
+                    previo['bloques'] += paralelo_data.bloques
+                else:
+                    deseado[clave] = {
+                        'cupos': paralelo_data.cupos,
+                        'profesores': list(paralelo_data.profesores),
+                        'bloques': list(paralelo_data.bloques),
+                    }
+
+        conteo["profesor"]["insert"] += asegurarProfesores(
+            cursor,
+            [nombre for paralelo_data in deseado.values() for nombre in paralelo_data['profesores']],
+            cache_profesores
+        )
+
+        # Asignaturas cuyo nombre o profesores cambiaron: las únicas que se reindexan
+        asignaturas_reindexar = set()
+        
+        # Asignaturas cuyo nombre o departamento cambió
+        filas_asignatura = []
+        for codigo_asig, paralelos in semestre_data.items():
+            if codigo_asig in actual_asignaturas:
+                asignatura_id, nombre, departamento = actual_asignaturas[codigo_asig]
+                meta_data = paralelos[0]
+                if (nombre, departamento) != (meta_data.nombre, meta_data.departamento):
+                    filas_asignatura.append((asignatura_id, semestre_id, codigo_asig, meta_data.nombre, meta_data.departamento))
+                if nombre != meta_data.nombre:
+                    asignaturas_reindexar.add(asignatura_id)
+        conteo["asignatura"]["update"] += ejecutarEnLotes(
+            cursor,
+            """
+            INSERT INTO asignatura (id, semestre_id, codigo, nombre, departamento)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE nombre = VALUES(nombre), departamento = VALUES(departamento)
+            """,
+            filas_asignatura
+        )
+
+        # Paralelos nuevos: se insertan completos (asignatura, profesores y horario).
+        # Se envían las entradas originales y no las fusionadas de `deseado`, que ya
+        # no son paralelos completos; la inserción une los repetidos.
+        lote_nuevos = [
+            (codigo_asig, paralelo_data)
+            for codigo_asig, paralelos in semestre_data.items()
+            for paralelo_data in paralelos
+            if (codigo_asig, paralelo_data.paralelo) not in actual_paralelos
+        ]
+        if lote_nuevos:
+            cache_asignaturas = {codigo: valores[0] for codigo, valores in actual_asignaturas.items()}
+            insertados = insertarLoteParalelos(cursor, semestre_id, lote_nuevos, cache_profesores, cache_asignaturas)
+            for tabla in ("asignatura", "paralelo", "paralelo_profesor", "horario"):
+                conteo[tabla]["insert"] += insertados[tabla]
+            asignaturas_reindexar.update(cache_asignaturas[codigo_asig] for codigo_asig, _ in lote_nuevos if codigo_asig in cache_asignaturas)
+
+        # Salas cuyos bloques cambiaron {sala plegada: sala}: las únicas cuya ocupación se recalcula
+        salas_tocadas = {
+            plegarTexto(sala): sala for _, paralelo_data in lote_nuevos for _, _, sala in paralelo_data.bloques
+        }
+
+        # Paralelos existentes: cupos, profesores y bloques de horario
+        filas_cupos = []
+        filas_profesor_insert = []
+        filas_profesor_delete = []
+        filas_horario_insert = []
+        ids_horario_delete = []
+        for clave, paralelo_data in deseado.items():
+            if clave not in actual_paralelos:
+                continue
+            paralelo_id, cupos, asignatura_id = actual_paralelos[clave]
+            
+            if str(cupos) != str(paralelo_data['cupos']).strip():
+                filas_cupos.append((paralelo_id, asignatura_id, clave[1], paralelo_data['cupos']))
             
+            profesores_deseados = {
+                cache_profesores[nombre] for nombre in map(normalizarProfesor, paralelo_data['profesores'])
+                if nombre in cache_profesores
+            }
+            profesores_actuales = actual_profesores.get(paralelo_id, set())
+            filas_profesor_insert.extend((paralelo_id, profesor_id) for profesor_id in profesores_deseados - profesores_actuales)
+            filas_profesor_delete.extend((paralelo_id, profesor_id) for profesor_id in profesores_actuales - profesores_deseados)
+            if profesores_deseados != profesores_actuales:
+                asignaturas_reindexar.add(asignatura_id)
+            
+            # Comparación de bloques como multiconjunto
+            pendientes = list(paralelo_data['bloques'])
+            for horario_id, bloque in actual_horarios.get(paralelo_id, []):
+                if bloque in pendientes:
+                    pendientes.remove(bloque)
+                else:
+                    ids_horario_delete.append(horario_id)
+                    salas_tocadas.setdefault(plegarTexto(bloque[2]), bloque[2])
+            filas_horario_insert.extend((paralelo_id,) + bloque for bloque in pendientes)
+            salas_tocadas.update((plegarTexto(bloque[2]), bloque[2]) for bloque in pendientes)
+
+        conteo["paralelo"]["update"] += ejecutarEnLotes(
+            cursor,
+            """
+            INSERT INTO paralelo (id, asignatura_id, paralelo, cupos)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE cupos = VALUES(cupos)
+            """,
+            filas_cupos
+        )
+        conteo["paralelo_profesor"]["insert"] += ejecutarEnLotes(
+            cursor,
+            "INSERT IGNORE INTO paralelo_profesor (paralelo_id, profesor_id) VALUES (%s, %s)",
+            filas_profesor_insert
+        )
+        conteo["horario"]["insert"] += ejecutarEnLotes(
+            cursor,
+            "INSERT INTO horario (paralelo_id, dia_semana, bloque_inicio, sala) VALUES (%s, %s, %s, %s)",
+            filas_horario_insert
+        )
+        
+        for i in range(0, len(filas_profesor_delete), tamanoLoteBDD):
+            lote = filas_profesor_delete[i:i + tamanoLoteBDD]
+            cursor.execute(
+                f"DELETE FROM paralelo_profesor WHERE (paralelo_id, profesor_id) IN ({', '.join(['(%s, %s)'] * len(lote))})",
+                tuple(valor for fila in lote for valor in fila)
+            )
+        conteo["paralelo_profesor"]["delete"] += len(filas_profesor_delete)
+        
+        for i in range(0, len(ids_horario_delete), tamanoLoteBDD):
+            lote = ids_horario_delete[i:i + tamanoLoteBDD]
+            cursor.execute(f"DELETE FROM horario WHERE id IN ({', '.join(['%s'] * len(lote))})", tuple(lote))
+        conteo["horario"]["delete"] += len(ids_horario_delete)
+
+        estadisticas = nuevasEstadisticas()
+        for codigo_asig, paralelos in semestre_data.items():
             for paralelo_data in paralelos:
-                printInfo(f"SQL: Proc. {codigo_asig} - P{paralelo_data['Paralelo']}", color="info")
+                acumularEstadisticas(estadisticas, codigo_asig, paralelo_data)
+        guardarEstadisticas(cursor, semestre_id, estadisticas)
 
-                # Insertar Paralelo
+        # Paralelos y asignaturas que ya no aparecen (el resto se borra en cascada)
+        ids_paralelo_delete = [valores[0] for clave, valores in actual_paralelos.items() if clave not in deseado]
+        asignaturas_reindexar.update(valores[2] for clave, valores in actual_paralelos.items() if clave not in deseado)
+        for i in range(0, len(ids_paralelo_delete), tamanoLoteBDD):
+            lote = ids_paralelo_delete[i:i + tamanoLoteBDD]
+            cursor.execute(f"DELETE FROM paralelo WHERE id IN ({', '.join(['%s'] * len(lote))})", tuple(lote))
+        conteo["paralelo"]["delete"] += len(ids_paralelo_delete)
+        conteo["horario"]["delete"] += sum(len(actual_horarios.get(paralelo_id, [])) for paralelo_id in ids_paralelo_delete)
+        conteo["paralelo_profesor"]["delete"] += sum(len(actual_profesores.get(paralelo_id, ())) for paralelo_id in ids_paralelo_delete)
+        for paralelo_id in ids_paralelo_delete:
+            for _, (_, _, sala) in actual_horarios.get(paralelo_id, []):
+                salas_tocadas.setdefault(plegarTexto(sala), sala)
+        
+        ids_asignatura_delete = [valores[0] for codigo, valores in actual_asignaturas.items() if codigo not in semestre_data]
+        for i in range(0, len(ids_asignatura_delete), tamanoLoteBDD):
+            lote = ids_asignatura_delete[i:i + tamanoLoteBDD]
+            cursor.execute(f"DELETE FROM asignatura WHERE id IN ({', '.join(['%s'] * len(lote))})", tuple(lote))
+        conteo["asignatura"]["delete"] += len(ids_asignatura_delete)
+        
+        # Ocupación de las salas tocadas, recalculada desde los datos extraídos; las que
+        # quedaron sin bloques salen de la tabla
+        if salas_tocadas:
+            ocupacion = {}
+            for paralelo_data in deseado.values():
+                for dia, bloque, sala in paralelo_data['bloques']:
+                    if plegarTexto(sala) in salas_tocadas:
+                        marcarOcupacion(ocupacion, sala, dia, bloque)
+            ocupadas = {plegarTexto(sala) for sala in ocupacion}
+            salas_libres = [sala for clave, sala in salas_tocadas.items() if clave not in ocupadas]
+            for i in range(0, len(salas_libres), tamanoLoteBDD):
+                lote = salas_libres[i:i + tamanoLoteBDD]
                 cursor.execute(
-                    """
-                    INSERT INTO paralelo (asignatura_id, paralelo, cupos)
-                    VALUES (%s, %s, %s)
-                    ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id), cupos=%s
-                    """,
-                    (asignatura_id, paralelo_data['Paralelo'], paralelo_data['Cupos'], paralelo_data['Cupos'])
+                    f"DELETE FROM ocupacion_sala WHERE semestre_id = %s AND sala IN ({', '.join(['%s'] * len(lote))})",
+                    (semestre_id,) + tuple(lote)
                 )
-                paralelo_id = cursor.lastrowid
-                
-                # Profesores
-                for profesor_nombre in paralelo_data['Profesores']:
-                    profesor_nombre = profesor_nombre.replace(" null", "").strip()
-                    if not profesor_nombre: continue
-
-                    # Verificamos ID en RAM
-                    profesor_id = cache_profesores.get(profesor_nombre)
-
-                    if profesor_id is None:
-                        # Si es un profe nuevo, a la BDD y luego a la RAM
-                        cursor.execute("INSERT INTO profesor (nombre) VALUES (%s)", (profesor_nombre,))
-                        profesor_id = cursor.lastrowid
-                        cache_profesores[profesor_nombre] = profesor_id
-                        printInfo(f"    + Nuevo Profesor registrado: {profesor_nombre}", color="info", caja=False)
-                    
-                    # Insertar relación
-                    cursor.execute(
-                        "INSERT IGNORE INTO paralelo_profesor (paralelo_id, profesor_id) VALUES (%s, %s)",
-                        (paralelo_id, profesor_id)
-                    )
-                
-                # Procesar Horario
-                for bloque_idx, dias in enumerate(paralelo_data['Horario']):
-                    for dia_idx, sala in enumerate(dias):
-                        sala_norm = sala.strip()
-                        if sala_norm:
-                            if sala_norm.startswith("Sala "): sala_norm = sala_norm[5:]
-                            
-                            cursor.execute(
-                                """INSERT INTO horario 
-                                (paralelo_id, dia_semana, bloque_inicio, sala)
-                                VALUES (%s, %s, %s, %s)""",
-                                (paralelo_id, dia_idx + 1, bloque_idx + 1, sala_norm)
-                            )
-                            printInfo(f"    + Horario: D{dia_idx + 1}/B{bloque_idx + 1} -> {sala_norm}", color="info")
-                    printInfo(f"    + Vinculando Profesor: {profesor_nombre} (ID: {profesor_id})", color="info")
-                
-                # Procesar Horario
-                for bloque_idx, dias in enumerate(paralelo_data['Horario']):
-                    for dia_idx, sala in enumerate(dias):
-                        sala_normalizada = sala.strip()
-                        
-                        if sala_normalizada:
-                            # Eliminar prefijo "Sala " si existe al inicio
-                            if sala_normalizada.startswith("Sala "):
-                                sala_normalizada = sala_normalizada[5:]
-                            
-                            cursor.execute(
-                                """INSERT INTO horario 
-                                (paralelo_id, dia_semana, bloque_inicio, sala)
-                                VALUES (%s, %s, %s, %s)""",
-                                (paralelo_id, 
-                                 dia_idx + 1,
-                                 bloque_idx + 1,
-                                 sala_normalizada)
-                            )
-                            printInfo(f"    + Horario Agregado: Día {dia_idx + 1}, Bloque {bloque_idx + 1} en {sala_normalizada}", color="info")
-
-def prepararConexionBDD():
+            guardarOcupacionSalas(cursor, semestre_id, ocupacion)
+        
+        # Índice de búsqueda: sólo las asignaturas que cambiaron (las borradas salen
+        # del índice en cascada)
+        asignaturas_reindexar.difference_update(ids_asignatura_delete)
+        indexarBusqueda(cursor, semestre_id, asignaturas_reindexar)
+
+    connection.commit()
+    
+    for tabla, operaciones in conteo.items():
+        printInfo(
+            f"Diferencial {tabla}: +{operaciones['insert']} ~{operaciones['update']} -{operaciones['delete']}",
+            color="info"
+        )
+    
+    return conteo
+
+def registrarUltimaActualizacion(connection=None):
+    """
+    Registra el timestamp de la última importación exitosa y vuelve a generar la
+    API estática (ver `publicarAPIEstatica`), con `connection` si hay una abierta.
+    """
+    try:
+        with open("ultima_act_bdd.txt", "w", encoding="utf-8") as archivo:
+            archivo.write(fechaActual.replace("_", " "))
+    except IOError:
+        printInfo("No se pudo escribir el archivo de última actualización.", "advertencia")
+    
+    if usarAPIEstatica:
+        intentarPublicarAPIEstatica(connection)
+
+def prepararConexionBDD(datos):
     """
     Establece la conexión con la base de datos, gestiona la limpieza de datos
-    antiguos (si aplica) e inicia la transacción de inserción.
+    antiguos (si aplica) e inicia la transacción de inserción de `datos` (los
+    paralelos extraídos de un campus).
+    
+    Con `modoImportacion = "staging"` los datos se publican mediante una generación
+    staging (ver `importarConStaging`); con "diferencial" sólo se envían los cambios
+    (ver `sincronizarDiferencial`); con "reescritura" se borra el semestre y se
+    reinserta todo en una sola transacción.
     """
     global config
-    global baseDatosGlobal
     global fechaActual
     
     connection = None
     cursor = None
     
+    # Validación antes de tocar la BDD: un semestre sospechoso no se publica
+    validaciones = {}
+    if usarValidacion and datos:
+        validaciones = validarDatos(datos)
+        if validaciones is None:
+            return False
+    
+    # Cada importación usa su propia conexión, dentro del presupuesto de conexiones
+    semaforoBDD.acquire()
+    inicio = time.perf_counter()
     try:
         connection = mysql.connector.connect(**config)
         cursor = connection.cursor()
         
         printInfo(" === Comenzando la importación de datos JSON a la base de datos === \n", color="info")
         
-        if not baseDatosGlobal:
+        if not datos:
             printInfo("La base de datos global está vacía. No hay nada que importar.", color="error")
             return False
 
-        # Obtener campus y semestre actual de los datos extraídos
-        campus_name = next(iter(baseDatosGlobal.keys()))
-        semestre_key = next(iter(baseDatosGlobal[campus_name].keys()))
-        codigo_semestre = f"{semestre_key[:4]}-{semestre_key[4]}"
-        
-        # Gestión del Campus
-        cursor.execute("SELECT id FROM campus WHERE nombre = %s", (campus_name,))
-        campus_result = cursor.fetchone()
-        
-        if not campus_result:
-            printInfo(f"Creando campus {campus_name}...", color="info")
-            cursor.execute("INSERT INTO campus (nombre) VALUES (%s)", (campus_name,))
-            campus_id = cursor.lastrowid
+        if modoImportacion == "staging":
+            if not importarConStaging(connection, cursor, datos):
+                return False
+            printInfo("Datos importados y publicados exitosamente!", color="exito")
+        elif modoImportacion == "diferencial":
+            sincronizarDiferencial(connection, cursor, datos)
+            printInfo("Diferencias sincronizadas y commit realizado exitosamente!", color="exito")
         else:
-            campus_id = campus_result[0]
-        
-        # Gestión de limpieza de semestre previo
-        # Se elimina el semestre completo para re-importar datos limpios y evitar duplicados o datos sucios
-        cursor.execute("SELECT id FROM semestre WHERE campus_id = %s AND codigo = %s", 
-                       (campus_id, codigo_semestre))
-        semestre_existente = cursor.fetchone()
-        
-        if semestre_existente:
-            semestre_id = semestre_existente[0]
-            printInfo(f"Eliminando semestre existente {codigo_semestre} para reescritura limpia...", color="advertencia")
-            cursor.execute("DELETE FROM semestre WHERE id = %s", (semestre_id,))
-            printInfo(f"Datos anteriores eliminados.", color="advertencia")
-        
-        # Insertar datos nuevos
-        insertarJsonHaciaBDD(cursor, baseDatosGlobal)
-        
-        connection.commit()
-        printInfo("Datos importados y commit realizado exitosamente!", color="exito")
+            # Obtener campus y semestre actual de los datos extraídos
+            campus_name = next(iter(datos.keys()))
+            semestre_key = next(iter(datos[campus_name].keys()))
+            codigo_semestre = f"{semestre_key[:4]}-{semestre_key[4]}"
+            
+            # Gestión del Campus
+            campus_id = obtenerCampusId(cursor, campus_name)
+            
+            # Gestión de limpieza de semestre previo
+            # Se elimina el semestre completo para re-importar datos limpios y evitar duplicados o datos sucios
+            cursor.execute("SELECT id FROM semestre WHERE campus_id = %s AND codigo = %s", 
+                           (campus_id, codigo_semestre))
+            semestre_existente = cursor.fetchone()
+            
+            if semestre_existente:
+                semestre_id = semestre_existente[0]
+                printInfo(f"Eliminando semestre existente {codigo_semestre} para reescritura limpia...", color="advertencia")
+                cursor.execute("DELETE FROM semestre WHERE id = %s", (semestre_id,))
+                printInfo(f"Datos anteriores eliminados.", color="advertencia")
+            
+            # Insertar datos nuevos
+            insertarJsonHaciaBDD(cursor, datos)
+            
+            connection.commit()
+            printInfo("Datos importados y commit realizado exitosamente!", color="exito")
         
         # Registrar timestamp de actualización
-        try:
-            with open("ultima_act_bdd.txt", "w", encoding="utf-8") as archivo:
-                archivo.write(fechaActual.replace("_", " "))
-        except IOError:
-            printInfo("No se pudo escribir el archivo de última actualización.", "advertencia")
+        registrarUltimaActualizacion(connection)
+        registrarDuracion("piedmont_importacion_segundos", time.perf_counter() - inicio, modo=modoImportacion)
+        for (nombreCampus, periodo), resumen in validaciones.items():
+            guardarValidacion(nombreCampus, periodo, resumen)
+        if usarHistorial:
+            guardarHistorialDatos(datos)
         
         return True
 
@@ -254,23 +1157,365 @@ def prepararConexionBDD():
             cursor.close()
             connection.close()
             printInfo("Conexión BDD cerrada.", color="normal")
+        semaforoBDD.release()
 
 
 ############################################################################
-#                       MANEJO DE CREDENCIALES                             #
+#                     PIPELINE SCRAPING -> BDD                             #
 
-def cargarCredenciales():
-    """Carga usuario y contraseña desde archivo externo."""
+def escritorPipeline(cola, resultado):
+    """
+    Hilo consumidor del pipeline: toma los registros que produce el scraping y los
+    carga por lotes en una generación staging por semestre, con commit por lote.
+    
+    Al recibir el marcador de fin con éxito, valida y publica cada generación; si
+    el scraping falló, o una generación no pasa la validación, retira todas las
+    que no se publicaron. Ante cualquier error deja el error en `resultado` y
+    sigue vaciando la cola hasta el marcador de fin, para no bloquear a los
+    productores.
+    """
+    connection = None
+    cursor = None
+    terminado = False
+    generaciones = {} # (campus, periodo) -> {campus_id, codigo, staging_id, lote, esperado, cache_asignaturas, ocupacion, estadisticas, historial, validacion}
+    
+    def volcar(generacion):
+        if generacion["lote"]:
+            insertarLoteParalelos(cursor, generacion["staging_id"], generacion["lote"], cache_profesores, generacion["cache_asignaturas"], generacion["ocupacion"])
+            connection.commit()
+            generacion["lote"] = []
+    
+    def retirarPendientes():
+        for generacion in generaciones.values():
+            if not generacion.get("publicada"):
+                retirarGeneracion(connection, cursor, generacion["staging_id"])
+                generacion["publicada"] = True # Ya no queda nada que retirar
+    
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        cred_path = os.path.normpath(os.path.join(script_dir, '..', 'sedona_config', 'piedmont_cred.txt'))
+        connection = mysql.connector.connect(**config)
+        cursor = connection.cursor()
+        cursor.execute("SELECT nombre, id FROM profesor")
+        cache_profesores = {row[0]: row[1] for row in cursor.fetchall()}
         
-        printInfo(f"Cargando credenciales desde: {cred_path}", "info")
-
-        with open(cred_path, 'r', encoding='utf-8') as f:
-            lineas = [line.strip() for line in f.readlines() if line.strip()]
-
-        if len(lineas) < 2:
+        while True:
+            registro = cola.get()
+            if registro is None or "fin" in registro:
+                terminado = True
+                break
+            
+            clave = (registro["campus"], registro["periodo"])
+            if clave not in generaciones:
+                campus_id = obtenerCampusId(cursor, registro["campus"])
+                codigo_semestre = f"{registro['periodo'][:4]}-{registro['periodo'][4]}"
+                generaciones[clave] = {
+                    "campus_id": campus_id,
+                    "codigo": codigo_semestre,
+                    "staging_id": crearGeneracionStaging(connection, cursor, campus_id, codigo_semestre),
+                    "lote": [],
+                    "esperado": nuevoConteoEsperado(),
+                    "cache_asignaturas": {},
+                    "ocupacion": {},
+                    "estadisticas": nuevasEstadisticas(),
+                    "historial": nuevoHistorial(),
+                    "validacion": nuevaValidacion(),
+                }
+            
+            generacion = generaciones[clave]
+            generacion["lote"].append((registro["sigla"], registro["paralelo"]))
+            acumularConteoEsperado(generacion["esperado"], registro["sigla"], registro["paralelo"])
+            acumularEstadisticas(generacion["estadisticas"], registro["sigla"], registro["paralelo"])
+            acumularHistorial(generacion["historial"], registro["sigla"], registro["paralelo"])
+            acumularValidacion(generacion["validacion"], registro["sigla"], registro["paralelo"])
+            resultado["recibidos"] += 1
+            
+            if len(generacion["lote"]) >= tamanoLotePipeline:
+                volcar(generacion)
+        
+        exitoScraping = registro is not None and registro.get("exito", False)
+        if not exitoScraping:
+            retirarPendientes()
+            return
+        
+        for clave, generacion in generaciones.items():
+            resumen = validarPublicacion(*clave, generacion["validacion"]) if usarValidacion else None
+            if usarValidacion and resumen is None:
+                retirarPendientes()
+                return
+            volcar(generacion)
+            guardarOcupacionSalas(cursor, generacion["staging_id"], generacion["ocupacion"])
+            guardarEstadisticas(cursor, generacion["staging_id"], generacion["estadisticas"])
+            indexarBusqueda(cursor, generacion["staging_id"])
+            connection.commit()
+            publicada = publicarGeneracion(connection, cursor, generacion["campus_id"], generacion["codigo"], generacion["staging_id"], generacion["esperado"])
+            generacion["publicada"] = True # Si no se publicó, publicarGeneracion ya la retiró
+            if not publicada:
+                retirarPendientes()
+                return
+            if resumen is not None:
+                guardarValidacion(*clave, resumen)
+            resultado["historiales"][clave] = generacion["historial"]
+        
+        resultado["exito"] = bool(generaciones)
+
+    except Exception as e:
+        printInfo(f"Error en el escritor del pipeline: {e}", color="error")
+        resultado["error"] = e
+        if connection and connection.is_connected():
+            try:
+                connection.rollback()
+                retirarPendientes()
+            except Error as error:
+                # Las generaciones que queden se limpian en la próxima importación
+                printInfo(f"No se pudieron retirar las generaciones staging: {error}", color="advertencia")
+        
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+        
+        # Seguir consumiendo para no dejar bloqueado al scraping
+        while not terminado:
+            registro = cola.get()
+            terminado = registro is None or "fin" in registro
+
+def iniciarPipeline(objetivo, archivoDiario=None):
+    """
+    Inicia el hilo escritor del pipeline de un objetivo. Si se reanuda una
+    ejecución, primero re-encola los paralelos ya anotados en su diario, ya que
+    la generación staging del intento anterior se descartó.
+    
+    La conexión del escritor se reserva antes de abrir cualquier navegador, así
+    un objetivo nunca retiene navegadores mientras espera una conexión.
+    """
+    semaforoBDD.acquire()
+    objetivo.cola = queue.Queue(maxsize=tamanoColaPipeline)
+    objetivo.resultadoPipeline = {"exito": False, "error": None, "recibidos": 0, "historiales": {}}
+    objetivo.hilo = threading.Thread(target=escritorPipeline, args=(objetivo.cola, objetivo.resultadoPipeline), daemon=True)
+    objetivo.hilo.start()
+    
+    if archivoDiario:
+        for registro in leerDiario(archivoDiario):
+            objetivo.cola.put(registro)
+
+def finalizarPipeline(objetivo, exitoScraping):
+    """Marca el fin del scraping, espera al escritor y retorna si publicó."""
+    objetivo.cola.put({"fin": True, "exito": exitoScraping})
+    objetivo.hilo.join()
+    objetivo.cola = None
+    objetivo.hilo = None
+    semaforoBDD.release()
+    
+    resultado = objetivo.resultadoPipeline
+    if resultado["exito"]:
+        printInfo(f"Pipeline {objetivo}: {resultado['recibidos']} paralelos cargados y publicados.", color="exito")
+    if usarHistorial:
+        for (nombreCampus, periodo), historial in resultado["historiales"].items():
+            intentarRegistrarHistorial(nombreCampus, periodo, historial)
+    return resultado["exito"]
+
+def importarGrupoArchivos(nombreCampus, rutas):
+    """
+    Importa los archivos de un campus a través de un escritor del pipeline (ver
+    `escritorPipeline`): los registros se leen en streaming y se cargan a una
+    generación staging por semestre, que se publica al terminar. Un registro
+    idéntico a uno de un archivo anterior (ej: snapshot y su diario) se importa
+    una sola vez; las filas distintas de un mismo paralelo se conservan todas,
+    como en el scraping.
+    """
+    inicio = time.perf_counter()
+    cola = queue.Queue(maxsize=tamanoColaPipeline)
+    resultado = {"exito": False, "error": None, "recibidos": 0, "historiales": {}}
+    
+    semaforoBDD.acquire()
+    hilo = threading.Thread(target=escritorPipeline, args=(cola, resultado), daemon=True)
+    hilo.start()
+    
+    exitoLectura = True
+    vistos = Counter() # Registros completos ya enviados, con sus repeticiones
+    try:
+        for ruta in rutas:
+            printInfo(f"Leyendo {ruta} ({nombreCampus})...")
+            enArchivo = Counter()
+            for registro in leerArchivoImportacion(ruta):
+                clave = (registro["campus"], registro["periodo"], registro["sigla"], *registro["paralelo"].aJSON())
+                enArchivo[clave] += 1
+                if enArchivo[clave] <= vistos[clave]:
+                    continue
+                cola.put(registro)
+            vistos |= enArchivo
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        printInfo(f"Error leyendo archivos de {nombreCampus}: {e}", "error")
+        exitoLectura = False
+    finally:
+        cola.put({"fin": True, "exito": exitoLectura})
+        hilo.join()
+        semaforoBDD.release()
+    
+    if resultado["exito"]:
+        registrarDuracion("piedmont_importacion_segundos", time.perf_counter() - inicio, modo="archivos")
+        contarMetrica("piedmont_filas_total", resultado["recibidos"], resultado="importada")
+        printInfo(f"{nombreCampus}: {resultado['recibidos']} paralelos importados y publicados.", "exito")
+    return resultado["exito"]
+
+def importarArchivos(rutas):
+    """
+    Importa snapshots JSON y/o diarios NDJSON ya extraídos, sin abrir el SIGA.
+    
+    Los archivos se agrupan por campus (el del primer registro de cada uno) y
+    cada campus se importa en su propio hilo con su propia conexión, dentro de
+    `maxConexionesBDD`. Siempre se publica mediante generaciones staging,
+    independiente de `modoImportacion`. Retorna True si todos los campus se publicaron.
+    """
+    grupos = {}
+    for ruta in rutas:
+        try:
+            lector = leerArchivoImportacion(ruta)
+            primero = next(lector, None)
+            lector.close()
+        except (OSError, ValueError) as e:
+            printInfo(f"No se pudo leer {ruta}: {e}", "error")
+            return False
+        
+        if primero is None:
+            printInfo(f"{ruta} no contiene paralelos, se omite.", "advertencia")
+            continue
+        grupos.setdefault(primero["campus"], []).append(ruta)
+    
+    if not grupos:
+        printInfo("No hay nada que importar.", "error")
+        return False
+    
+    printInfo(f"Importando {sum(len(g) for g in grupos.values())} archivos de {len(grupos)} campus: {', '.join(grupos)}")
+    with ThreadPoolExecutor(max_workers=len(grupos)) as pool:
+        resultados = list(pool.map(lambda grupo: importarGrupoArchivos(*grupo), grupos.items()))
+    
+    if any(resultados):
+        registrarUltimaActualizacion()
+    for nombreCampus, exito in zip(grupos, resultados):
+        if not exito:
+            printInfo(f"{nombreCampus}: importación FALLIDA", "error")
+    return all(resultados)
+
+
+############################################################################
+#                       OBJETIVOS DE SCRAPING                              #
+
+class Objetivo:
+    """
+    Estado de scraping de un (campus, jornada, periodo): checkpoint, snapshot
+    JSON, diario y pipeline propios, de modo que varios objetivos pueden
+    ejecutarse a la vez en el mismo proceso sin compartir nada más que la caché
+    de horarios y los presupuestos de navegadores y conexiones.
+    """
+    def __init__(self, campus, jornada, periodo, pipeline=False):
+        self.campus = campus
+        self.jornada = jornada
+        self.periodo = periodo
+        self.nombreCampus = mapaCampus.get(campus, "Desconocido")
+        self.pipeline = pipeline
+        
+        self.baseDatos = None
+        self.archivoJSON = None
+        self.completados = set()
+        self.bloqueo = threading.Lock()
+        self.diario = None
+        self.registrosDiario = 0
+        self.cola = None
+        self.hilo = None
+        self.resultadoPipeline = None
+    
+    def __str__(self):
+        return f"{self.nombreCampus}/{mapaJornadas.get(self.jornada, self.jornada)} {self.periodo}"
+
+def interpretarObjetivos(especificaciones):
+    """
+    Convierte especificaciones "campus:jornada[:periodo]" (ej: "7:1", "4:2:20251")
+    en tuplas (campus, jornada, periodo). "todos" equivale a todos los campus en
+    ambas jornadas. Sin periodo se usa el semestre actual.
+    """
+    objetivos = []
+    for especificacion in especificaciones:
+        if especificacion == "todos":
+            objetivos.extend((c, j, determinarSemestreActual()) for c in mapaCampus for j in mapaJornadas)
+            continue
+        
+        partes = especificacion.split(":")
+        if len(partes) not in (2, 3) or partes[0] not in mapaCampus or partes[1] not in mapaJornadas:
+            raise ValueError(f"Objetivo inválido: '{especificacion}' (se espera campus:jornada[:periodo])")
+        objetivos.append((partes[0], partes[1], partes[2] if len(partes) == 3 else determinarSemestreActual()))
+    
+    # Sin duplicados, conservando el orden
+    return list(dict.fromkeys(objetivos))
+
+def combinarDatos(grupo):
+    """
+    Une los paralelos de las jornadas de un mismo campus y periodo en una sola
+    estructura, para que se importen como una única generación del semestre.
+    """
+    datos = {}
+    for objetivo in grupo:
+        for nombreCampus, periodos in (objetivo.baseDatos or {}).items():
+            for periodo, asignaturas in periodos.items():
+                destino = datos.setdefault(nombreCampus, {}).setdefault(periodo, {})
+                for sigla, paralelos in asignaturas.items():
+                    existentes = destino.setdefault(sigla, [])
+                    vistos = {p.paralelo for p in existentes}
+                    existentes.extend(p for p in paralelos if p.paralelo not in vistos)
+    return datos
+
+def ejecutarObjetivos(objetivos):
+    """
+    Ejecuta varios objetivos (campus, jornada, periodo) a la vez en un solo proceso.
+    
+    Los objetivos se agrupan por campus y periodo, ya que todas las jornadas de un
+    campus se publican juntas como un solo semestre; cada grupo corre en su propio
+    hilo (ver `prepararTodo`). La cantidad de navegadores y de conexiones a la BDD
+    simultáneas la acotan `maxNavegadores` y `maxConexionesBDD`, así que el
+    tiempo total se acerca al del campus más lento. Retorna True si todos los
+    grupos terminaron con éxito.
+    """
+    grupos = {}
+    for campusObjetivo, jornadaObjetivo, periodo in objetivos:
+        grupos.setdefault((campusObjetivo, periodo), []).append((campusObjetivo, jornadaObjetivo, periodo))
+    
+    # El pipeline publica por objetivo, así que sólo se usa si el campus tiene una sola jornada
+    grupos = [
+        [Objetivo(*objetivo, pipeline=modoPipeline and len(grupo) == 1) for objetivo in grupo]
+        for grupo in grupos.values()
+    ]
+    if modoPipeline and any(len(grupo) > 1 for grupo in grupos):
+        printInfo("Los campus con varias jornadas se importarán al terminar su scraping (sin pipeline).", "advertencia")
+    
+    printInfo(f"Objetivos: {', '.join(str(objetivo) for grupo in grupos for objetivo in grupo)}")
+    cargarCacheHorarios()
+    
+    if len(grupos) == 1:
+        resultados = [prepararTodo(grupos[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(grupos)) as pool:
+            resultados = list(pool.map(prepararTodo, grupos))
+    
+    for grupo, exito in zip(grupos, resultados):
+        for objetivo in grupo:
+            printInfo(f"{objetivo}: {'completado' if exito else 'FALLIDO'}", "exito" if exito else "error")
+    return all(resultados)
+
+
+############################################################################
+#                       MANEJO DE CREDENCIALES                             #
+
+def cargarCredenciales():
+    """Carga usuario y contraseña desde archivo externo."""
+    try:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        cred_path = os.path.normpath(os.path.join(script_dir, '..', 'sedona_config', 'piedmont_cred.txt'))
+        
+        printInfo(f"Cargando credenciales desde: {cred_path}", "info")
+
+        with open(cred_path, 'r', encoding='utf-8') as f:
+            lineas = [line.strip() for line in f.readlines() if line.strip()]
+
+        if len(lineas) < 2:
             printInfo("Archivo de credenciales incompleto.", "error")
             return None, None
 
@@ -321,10 +1566,12 @@ def procesarSala(texto):
     
     return partes[0].replace("Sala ", "").strip()
 
-def extraerHorario(driver):
+def extraerHorario(driver, contador=None):
     """
     Extrae la matriz de horario y la lista de profesores desde el popup o frame.
-    Utiliza esperas explícitas para mayor estabilidad.
+    Utiliza esperas explícitas para mayor estabilidad; una vez cargada la tabla,
+    el frame se lee completo con `page_source` y se parsea localmente.
+    Con `directorioGrabacion` el HTML de la fila `contador` se guarda (ver `grabarHTML`).
     """
     global timeoutWeb
     wait = WebDriverWait(driver, 10) # Espera máxima de 10 segundos para elementos críticos
@@ -333,49 +1580,12 @@ def extraerHorario(driver):
         # Asegurar que estamos en el frame "cuerpo"
         wait.until(EC.frame_to_be_available_and_switch_to_it("cuerpo"))
         
-        # Lógica para extraer profesores (buscando variaciones en el header)
-        try:
-            profesoresHeader = driver.find_element(By.XPATH, "//tr[td[1][contains(text(), 'Profesor') or contains(text(), 'Profesores')]]/td[1]")
-            header_text = profesoresHeader.text.strip()
-            
-            xpath_prof = "//tr[td[1][contains(text(), 'Profesores')]]/td[3]" if "Profesores" in header_text else "//tr[td[1][contains(text(), 'Profesor')]]/td[3]"
-            profesoresFind = driver.find_element(By.XPATH, xpath_prof)
-            profesores = profesoresFind.text
-            listaProfesores = [nombre.strip() for nombre in profesores.split("\n") if nombre.strip()]
-        except Exception:
-            # Si falla la extracción de profes, asumimos lista vacía para no romper el flujo
-            listaProfesores = []
-
-        # Encontrar tabla de horario
-        tablaHorario = wait.until(EC.presence_of_element_located((By.XPATH, '//table[@class="letra8" and @bgcolor="#959595"]')))
-        filas = tablaHorario.find_elements(By.TAG_NAME, "tr")
-        filas = filas[1:] # Omitir encabezado
-
-        # Matriz 10 bloques x 7 días
-        matriz = [["" for _ in range(7)] for _ in range(10)]
-        
-        # Mapeo de filas HTML a filas lógicas de la matriz (índices 0-9)
-        mapaFilas = {
-            1: 0, 20: 1, 39: 2, 58: 3, 77: 4, 96: 5,
-            115: 6, 134: 7, 153: 8, 172: 9
-        }
-
-        filaActual = 1
-        for fila in filas:
-            bloque = fila.find_elements(By.XPATH, './/table[@class="letra7"]')
-            
-            # Si la fila tiene suficientes celdas (bloques de días)
-            if len(bloque) >= 9:
-                # Indices 2 al 8 corresponden a Lunes-Domingo en la estructura visual del SIGA
-                datos_bloques = [procesarSala(bloque[i].text.strip()) for i in range(2, 9)]
-
-                if filaActual in mapaFilas:
-                    idx_matriz = mapaFilas[filaActual]
-                    for i in range(7):
-                        if datos_bloques[i]:
-                            matriz[idx_matriz][i] = datos_bloques[i]
-
-            filaActual += 1
+        # Esperar la tabla de horario antes de leer el HTML
+        wait.until(EC.presence_of_element_located((By.XPATH, '//table[@class="letra8" and @bgcolor="#959595"]')))
+        htmlTexto = driver.page_source
+        matriz, listaProfesores = parsearDetalleHorario(htmlTexto)
+        if contador is not None:
+            grabarHTML(f"horario-{contador}", htmlTexto)
 
         driver.switch_to.default_content()
         return matriz, listaProfesores
@@ -385,13 +1595,16 @@ def extraerHorario(driver):
         driver.switch_to.default_content()
         return None, []
 
-def agregarHorario(contador, fila, driver):
+def agregarHorario(contador, driver):
     """
     Gestiona la apertura de la ventana secundaria (popup) para ver el detalle del horario.
+    El tiempo de abrir, extraer y cerrar el popup se mide por separado.
     """
     try:
-        # Click en el enlace JS
-        enlaceHorario = fila.find_element(By.XPATH, f".//a[contains(@href, 'javascript:Envia(document.form{contador});')]")
+        inicio = time.perf_counter()
+        
+        # Click en el enlace JS (cada fila tiene su propio formN)
+        enlaceHorario = driver.find_element(By.XPATH, f"//a[contains(@href, 'javascript:Envia(document.form{contador});')]")
         enlaceHorario.click()
         
         # Esperar a que se abra la nueva ventana
@@ -402,8 +1615,12 @@ def agregarHorario(contador, fila, driver):
         ventanaHorario = ventanas[1]
         
         driver.switch_to.window(ventanaHorario)
+        abierto = time.perf_counter()
+        registrarDuracion("piedmont_popup_segundos", abierto - inicio, etapa="abrir")
         
-        horario, profesores = extraerHorario(driver)
+        horario, profesores = extraerHorario(driver, contador)
+        extraido = time.perf_counter()
+        registrarDuracion("piedmont_popup_segundos", extraido - abierto, etapa="extraer")
         
         # Cerrar ventana auxiliar si sigue abierta (buena práctica para no saturar memoria)
         try:
@@ -416,6 +1633,7 @@ def agregarHorario(contador, fila, driver):
         
         # Volver al frame correcto
         WebDriverWait(driver, 5).until(EC.frame_to_be_available_and_switch_to_it("frame3"))
+        registrarDuracion("piedmont_popup_segundos", time.perf_counter() - extraido, etapa="cerrar")
 
         return horario, profesores
 
@@ -431,265 +1649,2085 @@ def agregarHorario(contador, fila, driver):
             pass
         return None, []
 
-def scrapingSIGA(estadoPrevio=None):
+def textoNodo(elemento):
+    """
+    Texto visible de un nodo lxml, imitando `.text` de Selenium: cada <br> es un
+    salto de línea y los espacios de cada línea se colapsan.
+    """
+    for br in elemento.iter("br"):
+        br.tail = "\n" + (br.tail or "")
+    lineas = (" ".join(linea.split()) for linea in elemento.text_content().split("\n"))
+    return "\n".join(linea for linea in lineas if linea)
+
+def parsearDetalleHorario(htmlTexto):
+    """
+    Extrae la matriz de horario y la lista de profesores desde el HTML del frame
+    "cuerpo" del detalle de horario. Es el equivalente sin navegador de
+    `extraerHorario`. Retorna (None, []) si el HTML no contiene la tabla de horario.
+    """
+    from lxml import html as lxmlHtml # Sólo el scraping lo necesita, no la importación de snapshots
+    
+    documento = lxmlHtml.fromstring(htmlTexto)
+    
+    # Lógica para extraer profesores (buscando variaciones en el header)
+    listaProfesores = []
+    celdas = documento.xpath("//tr[td[1][contains(text(), 'Profesor') or contains(text(), 'Profesores')]]")
+    if celdas:
+        header_text = textoNodo(celdas[0].xpath("./td[1]")[0])
+        xpath_prof = "//tr[td[1][contains(text(), 'Profesores')]]/td[3]" if "Profesores" in header_text else "//tr[td[1][contains(text(), 'Profesor')]]/td[3]"
+        profesoresFind = documento.xpath(xpath_prof)
+        if profesoresFind:
+            listaProfesores = [nombre.strip() for nombre in textoNodo(profesoresFind[0]).split("\n") if nombre.strip()]
+
+    # Encontrar tabla de horario
+    tablas = documento.xpath('//table[@class="letra8" and @bgcolor="#959595"]')
+    if not tablas:
+        return None, []
+    
+    # Igual que find_elements(By.TAG_NAME, "tr"): incluye filas de tablas anidadas
+    filas = list(tablas[0].iter("tr"))[1:] # Omitir encabezado
+
+    # Matriz 10 bloques x 7 días
+    matriz = [["" for _ in range(7)] for _ in range(10)]
+
+    filaActual = 1
+    for fila in filas:
+        bloque = fila.xpath('.//table[@class="letra7"]')
+        
+        # Si la fila tiene suficientes celdas (bloques de días)
+        if len(bloque) >= 9:
+            # Indices 2 al 8 corresponden a Lunes-Domingo en la estructura visual del SIGA
+            datos_bloques = [procesarSala(textoNodo(bloque[i]).strip()) for i in range(2, 9)]
+
+            if filaActual in mapaFilas:
+                idx_matriz = mapaFilas[filaActual]
+                for i in range(7):
+                    if datos_bloques[i]:
+                        matriz[idx_matriz][i] = datos_bloques[i]
+
+        filaActual += 1
+
+    return matriz, listaProfesores
+
+def parsearListado(htmlTexto):
+    """
+    Parsea la tabla de resultados (frame3) completa en una sola pasada.
+    
+    Retorna la lista de filas de datos (sin separadores), cada una como un dict con
+    sigla, nombre, depto, paralelo, profesStr y cupos, o None si la fila no tiene
+    celdas. El índice de cada fila es el `contadorGlobal` usado por `document.formN`.
+    """
+    from lxml import html as lxmlHtml
+    
+    documento = lxmlHtml.fromstring(htmlTexto)
+    filas = documento.xpath("//table[@class='Celda01']/tbody/tr | //table[@class='Celda01']/tr")
+
+    filasDatos = []
+    for fila in filas:
+        cells = list(fila.iter("td"))
+        
+        # Saltar separadores
+        if cells and cells[0].get("colspan") == "7":
+            continue
+        
+        if len(cells) < 6:
+            filasDatos.append(None)
+            continue
+        
+        filasDatos.append({
+            "sigla": textoNodo(cells[0]),
+            "nombre": textoNodo(cells[1]),
+            "depto": textoNodo(cells[2]),
+            "paralelo": textoNodo(cells[3]),
+            "profesStr": textoNodo(cells[4]), # Solo referencial, se extrae real del popup
+            "cupos": textoNodo(cells[5]),
+        })
+    
+    return filasDatos
+
+def crearSesionHTTP(driver):
+    """
+    Crea una sesión HTTP (keep-alive, con pool de conexiones) que reutiliza las
+    cookies de la sesión ya autenticada en el navegador.
+    """
+    import requests # Sólo el camino rápido HTTP lo necesita
+    
+    sesion = requests.Session()
+    adaptador = requests.adapters.HTTPAdapter(pool_connections=concurrenciaHTTP, pool_maxsize=concurrenciaHTTP)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    sesion.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+    
+    for cookie in driver.get_cookies():
+        sesion.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    
+    return sesion
+
+def obtenerFormulariosHorario(driver):
+    """
+    Lee en una sola llamada al navegador todos los formularios `formN` del listado
+    (frame3): URL de destino, método y campos. Retorna {N: formulario}.
+    """
+    formularios = driver.execute_script("""
+        var resultado = {};
+        for (var i = 0; i < document.forms.length; i++) {
+            var form = document.forms[i];
+            var match = /^form(\\d+)$/.exec(form.getAttribute("name") || "");
+            if (!match) continue;
+            var campos = [];
+            for (var j = 0; j < form.elements.length; j++) {
+                if (form.elements[j].name) campos.push([form.elements[j].name, form.elements[j].value]);
+            }
+            resultado[match[1]] = {action: form.action, method: (form.method || "post").toLowerCase(), campos: campos};
+        }
+        return resultado;
+    """)
+    return {int(indice): formulario for indice, formulario in formularios.items()}
+
+def descargarHorarioHTTP(sesion, formulario, contador=None):
+    """
+    Envía directamente los campos de un `formN` y parsea el detalle de horario.
+    Si la respuesta es el frameset del popup, se descarga el frame "cuerpo".
+    Retorna (horario, profesores) o (None, []) si no se pudo obtener.
+    """
+    from lxml import html as lxmlHtml
+    
+    if formulario["method"] == "get":
+        respuesta = sesion.get(formulario["action"], params=formulario["campos"], timeout=timeoutHTTP)
+    else:
+        respuesta = sesion.post(formulario["action"], data=formulario["campos"], timeout=timeoutHTTP)
+    respuesta.raise_for_status()
+    respuesta.encoding = respuesta.encoding or respuesta.apparent_encoding
+    
+    horario, profesores = parsearDetalleHorario(respuesta.text)
+    if horario is None:
+        frames = lxmlHtml.fromstring(respuesta.text).xpath('//frame[@name="cuerpo"]/@src')
+        if not frames:
+            return None, []
+        
+        respuesta = sesion.get(urljoin(respuesta.url, frames[0]), timeout=timeoutHTTP)
+        respuesta.raise_for_status()
+        respuesta.encoding = respuesta.encoding or respuesta.apparent_encoding
+        horario, profesores = parsearDetalleHorario(respuesta.text)
+    
+    if horario is not None and contador is not None:
+        grabarHTML(f"horario-{contador}", respuesta.text)
+    return horario, profesores
+
+def precargarHorariosHTTP(sesion, formularios, contadores):
     """
-    Función principal que orquesta la navegación y extracción de datos del SIGA.
+    Descarga en paralelo (hasta `concurrenciaHTTP` a la vez) el detalle de horario
+    de las filas indicadas. Retorna {contador: (horario, profesores)} sólo con las
+    descargas exitosas; el resto queda para el popup de Selenium.
     """
-    global chromeDriverService, opcionesChromeDriver, baseDatosGlobal
-    global usuarioSIGA, passwordSIGA, campus, jornada, timeoutWeb, archivoJSONActual
+    def descargar(contador):
+        try:
+            with medirFase("piedmont_horario_http_segundos"):
+                return contador, descargarHorarioHTTP(sesion, formularios[contador], contador)
+        except Exception as e:
+            printInfo(f"Descarga directa de horario falló para fila {contador}: {e}", "advertencia")
+            return contador, (None, [])
+
+    pendientes = [contador for contador in contadores if contador in formularios]
+    with ThreadPoolExecutor(max_workers=concurrenciaHTTP) as pool:
+        resultados = dict(pool.map(descargar, pendientes))
     
-    printInfo(" === Comenzando la preparación de scraping === \n", color="info")
+    return {contador: resultado for contador, resultado in resultados.items() if resultado[0] is not None}
+
+def aplicarPerfilLigero(opciones):
+    """
+    Perfil de Chrome liviano para hosts pequeños (Raspberry Pi): sin imágenes,
+    GPU, extensiones ni tráfico en segundo plano, y con carga "eager" (no se
+    espera a subrecursos). El scraping sólo lee el HTML, así que nada de esto
+    cambia lo que se extrae.
+    """
+    for argumento in (
+        "--disable-gpu",
+        "--disable-extensions",
+        "--disable-background-networking",
+        "--disable-background-timer-throttling",
+        "--disable-component-update",
+        "--disable-default-apps",
+        "--disable-sync",
+        "--mute-audio",
+        "--no-first-run",
+        "--blink-settings=imagesEnabled=false",
+    ):
+        opciones.add_argument(argumento)
     
+    # Las preferencias valen para todas las ventanas, incluidos los popups de horario
+    opciones.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.notifications": 2,
+    })
+    opciones.page_load_strategy = "eager"
+
+def bloquearRecursos(driver):
+    """
+    Bloquea por CDP las hojas de estilo, fuentes e imágenes que el perfil no
+    alcanza a cubrir. No es crítico: si falla, el navegador sigue igual.
+    """
     try:
-       printInfo("Iniciando ChromeDriver ...")
-       driver = webdriver.Chrome(service=chromeDriverService, options=opcionesChromeDriver)
-       driver.maximize_window()
-       wait = WebDriverWait(driver, 10)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": recursosBloqueados})
     except Exception as e:
-        printInfo(f"Error crítico iniciando ChromeDriver: {e}", "error")
+        printInfo(f"No se pudo activar el bloqueo de recursos: {e}", "advertencia")
+
+def iniciarNavegador():
+    """Crea una sesión de ChromeDriver con la configuración global."""
+    printInfo("Iniciando ChromeDriver ...")
+    driver = webdriver.Chrome(service=chromeDriverService, options=opcionesChromeDriver)
+    driver.maximize_window()
+    if navegadorLigero:
+        bloquearRecursos(driver)
+    return driver
+
+def limpiarVentanas(driver):
+    """Cierra los popups que hayan quedado abiertos y vuelve a la ventana principal."""
+    principal = driver.window_handles[0]
+    for ventana in driver.window_handles[1:]:
+        driver.switch_to.window(ventana)
+        driver.close()
+    driver.switch_to.window(principal)
+    driver.switch_to.default_content()
+
+def obtenerNavegador():
+    """
+    Toma un navegador tibio del pool (modo demonio), descartando los que ya no
+    responden, o inicia uno nuevo si no hay ninguno disponible.
+    """
+    while True:
+        try:
+            driver = poolNavegadores.get_nowait()
+        except queue.Empty:
+            return iniciarNavegador()
+        
+        try:
+            limpiarVentanas(driver)
+            return driver
+        except Exception:
+            printInfo("Navegador del pool sin respuesta, se descarta.", "advertencia")
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+def liberarNavegador(driver):
+    """En modo demonio el navegador vuelve al pool con su sesión abierta; si no, se cierra."""
+    if modoDemonio and poolNavegadores.qsize() < maxNavegadores:
+        poolNavegadores.put(driver)
+        return
+    
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    sesionesSIGA.discard(getattr(driver, "session_id", None))
+    printInfo("Navegador cerrado.")
+
+def cerrarNavegadores():
+    """Cierra todos los navegadores del pool."""
+    while not poolNavegadores.empty():
+        driver = poolNavegadores.get_nowait()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    sesionesSIGA.clear()
+
+def sesionSIGAActiva(driver):
+    """
+    Revisa si el navegador sigue con la sesión del SIGA abierta, cargando el menú
+    y buscando el enlace de horarios (si expiró, el SIGA no lo muestra).
+    """
+    if getattr(driver, "session_id", None) not in sesionesSIGA:
+        return False
+    try:
+        driver.switch_to.default_content()
+        driver.get(f"{urlSIGA}/pag/menu.jsp")
+        WebDriverWait(driver, timeoutWeb).until(EC.element_to_be_clickable((By.XPATH, "//a[contains(@href, 'insc_procesos.jsp')]")))
+        return True
+    except Exception:
+        sesionesSIGA.discard(driver.session_id)
         return False
+
+def iniciarSesionSIGA(driver):
+    """Login en el SIGA; deja el driver en el menú principal."""
+    wait = WebDriverWait(driver, 10)
+    inicio = time.perf_counter()
     
-    inicioTiempo = time.time()
+    printInfo("Navegando al portal SIGA...")
+    driver.get(f"{urlSIGA}/pag/home.jsp")
+    
+    # Bypass manual para el CAPTCHA en caso de estar rate-limited (toma de ramos, etc)
+    # printInfo("Por favor, resuelva el CAPTCHA de forma manual en la ventana del navegador.")
+    # printInfo("Una vez resuelto, presione enter para comenzar la actualización para la base de datos.")
+    # input("")
+
+    # Login
+    wait.until(EC.presence_of_element_located((By.NAME, "login"))).send_keys(usuarioSIGA)
+    driver.find_element(By.NAME, "passwd").send_keys(passwordSIGA)
+    driver.find_element(By.XPATH, "//a[contains(@href, 'ValidaLogin')]").click()
+
+    # Navegación hacia menús
+    driver.get(f"{urlSIGA}/pag/menu.jsp")
+    sesionesSIGA.add(getattr(driver, "session_id", None))
+    registrarDuracion("piedmont_login_segundos", time.perf_counter() - inicio)
+
+def abrirListadoSIGA(driver, objetivo):
+    """
+    Navega hasta la tabla de resultados de asignaturas, iniciando sesión en el
+    SIGA sólo si el navegador no tiene una sesión vigente (ver `sesionSIGAActiva`).
+    Deja el driver posicionado en el frame3 y retorna (nombreCampus, filasDatos),
+    con filasDatos según `parsearListado`.
+    """
+    wait = WebDriverWait(driver, 10)
+    
+    if sesionSIGAActiva(driver):
+        printInfo("Reutilizando sesión abierta del SIGA.")
+    else:
+        iniciarSesionSIGA(driver)
+    inicio = time.perf_counter()
+    
+    # Click en "Horario Asignaturas"
+    wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(@href, 'insc_procesos.jsp')]"))).click()
+
+    # --- Frame 1: Configuración de búsqueda ---
+    wait.until(EC.frame_to_be_available_and_switch_to_it("frame1"))
+    
+    Select(driver.find_element(By.NAME, "periodo")).select_by_value(objetivo.periodo)
+    Select(driver.find_element(By.NAME, "jornada")).select_by_value(objetivo.jornada)
+    Select(driver.find_element(By.NAME, "sede")).select_by_value(objetivo.campus)
+    printInfo(f"Configurando búsqueda: {objetivo}")
+
+    # --- Frame 5: Opciones de listado ---
+    driver.switch_to.default_content()
+    wait.until(EC.frame_to_be_available_and_switch_to_it("frame5"))
+    
+    Select(driver.find_element(By.NAME, "op")).select_by_value("1")      # Todas las asignaturas
+    Select(driver.find_element(By.NAME, "op_asig")).select_by_value("1") # Ordenar por nombre
+    
+    driver.find_element(By.NAME, "form_f1").submit()
+
+    # --- Frame 3: Tabla de resultados ---
+    driver.switch_to.default_content()
+    # Espera extendida aquí porque la carga de la tabla puede ser lenta
+    WebDriverWait(driver, 20).until(EC.frame_to_be_available_and_switch_to_it("frame3"))
+    
+    # Se lee el frame completo una sola vez en vez de consultar celda por celda
+    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.XPATH, "//table[@class='Celda01']")))
+    htmlListado = driver.page_source
+    grabarHTML("listado", htmlListado)
+    filasDatos = parsearListado(htmlListado)
+    registrarDuracion("piedmont_listado_segundos", time.perf_counter() - inicio)
+    printInfo(f"Se encontraron {len(filasDatos)} filas potenciales para procesar ({objetivo}).")
+    
+    return objetivo.nombreCampus, filasDatos
+
+def contextoPrevio(filasDatos, inicio):
+    """
+    Busca hacia atrás desde `inicio` la última fila con sigla explícita, para que un
+    fragmento o una reanudación que parte a mitad de una asignatura sepa a qué
+    asignatura pertenecen sus primeros paralelos.
+    """
+    for fila in reversed(filasDatos[:inicio]):
+        if fila and fila["sigla"]:
+            return {
+                "ultimaSigla": fila["sigla"],
+                "ultimoNombre": fila["nombre"],
+                "ultimoDepto": fila["depto"],
+            }
+    return {"ultimaSigla": None, "ultimoNombre": None, "ultimoDepto": None}
+
+def procesarFila(driver, fila, contadorGlobal, contexto, precargado=None):
+    """
+    Extrae una fila del listado (ya parseada por `parsearListado`) y su horario
+    (popup, o `precargado` si ya se obtuvo por descarga directa).
+    
+    `contexto` guarda la última sigla/nombre/departamento vistos, necesarios para
+    los paralelos que vienen sin sigla explícita, y se actualiza en el lugar.
+    Retorna (True, (keySigla, objAsignatura)) con el `Paralelo` extraído,
+    (True, None) si la fila no tiene datos, o (False, None) si falló la
+    extracción del horario.
+    """
+    if fila is None:
+        return True, None
+    
+    sigla = fila["sigla"]
+    nombre = fila["nombre"]
+    depto = fila["depto"]
+    paralelo = fila["paralelo"]
+    profesStr = fila["profesStr"]
+    cupos = fila["cupos"]
+    
+    if sigla:
+        print(f"")
+        printInfo(f"ID {contadorGlobal}")
+        printInfo(f"Nombre: {nombre}", nivel="debug")
+        printInfo(f"Sigla: {sigla}, Paralelo: {paralelo}")
+        printInfo(f"Departamento: {depto}", nivel="debug")
+        printInfo(f"Profesor: {profesStr}", nivel="debug")
+    else:
+        printInfo(f"Asignatura: {contexto['ultimaSigla']}, Paralelo: {paralelo}")
+    
+    # Extracción profunda (Popup de horario)
+    if precargado:
+        horario, profesores = precargado
+    else:
+        horario, profesores = agregarHorario(contadorGlobal, driver)
+    
+    if horario is None:
+        printInfo(f"Fallo crítico obteniendo horario para fila {contadorGlobal}", "error")
+        return False, None
+    
+    objAsignatura = Paralelo.desdeHorario(
+        nombre if sigla else contexto['ultimoNombre'],
+        depto if sigla else contexto['ultimoDepto'],
+        paralelo,
+        profesores,
+        cupos,
+        horario
+    )
+
+    keySigla = sigla if sigla else contexto['ultimaSigla']
+
+    # Actualizar punteros de "último visto" para paralelos sin sigla explícita
+    if sigla:
+        contexto['ultimaSigla'] = sigla
+        contexto['ultimoNombre'] = nombre
+        contexto['ultimoDepto'] = depto
+    printInfo(f"Horario extraído (P{paralelo})")
+    
+    return True, (keySigla, objAsignatura)
+
+def registrarParalelo(objetivo, contadorGlobal, keySigla, objAsignatura):
+    """
+    Agrega un paralelo extraído a los datos del objetivo y lo anota en su diario
+    de checkpoint. Es seguro llamarla desde varios trabajadores a la vez.
+    """
+    registro = {
+        "contador": contadorGlobal,
+        "campus": objetivo.nombreCampus,
+        "periodo": objetivo.periodo,
+        "sigla": keySigla,
+        "paralelo": objAsignatura,
+    }
+    
+    with objetivo.bloqueo:
+        # En modo pipeline los paralelos no se retienen: el diario es el registro
+        if not objetivo.pipeline:
+            aplicarRegistro(objetivo, registro)
+        objetivo.completados.add(contadorGlobal)
+
+        # Persistencia incremental: O(1) por fila, la compactación es periódica
+        registrarEnDiario(objetivo, registro)
+    
+    # Fuera del lock: si la cola está llena, el trabajador espera al escritor
+    if objetivo.pipeline:
+        objetivo.cola.put(registro)
+
+def recuperarSesion(driver, objetivo):
+    """
+    Deja un navegador de nuevo en el listado tras un fallo: cierra popups que hayan
+    quedado abiertos, vuelve a la ventana principal y rehace la navegación con el
+    mismo driver (y el login, si la sesión expiró). Si el navegador ya no
+    responde, se reemplaza por uno nuevo. Retorna (driver, filasDatos).
+    """
+    try:
+        limpiarVentanas(driver)
+        return driver, abrirListadoSIGA(driver, objetivo)[1]
+    except Exception as e:
+        printInfo(f"No se pudo reutilizar el navegador ({e}), iniciando uno nuevo...", "advertencia")
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        driver = iniciarNavegador()
+        return driver, abrirListadoSIGA(driver, objetivo)[1]
+
+def esperaReintento(intento):
+    """Backoff exponencial (acotado) antes del reintento número `intento` (desde 0)."""
+    return min(retardoBaseReintento * 2 ** intento, retardoMaxReintento)
+
+def rangoFragmento(total, fragmentos, indice):
+    """Rango [inicio, fin) de filas que le corresponde al fragmento `indice`."""
+    tamano = math.ceil(total / fragmentos) if fragmentos else total
+    return min(indice * tamano, total), min((indice + 1) * tamano, total)
+
+def trabajadorScraping(objetivo, indiceTrabajador):
+    """
+    Sesión de navegador independiente que procesa su fragmento de filas.
+    
+    Cada trabajador inicia sesión por su cuenta y carga el mismo listado; como el
+    orden de las filas es el mismo para todos, el fragmento se calcula sobre los
+    mismos índices `contadorGlobal`. Mientras el navegador está abierto ocupa un
+    cupo de `maxNavegadores`.
+    
+    Una fila que falla se reintenta hasta `reintentosFila` veces con backoff
+    exponencial; desde el segundo reintento se recupera la sesión (ver
+    `recuperarSesion`). Si aun así falla, pasa a una lista de filas fallidas que
+    se reintenta al final del fragmento. Retorna la cantidad de filas procesadas,
+    o None si quedaron filas sin extraer.
+    """
+    # Escalonar los logins para no llegar todos a la vez al SIGA
+    time.sleep(indiceTrabajador * escalonamientoTrabajadores)
+    
+    semaforoNavegadores.acquire()
+    try:
+        driver = obtenerNavegador()
+    except Exception as e:
+        semaforoNavegadores.release()
+        printInfo(f"Error crítico iniciando ChromeDriver: {e}", "error")
+        return None
+
+    procesadas = 0
+    periodo = objetivo.periodo
+    sesion = None
+    fallidas = []
+    
+    def prepararHTTP():
+        # Vía rápida: detalle de horario por HTTP directo con las cookies del navegador
+        nonlocal sesion, formularios
+        if not usarHTTPDirecto:
+            return
+        try:
+            sesion = crearSesionHTTP(driver)
+            formularios = obtenerFormulariosHorario(driver)
+        except Exception as e:
+            printInfo(f"No se pudo preparar la descarga directa, se usarán popups: {e}", "advertencia")
+            sesion = None
+    
+    def intentarFila(contadorGlobal, contexto, precargado=None):
+        # Reintentos de una fila; la sesión se recupera a partir del segundo. Un fallo
+        # de la recuperación cuenta como un intento más, así la fila termina en la
+        # lista de fallidas en vez de detener al trabajador
+        nonlocal driver, filasDatos
+        for intento in range(reintentosFila + 1):
+            if intento > 0:
+                espera = esperaReintento(intento - 1)
+                printInfo(f"Reintentando fila {contadorGlobal} en {espera}s ({intento}/{reintentosFila})...", "advertencia")
+                contarMetrica("piedmont_reintentos_total")
+                time.sleep(espera)
+            try:
+                if intento > 1:
+                    contarMetrica("piedmont_recuperaciones_sesion_total")
+                    driver, filasRecuperadas = recuperarSesion(driver, objetivo)
+                    if len(filasRecuperadas) != len(filasDatos):
+                        raise RuntimeError("El listado cambió durante la recuperación de sesión")
+                    filasDatos = filasRecuperadas
+                    prepararHTTP()
+                exito, resultado = procesarFila(driver, filasDatos[contadorGlobal], contadorGlobal, contexto, precargado if intento == 0 else None)
+            except Exception as e:
+                printInfo(f"Error procesando fila {contadorGlobal}: {e}", "error")
+                continue
+            if exito:
+                return True, resultado
+        return False, None
+    
+    def registrar(contadorGlobal, resultado):
+        nonlocal procesadas
+        if resultado:
+            registrarParalelo(objetivo, contadorGlobal, *resultado)
+            if usarCacheHorarios and contadorGlobal not in desdeCache:
+                objAsignatura = resultado[1]
+                actualizarCacheHorario(
+                    nombreCampus, periodo, filasDatos[contadorGlobal], asignaturas[contadorGlobal], posiciones[contadorGlobal],
+                    objAsignatura.horario(), list(objAsignatura.profesores)
+                )
+        procesadas += 1
+        contarMetrica("piedmont_filas_total", resultado="extraida" if resultado else "vacia")
     
     try:
-        printInfo("Navegando al portal SIGA...")
-        
-        # Configuración de reanudación
-        contadorInicio = 0
-        if estadoPrevio:
-            contadorInicio = estadoPrevio.get('ultimo_contador', -1) + 1
-            archivoJSONActual = estadoPrevio.get('archivo_json')
-        
-        periodo = determinarSemestreActual()
-        driver.get("https://siga.usm.cl/pag/home.jsp")
-        
-        # Bypass manual para el CAPTCHA en caso de estar rate-limited (toma de ramos, etc)
-        # printInfo("Por favor, resuelva el CAPTCHA de forma manual en la ventana del navegador.")
-        # printInfo("Una vez resuelto, presione enter para comenzar la actualización para la base de datos.")
-        # input("")
+        nombreCampus, filasDatos = abrirListadoSIGA(driver, objetivo)
+        
+        total = len(filasDatos) if limite == 0 else min(limite, len(filasDatos))
+        inicio, fin = rangoFragmento(total, trabajadoresScraping, indiceTrabajador)
+        if trabajadoresScraping > 1:
+            printInfo(f"{objetivo}, trabajador {indiceTrabajador}: filas {inicio} a {fin - 1}.")
+        
+        formularios = {}
+        prepararHTTP()
+        precargados = {}
+        desdeCache = set()
+        asignaturas = asignaturaPorFila(filasDatos) if usarCacheHorarios else None
+        posiciones = posicionPorFila(filasDatos, asignaturas) if usarCacheHorarios else None
+        
+        contexto = None
+        for contadorGlobal in range(inicio, fin):
+            # Control de reanudación
+            if contadorGlobal in objetivo.completados:
+                contexto = None
+                continue
+            
+            if contexto is None:
+                contexto = contextoPrevio(filasDatos, contadorGlobal)
+            
+            # Precarga por ventanas para ir guardando avance mientras se descarga.
+            # Las filas sin cambios salen de la caché y no se descargan ni se abren.
+            if (sesion or usarCacheHorarios) and (contadorGlobal - inicio) % ventanaHTTP == 0:
+                ventana = [c for c in range(contadorGlobal, min(contadorGlobal + ventanaHTTP, fin)) if c not in objetivo.completados]
+                precargados = {}
+                if usarCacheHorarios:
+                    precargados = consultarCacheHorarios(nombreCampus, periodo, filasDatos, asignaturas, posiciones, ventana)
+                    desdeCache = set(precargados)
+                    contarMetrica("piedmont_horarios_total", len(desdeCache), origen="cache")
+                if sesion:
+                    descargados = precargarHorariosHTTP(sesion, formularios, [c for c in ventana if c not in desdeCache])
+                    contarMetrica("piedmont_horarios_total", len(descargados), origen="http")
+                    precargados.update(descargados)
+
+            exito, resultado = intentarFila(contadorGlobal, contexto, precargados.pop(contadorGlobal, None))
+            if exito:
+                registrar(contadorGlobal, resultado)
+            else:
+                # Sin la fila, el contexto de las siguientes se reconstruye desde el listado
+                printInfo(f"Fila {contadorGlobal} agotó sus reintentos, se dejará para el final.", "advertencia")
+                contarMetrica("piedmont_filas_total", resultado="segunda_pasada")
+                fallidas.append(contadorGlobal)
+                contexto = None
+            
+            if retardoCortesia:
+                time.sleep(retardoCortesia)
+        
+        # Segunda pasada sobre las filas fallidas, con una sesión recién recuperada
+        if fallidas:
+            printInfo(f"Segunda pasada sobre {len(fallidas)} filas fallidas de {objetivo}...", "advertencia")
+            try:
+                driver, filasRecuperadas = recuperarSesion(driver, objetivo)
+                if len(filasRecuperadas) == len(filasDatos):
+                    filasDatos = filasRecuperadas
+                    prepararHTTP()
+            except Exception as e:
+                # Cada fila vuelve a intentar recuperar la sesión en sus reintentos
+                printInfo(f"No se pudo recuperar la sesión antes de la segunda pasada: {e}", "advertencia")
+            for contadorGlobal in fallidas:
+                exito, resultado = intentarFila(contadorGlobal, contextoPrevio(filasDatos, contadorGlobal))
+                if not exito:
+                    printInfo(f"Fila {contadorGlobal} sigue fallando tras la segunda pasada.", "error")
+                    contarMetrica("piedmont_filas_total", resultado="fallida")
+                    return None
+                registrar(contadorGlobal, resultado)
+
+    except Exception as e:
+        printInfo(f"Error general en ciclo de scraping: {e}", "error")
+        return None
+        
+    finally:
+        liberarNavegador(driver)
+        semaforoNavegadores.release()
+    
+    return procesadas
+
+def scrapingSIGA(objetivo, estadoPrevio=None):
+    """
+    Función principal que orquesta la navegación y extracción de datos del SIGA
+    para un objetivo (campus, jornada, periodo).
+    
+    Con `trabajadoresScraping` > 1 las filas se reparten en fragmentos contiguos
+    entre varias sesiones de navegador que corren en paralelo; sus resultados se
+    combinan en `objetivo.baseDatos`.
+    
+    Si el objetivo usa pipeline, los paralelos se van cargando en la BDD mientras
+    se extraen (ver `escritorPipeline`) y la publicación ocurre al terminar.
+    """
+    printInfo(f" === Comenzando la preparación de scraping ({objetivo}) === \n", color="info")
+    
+    inicioTiempo = time.time()
+    
+    # Configuración de reanudación
+    objetivo.completados = set()
+    if estadoPrevio:
+        objetivo.archivoJSON = estadoPrevio.get('archivo_json')
+        if 'completados' in estadoPrevio:
+            objetivo.completados = set(estadoPrevio['completados'])
+        else:
+            objetivo.completados = set(range(estadoPrevio.get('ultimo_contador', -1) + 1))
+    
+    if objetivo.pipeline:
+        iniciarPipeline(objetivo, rutaDiario(objetivo.archivoJSON) if estadoPrevio else None)
+    
+    try:
+        if trabajadoresScraping <= 1:
+            resultados = [trabajadorScraping(objetivo, 0)]
+        else:
+            printInfo(f"Iniciando {trabajadoresScraping} trabajadores de scraping en paralelo...")
+            with ThreadPoolExecutor(max_workers=trabajadoresScraping) as pool:
+                resultados = list(pool.map(lambda i: trabajadorScraping(objetivo, i), range(trabajadoresScraping)))
+    except Exception:
+        resultados = [None]
+        raise
+    finally:
+        cerrarDiario(objetivo)
+        guardarCacheHorarios()
+        if objetivo.pipeline and not finalizarPipeline(objetivo, None not in resultados):
+            resultados.append(None)
+    
+    if any(resultado is None for resultado in resultados):
+        return False
+
+    # Resumen final
+    duracion = time.time() - inicioTiempo
+    minutos, segundos = segundosAMinutos(duracion)
+    registrarDuracion("piedmont_scraping_segundos", duracion, objetivo=f"{objetivo.campus}:{objetivo.jornada}")
+    
+    printInfo(f"Scraping de {objetivo} finalizado en {minutos}m {math.floor(segundos)}s. Total procesado: {sum(resultados)} ítems.", "exito")
+    return True
+
+
+def refrescarCupos(objetivo):
+    """
+    Refresco rápido de cupos de un objetivo: lee sólo la tabla de resultados del
+    SIGA (sigla, paralelo, cupos) en una pasada y actualiza en lote los cupos del
+    semestre ya publicado, sin abrir ningún detalle de horario.
+    
+    Sólo los paralelos que aparecen en el listado pero no existen en la BDD se
+    extraen completos (horario y profesores) y se insertan. Si el semestre aún no
+    existe en la BDD, se requiere un scraping completo y se retorna False. Antes de
+    escribir, el semestre pasa por la misma validación que una importación completa.
+    
+    Ocupa una conexión y un navegador del presupuesto compartido, reservados en ese
+    orden (el mismo que el pipeline) para no bloquearse con otros objetivos.
+    """
+    with semaforoBDD, semaforoNavegadores:
+        return refrescarCuposObjetivo(objetivo)
+
+def refrescarCuposObjetivo(objetivo):
+    """Cuerpo de `refrescarCupos`, con la conexión y el navegador ya reservados."""
+    printInfo(f" === Comenzando el refresco rápido de cupos ({objetivo}) === \n", color="info")
+    inicioTiempo = time.time()
+    periodo = objetivo.periodo
+    codigo_semestre = f"{periodo[:4]}-{periodo[4]}"
+    
+    try:
+        driver = obtenerNavegador()
+    except Exception as e:
+        printInfo(f"Error crítico iniciando ChromeDriver: {e}", "error")
+        return False
+    
+    connection = None
+    cursor = None
+    try:
+        nombreCampus, filasDatos = abrirListadoSIGA(driver, objetivo)
+        
+        # (sigla, paralelo) -> [contadorGlobal], completando la sigla de los paralelos sin ella.
+        # Un paralelo puede ocupar varias filas del listado (ej: un horario por fila)
+        listado = {}
+        ultimaSigla = None
+        for contadorGlobal, fila in enumerate(filasDatos):
+            if fila is None:
+                continue
+            ultimaSigla = fila["sigla"] or ultimaSigla
+            listado.setdefault((ultimaSigla, fila["paralelo"]), []).append(contadorGlobal)
+        
+        connection = mysql.connector.connect(**config)
+        cursor = connection.cursor()
+        
+        cursor.execute(
+            """SELECT s.id FROM semestre s JOIN campus c ON s.campus_id = c.id
+            WHERE c.nombre = %s AND s.codigo = %s""",
+            (nombreCampus, codigo_semestre)
+        )
+        semestre_result = cursor.fetchone()
+        if not semestre_result:
+            printInfo(f"El semestre {codigo_semestre} no existe en la BDD. Se requiere un scraping completo.", "error")
+            return False
+        semestre_id = semestre_result[0]
+        
+        cursor.execute(
+            """SELECT a.codigo, p.paralelo, p.id, p.asignatura_id, p.cupos
+            FROM paralelo p JOIN asignatura a ON p.asignatura_id = a.id
+            WHERE a.semestre_id = %s""",
+            (semestre_id,)
+        )
+        actual = {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+        
+        # Paralelos nuevos: extracción completa sólo de esas filas (todas las de cada
+        # paralelo, para no perder los bloques de las filas repetidas)
+        nuevos = sorted(contadorGlobal for clave, contadores in listado.items() if clave not in actual for contadorGlobal in contadores)
+        lote = []
+        if nuevos:
+            printInfo(f"{len(nuevos)} filas de paralelos nuevos, extrayendo su horario...", "advertencia")
+            precargados = {}
+            if usarHTTPDirecto:
+                try:
+                    precargados = precargarHorariosHTTP(crearSesionHTTP(driver), obtenerFormulariosHorario(driver), nuevos)
+                except Exception as e:
+                    printInfo(f"No se pudo preparar la descarga directa, se usarán popups: {e}", "advertencia")
+            
+            for contadorGlobal in nuevos:
+                contexto = contextoPrevio(filasDatos, contadorGlobal)
+                exito, resultado = procesarFila(driver, filasDatos[contadorGlobal], contadorGlobal, contexto, precargados.get(contadorGlobal))
+                if not exito:
+                    printInfo(f"Se omite la fila {contadorGlobal}; quedará para el próximo scraping completo.", "advertencia")
+                elif resultado:
+                    lote.append(resultado)
+        
+        # Validación antes de escribir, como en una importación completa: las filas del
+        # listado con sus cupos y el horario ya publicado de cada paralelo existente,
+        # más los paralelos nuevos completos
+        resumen = None
+        if usarValidacion:
+            cursor.execute(
+                """SELECT a.codigo, p.paralelo, h.dia_semana, h.bloque_inicio, h.sala
+                FROM horario h
+                JOIN paralelo p ON h.paralelo_id = p.id
+                JOIN asignatura a ON p.asignatura_id = a.id
+                WHERE a.semestre_id = %s""",
+                (semestre_id,)
+            )
+            bloquesPublicados = {}
+            for codigo_asig, paralelo, dia, bloque, sala in cursor.fetchall():
+                bloquesPublicados.setdefault((codigo_asig, paralelo), []).append((dia, bloque, sala))
+            
+            validacion = nuevaValidacion()
+            for clave, contadores in listado.items():
+                if clave not in actual:
+                    continue
+                for posicion, contadorGlobal in enumerate(contadores):
+                    fila = filasDatos[contadorGlobal]
+                    bloques = bloquesPublicados.get(clave, ()) if posicion == 0 else ()
+                    acumularValidacion(validacion, clave[0], Paralelo(fila["nombre"], fila["depto"], clave[1], (), fila["cupos"], bloques))
+            for codigo_asig, paralelo_data in lote:
+                acumularValidacion(validacion, codigo_asig, paralelo_data)
+            
+            resumen = validarPublicacion(nombreCampus, periodo, validacion)
+            if resumen is None:
+                printInfo(f"No se actualizan los cupos de {nombreCampus} {codigo_semestre}.", "error")
+                return False
+        
+        # Cupos de paralelos existentes (upsert multi-fila por clave primaria)
+        filas_cupos = []
+        for clave, contadores in listado.items():
+            if clave in actual:
+                paralelo_id, asignatura_id, cupos = actual[clave]
+                cupos_nuevos = filasDatos[contadores[-1]]["cupos"]
+                if str(cupos) != cupos_nuevos:
+                    filas_cupos.append((paralelo_id, asignatura_id, clave[1], cupos_nuevos))
+        
+        ejecutarEnLotes(
+            cursor,
+            """
+            INSERT INTO paralelo (id, asignatura_id, paralelo, cupos)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE cupos = VALUES(cupos)
+            """,
+            filas_cupos
+        )
+        
+        if nuevos:
+            cursor.execute("SELECT nombre, id FROM profesor")
+            cache_profesores = {row[0]: row[1] for row in cursor.fetchall()}
+            ocupacion = {}
+            insertarLoteParalelos(cursor, semestre_id, lote, cache_profesores, ocupacion=ocupacion)
+            guardarOcupacionSalas(cursor, semestre_id, ocupacion, acumular=True)
+            
+            # Las estadísticas quedan desactualizadas: estadisticas.php vuelve a
+            # calcularlas en línea hasta la próxima importación completa
+            cursor.execute("DELETE FROM estadisticas_semestre WHERE semestre_id = %s", (semestre_id,))
+            if lote:
+                indexarBusqueda(cursor, semestre_id)
+        
+        connection.commit()
+        registrarUltimaActualizacion(connection)
+        if resumen is not None:
+            guardarValidacion(nombreCampus, periodo, resumen)
+        
+        if usarHistorial:
+            # Sólo cupos para los existentes (el horario no se volvió a leer)
+            historial = nuevoHistorial()
+            for clave, contadores in listado.items():
+                if clave in actual:
+                    historial[claveHistorial(*clave)] = (filasDatos[contadores[-1]]["cupos"].strip(), None)
+            for codigo_asig, paralelo_data in lote:
+                acumularHistorial(historial, codigo_asig, paralelo_data)
+            intentarRegistrarHistorial(nombreCampus, periodo, historial, parcial=True)
+        
+        ausentes = len(set(actual) - set(listado))
+        duracion = time.time() - inicioTiempo
+        minutos, segundos = segundosAMinutos(duracion)
+        printInfo(
+            f"Cupos actualizados en {minutos}m {math.floor(segundos)}s: {len(filas_cupos)} cambios, "
+            f"{len(set((codigo_asig, paralelo_data.paralelo) for codigo_asig, paralelo_data in lote))} paralelos nuevos, "
+            f"{ausentes} paralelos ya no aparecen en el listado.",
+            "exito"
+        )
+        return True
+    
+    except Error as e:
+        printInfo(f"Error de Base de Datos refrescando cupos: {e}", color="error")
+        if connection and connection.is_connected():
+            connection.rollback()
+        return False
+    
+    except Exception as e:
+        printInfo(f"Error general refrescando cupos: {e}", "error")
+        return False
+    
+    finally:
+        liberarNavegador(driver)
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+
+############################################################################
+#                        MANEJO DE ARCHIVOS                                #
+
+def guardarEstado(objetivo, completados):
+    """Guarda un checkpoint del objetivo para poder reanudar si el script falla."""
+    estado = {
+        'campus': objetivo.campus,
+        'jornada': objetivo.jornada,
+        'periodo': objetivo.periodo,
+        'ultimo_contador': max(completados, default=-1),
+        'completados': sorted(completados),
+        'archivo_json': objetivo.archivoJSON,
+        'archivo_diario': rutaDiario(objetivo.archivoJSON)
+    }
+    try:
+        escribirAtomico(rutaEstado(objetivo), lambda f: json.dump(estado, f))
+    except IOError:
+        pass # No es crítico si falla esto
+
+def cargarEstado(objetivo):
+    """
+    Carga el checkpoint anterior del objetivo si coincide con su configuración.
+    El estado se reconstruye con el último snapshot JSON más los registros del
+    diario que se anotaron después de él.
+    """
+    try:
+        if not os.path.exists(rutaEstado(objetivo)):
+            return None
+
+        with open(rutaEstado(objetivo), 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+
+        if estado.get('jornada', objetivo.jornada) == objetivo.jornada and estado.get('periodo') == objetivo.periodo:
+            if os.path.exists(estado['archivo_json']):
+                with open(estado['archivo_json'], 'rb') as db_file:
+                    objetivo.baseDatos = convertirDatos(orjson.loads(db_file.read()))
+            
+            completados = set(estado.get('completados', []))
+            archivoDiario = estado.get('archivo_diario') or rutaDiario(estado['archivo_json'])
+            for registro in leerDiario(archivoDiario):
+                # Si la compactación se interrumpió, el snapshot ya puede incluir el registro
+                if not objetivo.pipeline:
+                    aplicarRegistro(objetivo, registro, deduplicar=True)
+                completados.add(registro['contador'])
+            estado['completados'] = sorted(completados)
+            
+            printInfo(f"Reanudando sesión previa de {objetivo} ({len(completados)} ítems ya procesados).", "advertencia")
+            return estado
+        else:
+            printInfo(f"Estado previo de {objetivo} no coincide con configuración actual. Iniciando de cero.", "info")
+            limpiarEstado(objetivo)
+            return None
+            
+    except Exception:
+        return None
+
+def limpiarEstado(objetivo):
+    if os.path.exists(rutaEstado(objetivo)):
+        try:
+            os.remove(rutaEstado(objetivo))
+        except:
+            pass
+
+def rutaEstado(objetivo):
+    """Cada (campus, jornada) tiene su propio archivo de checkpoint."""
+    return f"scraping_state-{objetivo.campus}-{objetivo.jornada}.json"
+
+def rutaArchivoJSON(objetivo):
+    """Ruta del snapshot JSON del objetivo en esta ejecución (la define la primera vez que se pide)."""
+    directorioJson = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'json')
+    os.makedirs(directorioJson, exist_ok=True)
+        
+    if objetivo.archivoJSON is None:
+        objetivo.archivoJSON = os.path.join(directorioJson, f"bdd_general-{fechaActual}-{objetivo.campus}-{objetivo.jornada}.json")
+    
+    return objetivo.archivoJSON
+
+def rutaDiario(archivo_json):
+    """El diario de checkpoint vive junto a su snapshot JSON."""
+    return os.path.splitext(archivo_json)[0] + ".ndjson"
+
+def escribirAtomico(ruta, escritor, binario=False):
+    """Escribe un archivo completo en un temporal y lo reemplaza de una vez."""
+    temporal = f"{ruta}.tmp"
+    with (open(temporal, "wb") if binario else open(temporal, "w", encoding="utf-8")) as archivo:
+        escritor(archivo)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+def guardarJSON(objetivo):
+    """Guarda el snapshot del objetivo en JSON compacto (ver `Paralelo`)."""
+    try:
+        with medirFase("piedmont_checkpoint_segundos", tipo="snapshot"):
+            escribirAtomico(
+                rutaArchivoJSON(objetivo),
+                lambda archivo: archivo.write(serializarDatos(objetivo.baseDatos)),
+                binario=True
+            )
+        contarMetrica("piedmont_bytes_escritos_total", os.path.getsize(rutaArchivoJSON(objetivo)), archivo="snapshot")
+        return True
+    except Exception as e:
+        printInfo(f"Error guardando JSON: {e}", "error")
+        return False
+
+def aplicarRegistro(objetivo, registro, deduplicar=False):
+    """Agrega el paralelo de un registro del diario a `objetivo.baseDatos`."""
+    # Inicialización de estructuras de datos
+    if not objetivo.baseDatos:
+        objetivo.baseDatos = {}
+    baseDatosNueva = objetivo.baseDatos.setdefault(registro['campus'], {}).setdefault(registro['periodo'], {})
+    paralelos = baseDatosNueva.setdefault(registro['sigla'], [])
+    
+    if deduplicar and registro['paralelo'] in paralelos:
+        return
+    paralelos.append(registro['paralelo'])
+
+def registrarEnDiario(objetivo, registro):
+    """
+    Anota un paralelo como una línea NDJSON al final del diario de checkpoint.
+    
+    Cada línea se escribe al sistema operativo de inmediato, pero el fsync se hace
+    cada `intervaloFsync` registros. Cada `intervaloCompactacion` registros el
+    diario se compacta en el snapshot JSON. Debe llamarse con `objetivo.bloqueo` tomado.
+    """
+    try:
+        if objetivo.diario is None:
+            objetivo.diario = open(rutaDiario(rutaArchivoJSON(objetivo)), "ab")
+            guardarEstado(objetivo, objetivo.completados - {registro['contador']})
+        
+        inicio = time.perf_counter()
+        linea = serializarDatos(registro) + b"\n"
+        objetivo.diario.write(linea)
+        objetivo.diario.flush()
+        objetivo.registrosDiario += 1
+        
+        if objetivo.registrosDiario % intervaloFsync == 0:
+            os.fsync(objetivo.diario.fileno())
+        registrarDuracion("piedmont_checkpoint_segundos", time.perf_counter() - inicio, tipo="diario")
+        contarMetrica("piedmont_bytes_escritos_total", len(linea), archivo="diario")
+        if objetivo.registrosDiario >= intervaloCompactacion and not objetivo.pipeline:
+            compactarDiario(objetivo)
+    except Exception as e:
+        printInfo(f"Error escribiendo diario de checkpoint: {e}", "error")
+
+def compactarDiario(objetivo):
+    """
+    Vuelca `objetivo.baseDatos` al snapshot JSON, actualiza el estado y vacía el
+    diario. Debe llamarse con `objetivo.bloqueo` tomado.
+    """
+    if not guardarJSON(objetivo):
+        return
+    guardarEstado(objetivo, objetivo.completados)
+    
+    if objetivo.diario is not None:
+        objetivo.diario.seek(0)
+        objetivo.diario.truncate()
+    objetivo.registrosDiario = 0
+
+def cerrarDiario(objetivo):
+    """
+    Compacta lo pendiente y cierra el diario de checkpoint. En modo pipeline no se
+    compacta: el diario queda como el registro completo de la ejecución.
+    """
+    with objetivo.bloqueo:
+        if objetivo.diario is None:
+            return
+        if objetivo.pipeline:
+            os.fsync(objetivo.diario.fileno())
+            objetivo.diario.close()
+            objetivo.diario = None
+            return
+        compactarDiario(objetivo)
+        objetivo.diario.close()
+        objetivo.diario = None
+        
+        try:
+            if os.path.getsize(rutaDiario(objetivo.archivoJSON)) == 0:
+                os.remove(rutaDiario(objetivo.archivoJSON))
+        except OSError:
+            pass
+
+def grabarHTML(nombre, htmlTexto):
+    """
+    Modo grabación (`directorioGrabacion`): guarda una página del SIGA tal como la
+    vio el scraper, para reproducirla sin conexión con piedmont-replay.py.
+    """
+    if not directorioGrabacion:
+        return
+    try:
+        escribirAtomico(os.path.join(directorioGrabacion, f"{nombre}.html"), lambda f: f.write(htmlTexto))
+    except IOError as e:
+        printInfo(f"No se pudo grabar {nombre}: {e}", "advertencia")
+
+def leerDiario(archivoDiario):
+    """
+    Lee los registros de un diario de checkpoint (con su paralelo ya convertido
+    a `Paralelo`), ignorando una última línea incompleta.
+    """
+    if not os.path.exists(archivoDiario):
+        return
+    
+    with open(archivoDiario, 'rb') as f:
+        for linea in f:
+            try:
+                registro = orjson.loads(linea)
+                registro['paralelo'] = Paralelo.desdeJSON(registro['paralelo'])
+            except (ValueError, KeyError, TypeError):
+                break # Escritura interrumpida a mitad de línea
+            yield registro
+
+def leerSnapshot(rutaSnapshot):
+    """
+    Lee un snapshot JSON {campus: {periodo: {sigla: [paralelos]}}} de a una
+    asignatura a la vez, en bloques de `tamanoBloqueLectura` caracteres, sin
+    cargar el archivo completo. Entrega registros con la misma forma que los
+    del diario. Acepta snapshots compactos y antiguos (ver `Paralelo.desdeJSON`).
+    Lanza ValueError si el archivo no tiene esa estructura.
+    """
+    decodificador = json.JSONDecoder()
+    
+    with open(rutaSnapshot, 'r', encoding='utf-8') as f:
+        texto = ""
+        posicion = 0
+        
+        def leerBloque():
+            # Descarta lo ya consumido y agrega el siguiente bloque
+            nonlocal texto, posicion
+            bloque = f.read(tamanoBloqueLectura)
+            texto = texto[posicion:] + bloque
+            posicion = 0
+            return bool(bloque)
+        
+        def siguienteCaracter():
+            nonlocal posicion
+            while True:
+                while posicion < len(texto) and texto[posicion].isspace():
+                    posicion += 1
+                if posicion < len(texto):
+                    return texto[posicion]
+                if not leerBloque():
+                    return ""
+        
+        def consumir(esperados):
+            nonlocal posicion
+            caracter = siguienteCaracter()
+            if not caracter or caracter not in esperados:
+                raise ValueError(f"{rutaSnapshot}: se esperaba {esperados!r} en vez de {caracter!r}")
+            posicion += 1
+            return caracter
+        
+        def valor():
+            # Un valor JSON completo; si quedó cortado al final del bloque se lee otro
+            nonlocal posicion
+            siguienteCaracter()
+            while True:
+                try:
+                    resultado, posicion = decodificador.raw_decode(texto, posicion)
+                    return resultado
+                except json.JSONDecodeError:
+                    if not leerBloque():
+                        raise
+        
+        def claves():
+            # Recorre un objeto: entrega cada clave dejando la posición en su valor
+            consumir("{")
+            if siguienteCaracter() == "}":
+                consumir("}")
+                return
+            while True:
+                clave = valor()
+                consumir(":")
+                yield clave
+                if consumir(",}") == "}":
+                    return
+        
+        for nombreCampus in claves():
+            for periodo in claves():
+                for sigla in claves():
+                    paralelos = valor()
+                    if not isinstance(paralelos, list):
+                        raise ValueError(f"{rutaSnapshot} no es un snapshot de Piedmont")
+                    for paralelo in paralelos:
+                        yield {"campus": nombreCampus, "periodo": periodo, "sigla": sigla, "paralelo": Paralelo.desdeJSON(paralelo)}
+
+def leerArchivoImportacion(ruta):
+    """Registros de un snapshot JSON o de un diario NDJSON, según la extensión."""
+    if ruta.endswith(".ndjson"):
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No existe {ruta}")
+        return leerDiario(ruta)
+    return leerSnapshot(ruta)
+
+
+############################################################################
+#                          CACHÉ DE HORARIOS                               #
+
+def cargarCacheHorarios():
+    """
+    Carga la caché persistente de horarios y descarta las entradas vencidas
+    (`ttlCacheHorarios`). Si no existe o está dañada se parte con una vacía.
+    """
+    global cacheHorarios
+    
+    cacheHorarios = {}
+    if not usarCacheHorarios or not os.path.exists(archivoCacheHorarios):
+        return
+    
+    try:
+        with open(archivoCacheHorarios, 'r', encoding='utf-8') as f:
+            entradas = json.load(f)
+    except (IOError, ValueError):
+        printInfo("Caché de horarios ilegible, se reconstruirá.", "advertencia")
+        return
+    
+    vencimiento = time.time() - ttlCacheHorarios * 86400
+    cacheHorarios = {clave: entrada for clave, entrada in entradas.items() if entrada.get('verificado', 0) >= vencimiento}
+    printInfo(f"Caché de horarios: {len(cacheHorarios)} entradas vigentes ({len(entradas) - len(cacheHorarios)} vencidas).")
+
+def guardarCacheHorarios():
+    """Guarda la caché de horarios, conservando sólo las `maxEntradasCache` más recientes."""
+    if not usarCacheHorarios:
+        return
+    
+    with bloqueoDatos:
+        entradas = sorted(cacheHorarios.items(), key=lambda item: item[1]['verificado'], reverse=True)
+        entradas = dict(entradas[:maxEntradasCache])
+        
+        # Dentro del lock: varios objetivos pueden terminar a la vez
+        try:
+            escribirAtomico(archivoCacheHorarios, lambda f: json.dump(entradas, f, ensure_ascii=False))
+        except IOError as e:
+            printInfo(f"No se pudo guardar la caché de horarios: {e}", "advertencia")
+
+def asignaturaPorFila(filasDatos):
+    """
+    Para cada índice del listado, la fila con sigla explícita a la que pertenece
+    (la misma que reconstruye `contextoPrevio`), o None si no hay ninguna antes.
+    """
+    asignaturas = []
+    ultima = None
+    for fila in filasDatos:
+        if fila and fila["sigla"]:
+            ultima = fila
+        asignaturas.append(ultima)
+    return asignaturas
+
+def posicionPorFila(filasDatos, asignaturas):
+    """
+    Para cada índice del listado, (posición, filas): el lugar de la fila entre las
+    del mismo paralelo (un paralelo puede ocupar varias filas, ej: un horario por
+    fila) y cuántas filas ocupa el paralelo en total, o None si no tiene asignatura.
+    """
+    claves = [
+        (asignatura["sigla"], fila["paralelo"]) if fila and asignatura else None
+        for fila, asignatura in zip(filasDatos, asignaturas)
+    ]
+    totales = {}
+    for clave in claves:
+        if clave is not None:
+            totales[clave] = totales.get(clave, 0) + 1
+    
+    posiciones = []
+    vistas = {}
+    for clave in claves:
+        if clave is None:
+            posiciones.append(None)
+            continue
+        posiciones.append((vistas.get(clave, 0), totales[clave]))
+        vistas[clave] = vistas.get(clave, 0) + 1
+    return posiciones
+
+def claveCacheHorario(nombreCampus, periodo, fila, asignatura, posicion):
+    """
+    Clave (campus|periodo|sigla|paralelo|posición) y huella de una fila del
+    listado; `posicion` es la de `posicionPorFila`, así cada fila de un paralelo
+    repetido tiene su propia entrada. La huella cambia si cambia cualquier dato
+    visible de la fila (nombre, departamento, profesores o cupos) o la cantidad de
+    filas del paralelo, lo que obliga a volver a abrir el horario.
+    """
+    indice, filas = posicion
+    clave = f"{nombreCampus}|{periodo}|{asignatura['sigla']}|{fila['paralelo']}|{indice}"
+    huella = "|".join((asignatura["nombre"], asignatura["depto"], fila["profesStr"], fila["cupos"], str(filas)))
+    return clave, huella
+
+def consultarCacheHorarios(nombreCampus, periodo, filasDatos, asignaturas, posiciones, contadores):
+    """
+    Busca en la caché las filas de `contadores` cuya huella no cambió.
+    Retorna {contadorGlobal: (horario, profesores)} con los aciertos; una fracción
+    `fraccionReverificacion` de ellos se descarta al azar para volver a verificarse.
+    """
+    aciertos = {}
+    for contadorGlobal in contadores:
+        fila = filasDatos[contadorGlobal]
+        if fila is None or asignaturas[contadorGlobal] is None:
+            continue
+        
+        clave, huella = claveCacheHorario(nombreCampus, periodo, fila, asignaturas[contadorGlobal], posiciones[contadorGlobal])
+        entrada = cacheHorarios.get(clave)
+        if entrada and entrada['huella'] == huella and random.random() >= fraccionReverificacion:
+            aciertos[contadorGlobal] = (entrada['horario'], entrada['profesores'])
+    return aciertos
+
+def actualizarCacheHorario(nombreCampus, periodo, fila, asignatura, posicion, horario, profesores):
+    """Anota en la caché el horario recién extraído de una fila."""
+    clave, huella = claveCacheHorario(nombreCampus, periodo, fila, asignatura, posicion)
+    with bloqueoDatos:
+        cacheHorarios[clave] = {
+            "huella": huella,
+            "horario": horario,
+            "profesores": profesores,
+            "verificado": time.time(),
+        }
+
+
+############################################################################
+#                    VALIDACIÓN PREVIA A LA PUBLICACIÓN                    #
+
+def nuevaValidacion():
+    """
+    Acumulador de `validarPublicacion` para un semestre: fila de cada paralelo
+    ("SIGLA|paralelo") y las celdas ocupadas de su horario como (fila, día, bloque,
+    código de sala), más los cupos no numéricos.
+    """
+    return {"paralelos": {}, "registros": 0, "cupos_invalidos": 0, "celdas": [], "salas": {}}
+
+def acumularValidacion(validacion, codigo_asig, paralelo_data):
+    """Suma un paralelo al acumulador (los repetidos comparten fila, como en la BDD)."""
+    paralelos = validacion["paralelos"]
+    fila = paralelos.setdefault(claveHistorial(codigo_asig, paralelo_data.paralelo), len(paralelos))
+    validacion["registros"] += 1
+    if not str(paralelo_data.cupos).strip().lstrip("-").isdigit():
+        validacion["cupos_invalidos"] += 1
+    
+    salas = validacion["salas"]
+    for dia, bloque, sala in paralelo_data.bloques:
+        validacion["celdas"].append((fila, dia - 1, bloque - 1, salas.setdefault(sala, len(salas) + 1)))
+
+def resumirValidacion(validacion):
+    """
+    Carga los horarios en un arreglo (paralelo x día x bloque) con el código de sala
+    de cada celda (0 = libre) y calcula, sin recorrer paralelos:
+    
+    - sin_horario: paralelos sin ninguna celda ocupada.
+    - conflictos: celdas cuya sala, día y bloque están ocupados también por otro
+      paralelo (salvo las salas de `patronSalasCompartidas`, ej: online).
+    - salas_sospechosas: celdas con una "sala" que parece un bloque u hora, señal
+      de que la tabla del SIGA cambió y `mapaFilas` ya no calza.
+    - distribucion: celdas ocupadas por día y bloque (7 x `bloquesPorDia`).
+    """
+    import numpy as np # Sólo la validación lo necesita
+    
+    # Clasificación por código de sala (el 0, celda libre, no es de ninguna)
+    plegadas = [""] + [plegarTexto(sala) for sala in validacion["salas"]]
+    compartidas = np.array([bool(sala) and bool(re.search(patronSalasCompartidas, sala)) for sala in plegadas])
+    sospechosas = np.array([bool(sala) and bool(re.search(patronSalaSospechosa, sala)) for sala in plegadas])
+    
+    horario = np.zeros((len(validacion["paralelos"]), 7, bloquesPorDia), dtype=np.int32)
+    if validacion["celdas"]:
+        filas, dias, bloques, salas = np.array(validacion["celdas"], dtype=np.int64).T
+        dentro = (dias >= 0) & (dias < 7) & (bloques >= 0) & (bloques < bloquesPorDia)
+        horario[filas[dentro], dias[dentro], bloques[dentro]] = salas[dentro]
+    
+    ocupadas = horario != 0
+    paralelo, dia, bloque = np.nonzero(ocupadas & ~compartidas[horario])
+    claves = (horario[paralelo, dia, bloque].astype(np.int64) * 7 + dia) * bloquesPorDia + bloque
+    _, repeticiones = np.unique(claves, return_counts=True)
+    
+    return {
+        "paralelos": int(horario.shape[0]),
+        "registros": validacion["registros"],
+        "celdas": int(np.count_nonzero(ocupadas)),
+        "sin_horario": int(np.count_nonzero(~ocupadas.any(axis=(1, 2)))),
+        "conflictos": int(repeticiones[repeticiones > 1].sum()),
+        "salas_sospechosas": int(np.count_nonzero(sospechosas[horario])),
+        "cupos_invalidos": validacion["cupos_invalidos"],
+        "distribucion": ocupadas.sum(axis=0).tolist(),
+    }
+
+def fraccion(parte, total):
+    return parte / total if total else 0.0
+
+def evaluarValidacion(resumen, previo=None):
+    """
+    Compara el resumen de un semestre con los umbrales y, si existe, con el de la
+    última publicación (`previo`). Retorna la lista de motivos para no publicar.
+    """
+    import numpy as np
+    
+    motivos = []
+    if not resumen["paralelos"]:
+        return ["no hay paralelos"]
+    
+    cupos = fraccion(resumen["cupos_invalidos"], resumen["registros"])
+    if cupos > maxCuposInvalidos:
+        motivos.append(f"{cupos:.1%} de los paralelos con cupos no numéricos (máx. {maxCuposInvalidos:.1%})")
+    sospechosas = fraccion(resumen["salas_sospechosas"], resumen["celdas"])
+    if sospechosas > maxSalasSospechosas:
+        motivos.append(f"{sospechosas:.1%} de las celdas con una sala que parece un bloque u hora (máx. {maxSalasSospechosas:.1%})")
+    
+    if not previo:
+        return motivos
+    
+    for campo, nombre in (("paralelos", "paralelos"), ("celdas", "celdas de horario")):
+        caida = 1 - fraccion(resumen[campo], previo[campo]) if previo[campo] else 0.0
+        if caida > maxCaidaParalelos:
+            motivos.append(f"{nombre}: {previo[campo]} -> {resumen[campo]} (caída de {caida:.1%}, máx. {maxCaidaParalelos:.1%})")
+    
+    aumentos = (
+        ("sin_horario", "paralelos", "paralelos sin horario", maxAumentoSinHorario),
+        ("conflictos", "celdas", "celdas con la sala ocupada por otro paralelo", maxAumentoConflictos),
+    )
+    for campo, total, nombre, maximo in aumentos:
+        actual, anterior = fraccion(resumen[campo], resumen[total]), fraccion(previo[campo], previo[total])
+        if actual - anterior > maximo:
+            motivos.append(f"{nombre}: {anterior:.1%} -> {actual:.1%} (aumento máx. {maximo:.1%})")
+    
+    # Distancia de variación total entre las distribuciones día x bloque (con pocas
+    # celdas la distancia es casi sólo ruido, así que no se compara)
+    actual = np.asarray(resumen["distribucion"], dtype=float)
+    anterior = np.asarray(previo["distribucion"], dtype=float)
+    if actual.shape == anterior.shape and min(actual.sum(), anterior.sum()) >= minCeldasDistribucion:
+        distancia = 0.5 * np.abs(actual / actual.sum() - anterior / anterior.sum()).sum()
+        if distancia > maxCambioDistribucion:
+            motivos.append(f"la distribución de clases por día y bloque cambió {distancia:.1%} (máx. {maxCambioDistribucion:.1%})")
+    return motivos
+
+def rutaValidacion(nombreCampus, periodo):
+    """Resumen de la última publicación de un (campus, periodo): validacion/{campus}-{periodo}.json."""
+    directorioValidacion = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'validacion')
+    os.makedirs(directorioValidacion, exist_ok=True)
+    nombre = re.sub(r"[^a-z0-9]+", "_", plegarTexto(nombreCampus)).strip("_")
+    return os.path.join(directorioValidacion, f"{nombre}-{periodo}.json")
+
+def validarPublicacion(nombreCampus, periodo, validacion):
+    """
+    Valida un semestre antes de publicarlo (ver `resumirValidacion` y
+    `evaluarValidacion`). Retorna su resumen, o None si no debe publicarse; con
+    `forzarPublicacion` los motivos sólo se advierten.
+    """
+    with medirFase("piedmont_validacion_segundos"):
+        resumen = resumirValidacion(validacion)
+        try:
+            with open(rutaValidacion(nombreCampus, periodo), "rb") as archivo:
+                previo = orjson.loads(archivo.read())
+        except FileNotFoundError:
+            previo = None
+        except (OSError, ValueError) as e:
+            printInfo(f"No se pudo leer la validación anterior de {nombreCampus} {periodo}: {e}", "advertencia")
+            previo = None
+        motivos = evaluarValidacion(resumen, previo)
+    
+    printInfo(
+        f"Validación {nombreCampus} {periodo}: {resumen['paralelos']} paralelos, {resumen['celdas']} celdas, "
+        f"{resumen['sin_horario']} sin horario, {resumen['conflictos']} celdas en conflicto."
+    )
+    if not motivos:
+        return resumen
+    
+    for motivo in motivos:
+        printInfo(f"Validación {nombreCampus} {periodo}: {motivo}", "advertencia" if forzarPublicacion else "error")
+    if forzarPublicacion:
+        printInfo("Se publica de todas formas (--forzar-publicacion).", "advertencia")
+        return resumen
+    printInfo(f"{nombreCampus} {periodo} no se publica. Revise los datos o use --forzar-publicacion.", "error")
+    return None
+
+def validarDatos(datos):
+    """
+    `validarPublicacion` para cada semestre de `datos`. Retorna {(campus, periodo):
+    resumen}, o None si alguno no debe publicarse.
+    """
+    resumenes = {}
+    aprobado = True
+    for nombreCampus, periodos in datos.items():
+        for periodo, asignaturas in periodos.items():
+            validacion = nuevaValidacion()
+            for codigo_asig, paralelos in asignaturas.items():
+                for paralelo_data in paralelos:
+                    acumularValidacion(validacion, codigo_asig, paralelo_data)
+            resumenes[(nombreCampus, periodo)] = validarPublicacion(nombreCampus, periodo, validacion)
+            aprobado = aprobado and resumenes[(nombreCampus, periodo)] is not None
+    return resumenes if aprobado else None
+
+def guardarValidacion(nombreCampus, periodo, resumen):
+    """Deja `resumen` como referencia de la próxima validación del semestre (sólo tras publicarlo)."""
+    try:
+        escribirAtomico(rutaValidacion(nombreCampus, periodo), lambda archivo: archivo.write(orjson.dumps(resumen)), binario=True)
+    except OSError as e:
+        printInfo(f"No se pudo guardar la validación de {nombreCampus} {periodo}: {e}", "advertencia")
+
+
+############################################################################
+#                          HISTORIAL DE CUPOS                              #
+
+def rutaHistorial(nombreCampus, periodo):
+    """
+    Archivo de historial de un (campus, periodo): historial/{campus}-{periodo}.ndjson,
+    con su índice de ejecuciones en el .idx del mismo nombre.
+    """
+    directorioHistorial = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historial')
+    os.makedirs(directorioHistorial, exist_ok=True)
+    nombre = re.sub(r"[^a-z0-9]+", "_", plegarTexto(nombreCampus)).strip("_")
+    return os.path.join(directorioHistorial, f"{nombre}-{periodo}.ndjson")
+
+def rutaIndiceHistorial(rutaDatos):
+    return os.path.splitext(rutaDatos)[0] + ".idx"
+
+def claveHistorial(codigo_asig, paralelo):
+    return f"{codigo_asig}|{paralelo}"
+
+def nuevoHistorial():
+    """Estado de un semestre para el historial: {"SIGLA|paralelo": (cupos, bloques)}."""
+    return {}
+
+def acumularHistorial(historial, codigo_asig, paralelo_data):
+    """Suma un paralelo al estado del semestre (los repetidos se unen como en la BDD)."""
+    clave = claveHistorial(codigo_asig, paralelo_data.paralelo)
+    previo = historial.get(clave)
+    bloques = previo[1] + paralelo_data.bloques if previo else paralelo_data.bloques
+    historial[clave] = (str(paralelo_data.cupos).strip(), bloques)
+
+def leerIndiceHistorial(rutaDatos):
+    """
+    Entradas del índice de un historial, una por ejecución: {ejecucion, fecha,
+    tipo, inicio, largo, cambios}. Una última línea incompleta se ignora.
+    """
+    indice = []
+    try:
+        with open(rutaIndiceHistorial(rutaDatos), 'rb') as f:
+            for linea in f:
+                try:
+                    indice.append(orjson.loads(linea))
+                except ValueError:
+                    break # Escritura interrumpida a mitad de línea
+    except FileNotFoundError:
+        pass
+    return indice
 
-        # Login
-        wait.until(EC.presence_of_element_located((By.NAME, "login"))).send_keys(usuarioSIGA)
-        driver.find_element(By.NAME, "passwd").send_keys(passwordSIGA)
-        driver.find_element(By.XPATH, "//a[contains(@href, 'ValidaLogin')]").click()
+def leerEjecucionHistorial(archivo, entrada):
+    """Línea cruda (bytes) de una ejecución, leída directo desde su posición en el índice."""
+    archivo.seek(entrada["inicio"])
+    return archivo.read(entrada["largo"])
 
-        # Navegación hacia menús
-        driver.get("https://siga.usm.cl/pag/menu.jsp")
-        
-        # Click en "Horario Asignaturas"
-        wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(@href, 'insc_procesos.jsp')]"))).click()
+def aplicarEjecucionHistorial(estado, ejecucion):
+    """Aplica una ejecución (keyframe completo o delta) sobre `estado`, en el lugar."""
+    if ejecucion["tipo"] == "keyframe":
+        estado.clear()
+    for clave, cambio in ejecucion["paralelos"].items():
+        if cambio is None:
+            estado.pop(clave, None)
+            continue
+        cupos, bloques = estado.get(clave, (None, ()))
+        if "c" in cambio:
+            cupos = cambio["c"]
+        if "b" in cambio:
+            bloques = tuple(map(tuple, cambio["b"]))
+        estado[clave] = (cupos, bloques)
 
-        # --- Frame 1: Configuración de búsqueda ---
-        wait.until(EC.frame_to_be_available_and_switch_to_it("frame1"))
-        
-        Select(driver.find_element(By.NAME, "periodo")).select_by_value(periodo)
-        
-        valJornada = "1" if jornada == "1" else "2" # Simplificación
-        Select(driver.find_element(By.NAME, "jornada")).select_by_value(jornada)
+def reconstruirHistorial(rutaDatos, indice, ejecucion):
+    """
+    Estado del semestre tras la ejecución `ejecucion`: el último keyframe anterior
+    más los deltas que lo siguen. Lanza ValueError si la ejecución no existe.
+    """
+    posiciones = [i for i, entrada in enumerate(indice) if entrada["ejecucion"] == ejecucion]
+    if not posiciones:
+        raise ValueError(f"La ejecución {ejecucion} no existe en {rutaDatos}")
+    fin = posiciones[0]
+    inicio = max(i for i in range(fin + 1) if indice[i]["tipo"] == "keyframe")
+    
+    estado = {}
+    with open(rutaDatos, 'rb') as f:
+        for entrada in indice[inicio:fin + 1]:
+            aplicarEjecucionHistorial(estado, orjson.loads(leerEjecucionHistorial(f, entrada)))
+    return estado
+
+def registrarHistorial(nombreCampus, periodo, historial, parcial=False, fecha=None):
+    """
+    Agrega una ejecución al historial del (campus, periodo) con sólo los paralelos
+    cuyos cupos u horario cambiaron respecto a la anterior (`None` = ya no está).
+    Cada `intervaloKeyframeHistorial` ejecuciones se guarda en cambio el estado
+    completo, para que reconstruir una ejecución no recorra todo el archivo.
+    
+    Con `parcial` (refresco de cupos) los paralelos ausentes no se dan por
+    eliminados y un bloque `None` conserva el horario anterior. Los datos y el
+    índice sólo crecen al final, así que una escritura interrumpida no afecta a
+    las ejecuciones anteriores. Retorna el número de la ejecución.
+    """
+    with bloqueoHistorial:
+        rutaDatos = rutaHistorial(nombreCampus, periodo)
+        indice = leerIndiceHistorial(rutaDatos)
+        anterior = reconstruirHistorial(rutaDatos, indice, indice[-1]["ejecucion"]) if indice else {}
         
-        # Mapeo de campus para logs
-        mapaCampus = {"1": "Casa Central", "4": "Concepción", "7": "Santiago San Joaquín", "2": "Vitacura", "3": "Viña del Mar"}
-        nombreCampus = mapaCampus.get(campus, "Desconocido")
+        cambios = {}
+        for clave, (cupos, bloques) in historial.items():
+            previo = anterior.get(clave)
+            cambio = {}
+            if previo is None or previo[0] != cupos:
+                cambio["c"] = cupos
+            if bloques is not None and (previo is None or previo[1] != tuple(bloques)):
+                cambio["b"] = bloques
+            if cambio:
+                cambios[clave] = cambio
+        if not parcial:
+            cambios.update((clave, None) for clave in anterior if clave not in historial)
         
-        Select(driver.find_element(By.NAME, "sede")).select_by_value(campus)
-        printInfo(f"Configurando búsqueda: {periodo} | {nombreCampus}")
-
-        # --- Frame 5: Opciones de listado ---
-        driver.switch_to.default_content()
-        wait.until(EC.frame_to_be_available_and_switch_to_it("frame5"))
+        numero = indice[-1]["ejecucion"] + 1 if indice else 1
+        ultimoKeyframe = max((entrada["ejecucion"] for entrada in indice if entrada["tipo"] == "keyframe"), default=None)
+        if ultimoKeyframe is None or numero - ultimoKeyframe >= intervaloKeyframeHistorial:
+            tipo = "keyframe"
+            aplicarEjecucionHistorial(anterior, {"tipo": "delta", "paralelos": cambios})
+            paralelos = {clave: {"c": cupos, "b": bloques} for clave, (cupos, bloques) in anterior.items()}
+        else:
+            tipo = "delta"
+            paralelos = cambios
         
-        Select(driver.find_element(By.NAME, "op")).select_by_value("1")      # Todas las asignaturas
-        Select(driver.find_element(By.NAME, "op_asig")).select_by_value("1") # Ordenar por nombre
+        fecha = fecha or fechaActual
+        linea = serializarDatos({"ejecucion": numero, "fecha": fecha, "tipo": tipo, "paralelos": paralelos}) + b"\n"
+        with open(rutaDatos, 'ab') as f:
+            inicio = f.seek(0, os.SEEK_END)
+            f.write(linea)
+            f.flush()
+            os.fsync(f.fileno())
         
-        driver.find_element(By.NAME, "form_f1").submit()
+        entrada = {"ejecucion": numero, "fecha": fecha, "tipo": tipo, "inicio": inicio, "largo": len(linea), "cambios": len(cambios)}
+        with open(rutaIndiceHistorial(rutaDatos), 'a+b') as f:
+            # Una línea incompleta de una escritura interrumpida se descarta antes de seguir
+            f.seek(0)
+            contenido = f.read()
+            if not contenido.endswith(b"\n"):
+                f.truncate(contenido.rfind(b"\n") + 1)
+            f.write(orjson.dumps(entrada) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+    
+    contarMetrica("piedmont_bytes_escritos_total", len(linea), archivo="historial")
+    printInfo(f"Historial de {nombreCampus} {periodo}: ejecución {numero} ({tipo}), {len(cambios)} paralelos con cambios.", "info")
+    return numero
 
-        # --- Frame 3: Tabla de resultados ---
-        driver.switch_to.default_content()
-        # Espera extendida aquí porque la carga de la tabla puede ser lenta
-        WebDriverWait(driver, 20).until(EC.frame_to_be_available_and_switch_to_it("frame3"))
-        
-        filas = driver.find_elements(By.XPATH, "//table[@class='Celda01']/tbody/tr")
-        printInfo(f"Se encontraron {len(filas)} filas potenciales para procesar.")
+def guardarHistorialDatos(datos, fecha=None):
+    """Registra en el historial cada (campus, periodo) de una estructura `baseDatos` recién publicada."""
+    for nombreCampus, periodos in datos.items():
+        for periodo, asignaturas in periodos.items():
+            historial = nuevoHistorial()
+            for codigo_asig, paralelos in asignaturas.items():
+                for paralelo_data in paralelos:
+                    acumularHistorial(historial, codigo_asig, paralelo_data)
+            intentarRegistrarHistorial(nombreCampus, periodo, historial, fecha=fecha)
 
-        # Inicialización de estructuras de datos
-        if not baseDatosGlobal:
-            baseDatosGlobal = {}
-        
-        if nombreCampus not in baseDatosGlobal:
-            baseDatosGlobal[nombreCampus] = {}
-        
-        if periodo not in baseDatosGlobal[nombreCampus]:
-            baseDatosGlobal[nombreCampus][periodo] = {}
+def intentarRegistrarHistorial(nombreCampus, periodo, historial, parcial=False, fecha=None):
+    """`registrarHistorial` sin interrumpir la ejecución: el historial no es crítico."""
+    try:
+        return registrarHistorial(nombreCampus, periodo, historial, parcial, fecha)
+    except (OSError, ValueError) as e:
+        printInfo(f"No se pudo registrar el historial de {nombreCampus} {periodo}: {e}", "advertencia")
+        return None
 
-        baseDatosNueva = baseDatosGlobal[nombreCampus][periodo]
-        
-        ultimaSigla = None
-        ultimoNombre = None
-        ultimoDepto = None
-        
-        # Loop principal de extracción
-        contadorGlobal = 0
-        
-        for fila in filas:
-            # Control de reanudación
-            if contadorGlobal < contadorInicio:
-                contadorGlobal += 1
+def historialParalelo(nombreCampus, periodo, sigla, paralelo=None):
+    """
+    Cupos de los paralelos de `sigla` (o sólo de `paralelo`) a lo largo de las
+    ejecuciones: [(ejecucion, fecha, clave, cupos)] con un punto por cada cambio,
+    y cupos None cuando el paralelo deja de aparecer.
+    
+    Se recorre el índice leyendo cada línea desde su posición, y las que no
+    mencionan la sigla se descartan sin decodificarlas.
+    """
+    rutaDatos = rutaHistorial(nombreCampus, periodo)
+    prefijo = claveHistorial(sigla, "")
+    marca = orjson.dumps(prefijo)[:-1] # '"SIGLA|' tal como aparece en las claves
+    
+    def relevante(clave):
+        return clave == claveHistorial(sigla, paralelo) if paralelo else clave.startswith(prefijo)
+    
+    puntos = []
+    actuales = {}
+    with open(rutaDatos, 'rb') as f:
+        for entrada in leerIndiceHistorial(rutaDatos):
+            linea = leerEjecucionHistorial(f, entrada)
+            if marca in linea:
+                ejecucion = orjson.loads(linea)
+                cambios = {clave: cambio for clave, cambio in ejecucion["paralelos"].items() if relevante(clave)}
+            elif entrada["tipo"] == "keyframe":
+                cambios = {}
+            else:
                 continue
+            
+            # Un keyframe es el estado completo: lo que no trae ya no existe
+            if entrada["tipo"] == "keyframe":
+                cambios.update((clave, None) for clave in actuales if clave not in cambios)
+            
+            for clave, cambio in sorted(cambios.items()):
+                if cambio is not None and "c" not in cambio:
+                    continue
+                cupos = cambio["c"] if cambio is not None else None
+                if clave not in actuales and cupos is None:
+                    continue
+                if actuales.get(clave, False) != cupos:
+                    puntos.append((entrada["ejecucion"], entrada["fecha"], clave, cupos))
+                    if cupos is None:
+                        del actuales[clave]
+                    else:
+                        actuales[clave] = cupos
+    return puntos
 
-            # Saltar separadores
-            if fila.find_elements(By.TAG_NAME, "td") and fila.find_element(By.TAG_NAME, "td").get_attribute("colspan") == "7":
-                continue
+def cambiosHistorial(nombreCampus, periodo, desde, hasta):
+    """
+    Paralelos distintos entre dos ejecuciones: {clave: (antes, despues)}, donde
+    cada lado es (cupos, bloques) o None si el paralelo no existía.
+    """
+    rutaDatos = rutaHistorial(nombreCampus, periodo)
+    indice = leerIndiceHistorial(rutaDatos)
+    antes = reconstruirHistorial(rutaDatos, indice, desde)
+    despues = reconstruirHistorial(rutaDatos, indice, hasta)
+    return {
+        clave: (antes.get(clave), despues.get(clave))
+        for clave in sorted(antes.keys() | despues.keys())
+        if antes.get(clave) != despues.get(clave)
+    }
 
-            try:
-                cells = fila.find_elements(By.TAG_NAME, "td")
-                if len(cells) > 0:
-                    sigla = cells[0].text.strip()
-                    nombre = cells[1].text.strip()
-                    depto = cells[2].text.strip()
-                    paralelo = cells[3].text.strip()
-                    profesStr = cells[4].text.strip() # Solo referencial, se extrae real del popup
-                    cupos = cells[5].text.strip()
-                    
-                    if sigla:
-                        print(f"")
-                        printInfo(f"ID {contadorGlobal}")
-                        printInfo(f"Nombre: {nombre}")
-                        printInfo(f"Sigla: {sigla}, Paralelo: {paralelo}")
-                        printInfo(f"Departamento: {depto}")
-                        printInfo(f"Profesor: {profesStr}")
-                    else:
-                        printInfo(f"Asignatura: {ultimaSigla}, Paralelo: {paralelo}")
-                    
-                    objAsignatura = {
-                        "Nombre": nombre if sigla else ultimoNombre,
-                        "Departamento": depto if sigla else ultimoDepto,
-                        "Paralelo": paralelo,
-                        "Profesores": [],
-                        "Cupos": cupos,
-                        "Horario": []
-                    }
+def cargarHistorialSnapshots(rutas):
+    """
+    Construye el historial a partir de snapshots ya guardados (bdd_general-*.json),
+    en orden de fecha. Los archivos de una misma ejecución (una fecha, varias
+    jornadas) se registran juntos como una sola ejecución.
+    """
+    ejecuciones = {}
+    for ruta in rutas:
+        coincidencia = re.search(r"bdd_general-(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})", os.path.basename(ruta))
+        fecha = coincidencia.group(1) if coincidencia else datetime.fromtimestamp(os.path.getmtime(ruta)).strftime("%Y-%m-%d_%H-%M-%S")
+        ejecuciones.setdefault(fecha, []).append(ruta)
+    
+    exito = True
+    for fecha in sorted(ejecuciones):
+        historiales = {}
+        try:
+            for ruta in sorted(ejecuciones[fecha]):
+                # Entre jornadas gana la primera (bdd_general-{fecha}-{campus}-{jornada}), como en `combinarDatos`
+                delArchivo = {}
+                for registro in leerArchivoImportacion(ruta):
+                    historial = delArchivo.setdefault((registro["campus"], registro["periodo"]), nuevoHistorial())
+                    acumularHistorial(historial, registro["sigla"], registro["paralelo"])
+                for clave, historial in delArchivo.items():
+                    destino = historiales.setdefault(clave, nuevoHistorial())
+                    for claveParalelo, valor in historial.items():
+                        destino.setdefault(claveParalelo, valor)
+        except (OSError, ValueError) as e:
+            printInfo(f"No se pudo leer la ejecución {fecha}: {e}", "error")
+            exito = False
+            continue
+        for (nombreCampus, periodo), historial in historiales.items():
+            exito = intentarRegistrarHistorial(nombreCampus, periodo, historial, fecha=fecha) is not None and exito
+    return exito
 
-                    # Extracción profunda (Popup de horario)
-                    horario, profesores = agregarHorario(contadorGlobal, fila, driver)
-                    
-                    if horario is None:
-                        printInfo(f"Fallo crítico obteniendo horario para fila {contadorGlobal}", "error")
-                        return False # Fail-fast strategy
-                    
-                    objAsignatura["Horario"] = horario
-                    objAsignatura["Profesores"] = profesores
-
-                    # Almacenamiento en estructura
-                    keySigla = sigla if sigla else ultimaSigla
-                    
-                    if keySigla not in baseDatosNueva:
-                        baseDatosNueva[keySigla] = []
-                    
-                    baseDatosNueva[keySigla].append(objAsignatura)
-
-                    # Actualizar punteros de "último visto" para paralelos sin sigla explícita
-                    if sigla:
-                        ultimaSigla = sigla
-                        ultimoNombre = nombre
-                        ultimoDepto = depto
-                        printInfo(f"Horario extraído (P{paralelo})")
-                    else:
-                        printInfo(f"Horario extraído (P{paralelo})")
-
-                    # Persistencia incremental
-                    if guardarJSON():
-                        guardarEstado(contadorGlobal, archivoJSONActual)
-                    
-                contadorGlobal += 1
-                
-                # Debugging limit
-                if limite != 0 and contadorGlobal >= limite:
-                    break
 
-            except Exception as e:
-                printInfo(f"Error procesando fila {contadorGlobal}: {e}", "error")
-                return False
+############################################################################
+#                            API ESTÁTICA                                  #
 
-    except Exception as e:
-        printInfo(f"Error general en ciclo de scraping: {e}", "error")
-        return False
-        
-    finally:
-        driver.quit()
-        printInfo("Navegador cerrado.")
+def rutaAPIEstatica(nombre):
+    """Nombre de directorio para un campus o semestre (ej: "Santiago San Joaquín" -> "santiago-san-joaquin")."""
+    return re.sub(r"[^a-z0-9]+", "-", plegarTexto(nombre)).strip("-") or "-"
 
-    # Resumen final
-    duracion = time.time() - inicioTiempo
-    minutos, segundos = segundosAMinutos(duracion)
+def consultarAPIEstatica(cursor):
+    """
+    Contenido de la API estática, desde los semestres publicados (sin generaciones
+    staging): {ruta relativa: datos}, con el mismo orden que usa api.php.
     
-    printInfo(f"Scraping finalizado en {minutos}m {math.floor(segundos)}s. Total procesado: {contadorGlobal} ítems.", "exito")
-    return True
+    - campus.json: [{"nombre", "ruta"}], la ruta es el directorio del campus.
+    - {campus}/semestres.json: [{"codigo", "ruta"}], del más reciente al más antiguo.
+    - {campus}/{semestre}/asignaturas.json: [{"id", "codigo", "nombre"}].
+    - {campus}/{semestre}/paralelos.json: {asignatura_id: [{"id", "paralelo"}]}.
+    """
+    recursos = {}
+    campus = []
+    rutasCampus = {}
+    cursor.execute("SELECT nombre FROM campus ORDER BY nombre")
+    for (nombre,) in cursor.fetchall():
+        ruta = rutaAPIEstatica(nombre)
+        while ruta in rutasCampus.values():
+            ruta += "-"
+        rutasCampus[nombre] = ruta
+        campus.append({"nombre": nombre, "ruta": ruta})
+        recursos[f"{ruta}/semestres.json"] = []
+    recursos["campus.json"] = campus
+    
+    sinStaging = (f"%{separadorGeneracion}%",)
+    cursor.execute("""
+        SELECT c.nombre, s.codigo FROM semestre s
+        JOIN campus c ON s.campus_id = c.id
+        WHERE s.codigo NOT LIKE %s
+        ORDER BY s.codigo DESC
+    """, sinStaging)
+    for nombreCampus, codigo in cursor.fetchall():
+        directorio = f"{rutasCampus[nombreCampus]}/{rutaAPIEstatica(codigo)}"
+        recursos[f"{rutasCampus[nombreCampus]}/semestres.json"].append({"codigo": codigo, "ruta": rutaAPIEstatica(codigo)})
+        recursos[f"{directorio}/asignaturas.json"] = []
+        recursos[f"{directorio}/paralelos.json"] = {}
+    
+    cursor.execute("""
+        SELECT c.nombre, s.codigo, a.id, a.codigo, a.nombre FROM asignatura a
+        JOIN semestre s ON a.semestre_id = s.id
+        JOIN campus c ON s.campus_id = c.id
+        WHERE s.codigo NOT LIKE %s
+        ORDER BY a.nombre
+    """, sinStaging)
+    for nombreCampus, codigo, asignatura_id, codigo_asig, nombre in cursor.fetchall():
+        directorio = f"{rutasCampus[nombreCampus]}/{rutaAPIEstatica(codigo)}"
+        recursos[f"{directorio}/asignaturas.json"].append({"id": asignatura_id, "codigo": codigo_asig, "nombre": nombre})
+    
+    cursor.execute("""
+        SELECT c.nombre, s.codigo, p.asignatura_id, p.id, p.paralelo FROM paralelo p
+        JOIN asignatura a ON p.asignatura_id = a.id
+        JOIN semestre s ON a.semestre_id = s.id
+        JOIN campus c ON s.campus_id = c.id
+        WHERE s.codigo NOT LIKE %s
+        ORDER BY p.paralelo
+    """, sinStaging)
+    for nombreCampus, codigo, asignatura_id, paralelo_id, paralelo in cursor.fetchall():
+        directorio = f"{rutasCampus[nombreCampus]}/{rutaAPIEstatica(codigo)}"
+        paralelos = recursos[f"{directorio}/paralelos.json"]
+        paralelos.setdefault(str(asignatura_id), []).append({"id": paralelo_id, "paralelo": paralelo})
+    return recursos
 
+def escribirRecursoAPI(ruta, datos):
+    """
+    Escribe un recurso JSON junto a sus versiones precomprimidas (.gz y, si hay
+    brotli, .br), salvo las que no resultan más pequeñas que el JSON.
+    """
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    contenido = orjson.dumps(datos)
+    variantes = [("", contenido), (".gz", gzip.compress(contenido, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append((".br", brotli.compress(contenido)))
+    
+    escritos = 0
+    for extension, bytesArchivo in variantes:
+        if extension and len(bytesArchivo) >= len(contenido):
+            continue
+        with open(ruta + extension, "wb") as archivo:
+            archivo.write(bytesArchivo)
+        escritos += len(bytesArchivo)
+    return escritos
 
-############################################################################
-#                        MANEJO DE ARCHIVOS                                #
+def publicarAPIEstatica(connection=None):
+    """
+    Genera la API estática en una versión nueva de `directorioAPIEstatica` y la
+    publica cambiando el enlace simbólico `actual` y el manifiesto `version.json`
+    de una vez (os.replace), de modo que el servidor web nunca sirve una versión a
+    medio escribir. La web lee el manifiesto sin caché y pide los recursos bajo
+    el directorio de la versión, que nunca cambia y se puede cachear. Se conservan
+    las `versionesAPIEstatica` versiones más recientes, para las páginas que aún
+    cargan la anterior. Sin `connection` se abre una conexión propia.
+    
+    Retorna el nombre de la versión publicada.
+    """
+    with bloqueoAPIEstatica, medirFase("piedmont_api_estatica_segundos"):
+        propia = connection is None
+        if propia:
+            connection = mysql.connector.connect(**config)
+        try:
+            cursor = connection.cursor()
+            recursos = consultarAPIEstatica(cursor)
+            cursor.close()
+        finally:
+            if propia:
+                connection.close()
+        
+        os.makedirs(directorioAPIEstatica, exist_ok=True)
+        version = "v" + datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        directorioVersion = os.path.join(directorioAPIEstatica, version)
+        escritos = 0
+        for ruta, datos in recursos.items():
+            escritos += escribirRecursoAPI(os.path.join(directorioVersion, *ruta.split("/")), datos)
+        contarMetrica("piedmont_bytes_escritos_total", escritos, archivo="api_estatica")
+        
+        enlace = os.path.join(directorioAPIEstatica, "actual")
+        temporal = f"{enlace}.tmp"
+        if os.path.lexists(temporal):
+            os.remove(temporal)
+        os.symlink(version, temporal, target_is_directory=True)
+        os.replace(temporal, enlace)
+        escribirAtomico(
+            os.path.join(directorioAPIEstatica, "version.json"),
+            lambda archivo: archivo.write(orjson.dumps({"version": version})),
+            binario=True
+        )
+        
+        # Nunca se borra la versión recién publicada, aunque se configuren menos de 1
+        versiones = sorted(nombre for nombre in os.listdir(directorioAPIEstatica) if re.fullmatch(r"v[\d-]+", nombre))
+        for antigua in versiones[:max(len(versiones) - max(versionesAPIEstatica, 1), 0)]:
+            shutil.rmtree(os.path.join(directorioAPIEstatica, antigua), ignore_errors=True)
+    
+    printInfo(f"API estática publicada: {version} ({len(recursos)} recursos).", "exito")
+    return version
 
-def guardarEstado(contador, archivo_json_actual):
-    """Guarda un checkpoint para poder reanudar si el script falla."""
-    estado = {
-        'campus': campus,
-        'periodo': determinarSemestreActual(),
-        'ultimo_contador': contador,
-        'archivo_json': archivo_json_actual
-    }
+def intentarPublicarAPIEstatica(connection=None):
+    """`publicarAPIEstatica` sin interrumpir la ejecución: si falla, api.php sigue respondiendo."""
     try:
-        with open('scraping_state.json', 'w', encoding='utf-8') as f:
-            json.dump(estado, f)
-    except IOError:
-        pass # No es crítico si falla esto
+        return publicarAPIEstatica(connection)
+    except (OSError, Error) as e:
+        printInfo(f"No se pudo publicar la API estática: {e}", "advertencia")
+        return None
+
 
-def cargarEstado():
-    """Carga el checkpoint anterior si coincide con la configuración actual."""
+############################################################################
+#                              MÉTRICAS                                    #
+
+def claveMetrica(nombre, etiquetas):
+    """Identificador de una serie al estilo Prometheus: nombre{etiqueta="valor",...}."""
+    if not etiquetas:
+        return nombre
+    pares = []
+    for etiqueta, valor in sorted(etiquetas.items()):
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"')
+        pares.append(f'{etiqueta}="{valor}"')
+    return f"{nombre}{{{','.join(pares)}}}"
+
+def registrarDuracion(nombre, segundos, **etiquetas):
+    """
+    Agrega una observación (en segundos) al histograma `nombre` de la ejecución
+    en curso. Es seguro llamarla desde varios hilos a la vez.
+    """
+    clave = claveMetrica(nombre, etiquetas)
+    with bloqueoMetricas:
+        serie = metricas["temporizadores"].get(clave)
+        if serie is None:
+            serie = metricas["temporizadores"][clave] = {
+                "nombre": nombre, "etiquetas": etiquetas,
+                "cantidad": 0, "suma": 0.0, "minimo": segundos, "maximo": segundos,
+                "buckets": [0] * len(bucketsMetricas),
+            }
+        serie["cantidad"] += 1
+        serie["suma"] += segundos
+        serie["minimo"] = min(serie["minimo"], segundos)
+        serie["maximo"] = max(serie["maximo"], segundos)
+        for i, limiteBucket in enumerate(bucketsMetricas):
+            if segundos <= limiteBucket:
+                serie["buckets"][i] += 1
+                break
+
+@contextmanager
+def medirFase(nombre, **etiquetas):
+    """Mide el bloque `with` y lo registra con `registrarDuracion` (también si falla)."""
+    inicio = time.perf_counter()
     try:
-        if not os.path.exists('scraping_state.json'):
-            return None
+        yield
+    finally:
+        registrarDuracion(nombre, time.perf_counter() - inicio, **etiquetas)
 
-        with open('scraping_state.json', 'r', encoding='utf-8') as f:
-            estado = json.load(f)
+def contarMetrica(nombre, cantidad=1, **etiquetas):
+    """Suma `cantidad` al contador `nombre` de la ejecución en curso."""
+    clave = claveMetrica(nombre, etiquetas)
+    with bloqueoMetricas:
+        serie = metricas["contadores"].setdefault(clave, {"nombre": nombre, "etiquetas": etiquetas, "valor": 0})
+        serie["valor"] += cantidad
 
-        if estado.get('campus') == campus and estado.get('periodo') == determinarSemestreActual():
-            printInfo(f"Reanudando sesión previa desde ítem {estado['ultimo_contador'] + 1}.", "advertencia")
-            if os.path.exists(estado['archivo_json']):
-                with open(estado['archivo_json'], 'r', encoding='utf-8') as db_file:
-                    global baseDatosGlobal
-                    baseDatosGlobal = json.load(db_file)
-            return estado
-        else:
-            printInfo("Estado previo no coincide con configuración actual. Iniciando de cero.", "info")
-            limpiarEstado()
-            return None
-            
-    except Exception:
-        return None
+def reiniciarMetricas():
+    """Descarta las métricas de la ejecución anterior (el demonio reporta cada ciclo por separado)."""
+    with bloqueoMetricas:
+        metricas["temporizadores"] = {}
+        metricas["contadores"] = {}
+        metricas["inicio"] = time.time()
 
-def limpiarEstado():
-    if os.path.exists('scraping_state.json'):
-        try:
-            os.remove('scraping_state.json')
-        except:
-            pass
+def reporteMetricas(exito):
+    """Reporte JSON de la ejecución: duraciones por fase (con histograma acumulado) y contadores."""
+    with bloqueoMetricas:
+        temporizadores = {
+            clave: {
+                "cantidad": serie["cantidad"],
+                "suma": round(serie["suma"], 6),
+                "promedio": round(serie["suma"] / serie["cantidad"], 6),
+                "minimo": round(serie["minimo"], 6),
+                "maximo": round(serie["maximo"], 6),
+                "buckets": dict(zip(
+                    [str(limiteBucket) for limiteBucket in bucketsMetricas],
+                    [sum(serie["buckets"][:i + 1]) for i in range(len(bucketsMetricas))]
+                )),
+            }
+            for clave, serie in sorted(metricas["temporizadores"].items())
+        }
+        contadores = {clave: serie["valor"] for clave, serie in sorted(metricas["contadores"].items())}
+        inicio = metricas["inicio"]
+    
+    return {
+        "version": piedmontVersion,
+        "fecha": fechaActual,
+        "exito": exito,
+        "inicio": inicio,
+        "duracion": round(time.time() - inicio, 3),
+        "temporizadores": temporizadores,
+        "contadores": contadores,
+    }
+
+def textoPrometheus(reporte):
+    """
+    Formato de texto de Prometheus (para el textfile collector de node_exporter):
+    los temporizadores como histogramas, los contadores como counters y el
+    resultado de la ejecución como gauges.
+    """
+    lineas = []
+    tiposDeclarados = set()
+    
+    def declarar(nombre, tipo):
+        if nombre not in tiposDeclarados:
+            tiposDeclarados.add(nombre)
+            lineas.append(f"# TYPE {nombre} {tipo}")
+    
+    with bloqueoMetricas:
+        temporizadores = sorted(metricas["temporizadores"].items())
+        contadores = sorted(metricas["contadores"].items())
+    
+    for clave, serie in temporizadores:
+        nombre, etiquetas = serie["nombre"], serie["etiquetas"]
+        declarar(nombre, "histogram")
+        acumulado = 0
+        for limiteBucket, cantidad in zip(bucketsMetricas, serie["buckets"]):
+            acumulado += cantidad
+            lineas.append(f"{claveMetrica(nombre + '_bucket', {**etiquetas, 'le': limiteBucket})} {acumulado}")
+        lineas.append(f"{claveMetrica(nombre + '_bucket', {**etiquetas, 'le': '+Inf'})} {serie['cantidad']}")
+        lineas.append(f"{claveMetrica(nombre + '_sum', etiquetas)} {serie['suma']:.6f}")
+        lineas.append(f"{claveMetrica(nombre + '_count', etiquetas)} {serie['cantidad']}")
+    
+    for clave, serie in contadores:
+        declarar(serie["nombre"], "counter")
+        lineas.append(f"{clave} {serie['valor']}")
+    
+    for nombre, valor in (
+        ("piedmont_ultima_ejecucion_timestamp_segundos", round(reporte["inicio"], 3)),
+        ("piedmont_ultima_ejecucion_duracion_segundos", reporte["duracion"]),
+        ("piedmont_ultima_ejecucion_exito", int(reporte["exito"])),
+    ):
+        declarar(nombre, "gauge")
+        lineas.append(f"{nombre} {valor}")
+    
+    return "\n".join(lineas) + "\n"
 
-def guardarJSON():
-    global baseDatosGlobal, archivoJSONActual, fechaActual
+def exportarMetricas(exito):
+    """
+    Escribe el reporte de la ejecución en metricas/reporte-{fecha}.json y, si
+    `archivoPrometheus` está definido, el mismo contenido en formato Prometheus.
+    Además muestra las fases que más tiempo acumularon.
+    """
+    reporte = reporteMetricas(exito)
     
-    directorioJson = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'json')
-    os.makedirs(directorioJson, exist_ok=True)
-        
-    if archivoJSONActual is None:
-        archivoJSONActual = os.path.join(directorioJson, f"bdd_general-{fechaActual}.json")
+    fases = sorted(reporte["temporizadores"].items(), key=lambda item: item[1]["suma"], reverse=True)
+    for clave, serie in fases[:fasesResumenMetricas]:
+        printInfo(f"Métrica: {clave}: {serie['suma']:.2f}s en {serie['cantidad']} mediciones (prom. {serie['promedio']:.3f}s, máx. {serie['maximo']:.3f}s)")
     
     try:
-        with open(archivoJSONActual, "w", encoding="utf-8") as archivo:
-            json.dump(baseDatosGlobal, archivo, indent=4, ensure_ascii=False)
-        return True
-    except Exception as e:
-        printInfo(f"Error guardando JSON: {e}", "error")
-        return False
+        directorioMetricas = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metricas')
+        os.makedirs(directorioMetricas, exist_ok=True)
+        rutaReporte = os.path.join(directorioMetricas, f"reporte-{fechaActual}.json")
+        escribirAtomico(rutaReporte, lambda archivo: json.dump(reporte, archivo, indent=4, ensure_ascii=False))
+        printInfo(f"Reporte de métricas guardado en {rutaReporte}")
+        
+        if archivoPrometheus:
+            escribirAtomico(archivoPrometheus, lambda archivo: archivo.write(textoPrometheus(reporte)))
+    except OSError as e:
+        printInfo(f"No se pudo guardar el reporte de métricas: {e}", "advertencia")
 
 
 ############################################################################
@@ -707,34 +3745,107 @@ def cambiarFechaActual():
     global fechaActual
     fechaActual = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
-def printInfo(mensaje, color="info", caja=True):
-    """Sistema de logging unificado a consola y archivo."""
-    global fechaActual
+class FormatoLogArchivo(logging.Formatter):
+    """Formato del archivo de log: sin códigos de color ANSI."""
+    def format(self, record):
+        return patronANSI.sub('', super().format(record))
+
+class HandlerLogEjecucion(logging.FileHandler):
+    """
+    Archivo de log de la ejecución en curso (logs/{fechaActual}.txt). Cuando
+    `fechaActual` cambia (cada ciclo del modo demonio), cierra el archivo anterior
+    y sigue escribiendo en el de la nueva ejecución. La fecha se toma del registro
+    (la de su `printInfo`), no del momento en que el hilo del log lo escribe.
+    """
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.fecha = fechaActual
+        super().__init__(os.path.join(directorio, f"{fechaActual}.txt"), encoding="utf-8", delay=True)
+    
+    def emit(self, record):
+        fecha = getattr(record, "fechaEjecucion", fechaActual)
+        if self.fecha != fecha:
+            self.fecha = fecha
+            self.close()
+            self.baseFilename = os.path.join(self.directorio, f"{fecha}.txt")
+        try:
+            super().emit(record)
+        except OSError:
+            pass # Logging silencioso si falla escritura
+
+def iniciarLog():
+    """
+    Prepara el log a archivo: un único handle abierto por ejecución (ver
+    `HandlerLogEjecucion`), escrito por un hilo en segundo plano que consume una
+    cola. Así `printInfo` no abre/cierra el archivo ni escribe a disco en el hilo
+    que hace el trabajo.
+    """
+    global listenerLog
+    
+    if listenerLog is not None:
+        return
     
-    # Escribir a Log
     logDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
     os.makedirs(logDir, exist_ok=True)
-    log_file = os.path.join(logDir, f"{fechaActual}.txt")
     
-    try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            clean_msg = re.sub(r'\x1B\[[0-?]*[ -/]*[@-~]', '', mensaje)
-            f.write(f"[{datetime.now().strftime('%H:%M:%S')}] {clean_msg}\n")
-    except:
-        pass # Logging silencioso si falla escritura
+    handlerArchivo = HandlerLogEjecucion(logDir)
+    handlerArchivo.setFormatter(FormatoLogArchivo("[%(asctime)s] %(message)s", "%H:%M:%S"))
+    
+    cola = queue.SimpleQueue()
+    registroLog.handlers = [QueueHandler(cola)]
+    registroLog.setLevel(logging.DEBUG)
+    registroLog.propagate = False
+    
+    listenerLog = QueueListener(cola, handlerArchivo)
+    listenerLog.start()
+    atexit.register(detenerLog)
+
+def detenerLog():
+    """Escribe lo pendiente en la cola y cierra el archivo de log."""
+    global listenerLog
+    
+    if listenerLog is None:
+        return
+    listenerLog.stop()
+    for handler in listenerLog.handlers:
+        handler.close()
+    listenerLog = None
 
-    # Colores Consola
-    colores = {
+def printInfo(mensaje, color="info", caja=True, nivel=None):
+    """
+    Sistema de logging unificado a consola y archivo.
+    
+    `nivel` ("debug", "info", "advertencia", "error") se deduce del color si no se
+    indica; los mensajes bajo `nivelLog` se descartan por completo.
+    """
+    if nivel is None:
+        nivel = color.lower() if color.lower() in ("error", "advertencia") else "info"
+    if nivelesLog[nivel] < nivelesLog[nivelLog]:
+        return
+    
+    # Escribir a Log (asíncrono)
+    if listenerLog is None:
+        iniciarLog()
+    registroLog.log(nivelesLog[nivel], mensaje, extra={"fechaEjecucion": fechaActual})
+
+    # Colores Consola (sin color hasta `activarColores`)
+    c = coloresConsola.get(color.lower(), coloresConsola["normal"])
+    prefix = f"{coloresConsola['exito']}[+]{c}" if caja else f"{c}"
+    print(f"{prefix} {mensaje}{coloresConsola['reset']}")
+
+def activarColores():
+    """Carga colorama y activa los colores de `printInfo` en la consola."""
+    from colorama import Fore, Style, init
+    
+    init(autoreset=True)
+    coloresConsola.update({
         "normal": Fore.WHITE,
         "info": Fore.LIGHTWHITE_EX,
         "error": Fore.RED,
         "advertencia": Fore.YELLOW,
         "exito": Fore.GREEN,
-    }
-    
-    c = colores.get(color.lower(), Fore.WHITE)
-    prefix = f"{Fore.GREEN}[+]{c}" if caja else f"{c}"
-    print(f"{prefix} {mensaje}{Style.RESET_ALL}")
+        "reset": Style.RESET_ALL,
+    })
 
 def mostrarLogo():
     printInfo(r"       _          _                       _   ", "advertencia", False)
@@ -746,55 +3857,82 @@ def mostrarLogo():
     printInfo(f"Web Scraper/Motor de extracción de Asignaturas para el SIGA de la UTFSM", "info", False)
     printInfo(f"Versión {piedmontVersion} | Revisión {piedmontRevision}\n")
     
-def prepararTodo():
-    global intentosMax, baseDatosGlobal
-    
-    estadoPrevio = cargarEstado()
+def prepararTodo(grupo):
+    """
+    Ciclo completo (scraping + importación) con reintentos para un grupo de
+    objetivos del mismo campus y periodo (sus distintas jornadas). Las jornadas
+    se extraen en paralelo y se importan juntas. Retorna True si se completó.
+    """
+    estados = {objetivo: cargarEstado(objetivo) for objetivo in grupo}
+    pendientes = list(grupo)
     
     for i in range(1, intentosMax + 1):
-        printInfo(f"Intento de ciclo completo {i}/{intentosMax} ...", "advertencia")
+        printInfo(f"Intento de ciclo completo {i}/{intentosMax} ({', '.join(str(o) for o in pendientes)}) ...", "advertencia")
         
         # Scraping
-        exitoScraping = scrapingSIGA(estadoPrevio)
+        with ThreadPoolExecutor(max_workers=len(pendientes)) as pool:
+            exitos = list(pool.map(lambda objetivo: scrapingSIGA(objetivo, estados[objetivo]), pendientes))
+        
+        fallidos = [objetivo for objetivo, exito in zip(pendientes, exitos) if not exito]
+        for objetivo in pendientes:
+            estados[objetivo] = None # Ya no necesitamos reanudar si completamos
+        for objetivo in fallidos:
+            printInfo(f"Fallo en Scraping de {objetivo}. Reiniciando variables...", "error")
+            objetivo.baseDatos = None
+            estados[objetivo] = cargarEstado(objetivo) # Retomar desde lo avanzado en este intento
         
-        if exitoScraping:
-            estadoPrevio = None # Ya no necesitamos reanudar si completamos
+        if not fallidos:
+            # En modo pipeline los datos ya se publicaron durante el scraping
+            if all(objetivo.pipeline for objetivo in grupo):
+                registrarUltimaActualizacion()
+                printInfo("Ciclo completado con éxito. Limpiando estado y saliendo.", "info")
+                for objetivo in grupo:
+                    limpiarEstado(objetivo)
+                return True
             
             # Base de Datos
-            if prepararConexionBDD():
+            if prepararConexionBDD(combinarDatos(grupo)):
                 printInfo("Ciclo completado con éxito. Limpiando estado y saliendo.", "info")
-                limpiarEstado()
-                return
+                for objetivo in grupo:
+                    limpiarEstado(objetivo)
+                return True
             else:
                 printInfo("Fallo en BDD. Reintentando...", "error")
-        else:
-            printInfo("Fallo en Scraping. Reiniciando variables...", "error")
-            baseDatosGlobal = None
+                fallidos = list(grupo)
         
+        pendientes = fallidos
         time.sleep(5) # Cooldown entre intentos
 
     printInfo(f"Se superó el número máximo de intentos ({intentosMax}).", "error")
+    return False
 
-def inicializar():
-    global opcionesChromeDriver, chromeDriverService
-    global usuarioSIGA, passwordSIGA, config
-
-    init(autoreset=True)
-    cambiarFechaActual()
-    mostrarLogo()
+def cargarSelenium():
+    """
+    Importa Selenium como módulos globales. Se hace al preparar el navegador y no
+    al cargar el script, porque la importación de snapshots no lo necesita.
+    """
+    global webdriver, Service, Options, Select, WebDriverWait, By, EC
     
-    config = cargarConfigBDD()
-    if not config: sys.exit(1)
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import Select
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
 
-    usuarioSIGA, passwordSIGA = cargarCredenciales()
-    if not usuarioSIGA: sys.exit(1)
+def configurarNavegador():
+    """Prepara las opciones y el servicio de ChromeDriver usados por `iniciarNavegador`."""
+    global opcionesChromeDriver, chromeDriverService
     
-    # Configuración del Driver
+    cargarSelenium()
     opcionesChromeDriver = Options()
     opcionesChromeDriver.add_argument("--headless")
     opcionesChromeDriver.add_argument("--no-sandbox")
     opcionesChromeDriver.add_argument("--disable-dev-shm-usage")
     opcionesChromeDriver.add_argument("--window-size=1920,1080") # Importante para headless
+    if navegadorLigero:
+        aplicarPerfilLigero(opcionesChromeDriver)
     
     # Solución alternativa para Raspberry Pi 4 (problemas de compatibilidad con Selenium/Chromedriver)
     try:
@@ -806,7 +3944,170 @@ def inicializar():
     except Exception:
         chromeDriverService = Service()
 
-    prepararTodo()
+def ejecutarCiclo(modo, especificaciones=None):
+    """
+    Una ejecución del modo pedido sobre los objetivos "campus:jornada[:periodo]"
+    (ver `interpretarObjetivos`); por defecto se usan `campus` y `jornada`.
+    Retorna True si todos los objetivos se completaron. Al terminar se exporta el
+    reporte de métricas de la ejecución (ver `exportarMetricas`).
+    """
+    reiniciarMetricas()
+    try:
+        objetivos = interpretarObjetivos(especificaciones or objetivosScraping or [f"{campus}:{jornada}"])
+    except ValueError as e:
+        printInfo(str(e), "error")
+        return False
+    
+    if directorioGrabacion:
+        if len(objetivos) != 1:
+            printInfo("El modo grabación requiere un único objetivo.", "error")
+            return False
+        os.makedirs(directorioGrabacion, exist_ok=True)
+        campusGrabado, jornadaGrabada, periodoGrabado = objetivos[0]
+        escribirAtomico(os.path.join(directorioGrabacion, "objetivo.json"), lambda f: json.dump(
+            {"campus": campusGrabado, "jornada": jornadaGrabada, "periodo": periodoGrabado, "fecha": fechaActual}, f
+        ))
+
+    if modo == "cupos":
+        exito = all([refrescarCupos(Objetivo(*objetivo)) for objetivo in objetivos])
+    else:
+        exito = ejecutarObjetivos(objetivos)
+    
+    exportarMetricas(exito)
+    return exito
+
+def ejecutarDemonio(modo, especificaciones=None):
+    """
+    Modo demonio: repite `ejecutarCiclo` cada `intervaloDemonio` minutos sin
+    cerrar los navegadores entre ejecuciones.
+    
+    Los navegadores quedan en un pool con su sesión del SIGA abierta; al
+    reutilizarlos sólo se vuelve a iniciar sesión si ésta expiró, así que las
+    ejecuciones frecuentes no pagan el arranque de Chrome ni el login.
+    """
+    global modoDemonio
+    
+    modoDemonio = True
+    printInfo(f"Modo demonio: una ejecución cada {intervaloDemonio} minutos (Ctrl+C para detener).", "info")
+    
+    try:
+        while True:
+            inicio = time.time()
+            cambiarFechaActual()
+            exito = ejecutarCiclo(modo, especificaciones)
+            printInfo(f"Ejecución {'completada' if exito else 'FALLIDA'} ({len(sesionesSIGA)} sesiones abiertas en el pool).", "exito" if exito else "error")
+            
+            espera = max(0, intervaloDemonio * 60 - (time.time() - inicio))
+            minutos, segundos = segundosAMinutos(espera)
+            printInfo(f"Próxima ejecución en {minutos}m {math.floor(segundos)}s.")
+            time.sleep(espera)
+    except KeyboardInterrupt:
+        printInfo("Demonio detenido.", "advertencia")
+    finally:
+        cerrarNavegadores()
+        modoDemonio = False
+
+def inicializar(modo="completo", especificaciones=None, demonio=False):
+    """
+    Carga configuración y credenciales, prepara ChromeDriver y ejecuta el modo
+    pedido: "completo" (scraping + importación) o "cupos" (ver `refrescarCupos`),
+    una vez o en modo demonio (ver `ejecutarDemonio`).
+    """
+    global usuarioSIGA, passwordSIGA, config
+
+    activarColores()
+    cambiarFechaActual()
+    mostrarLogo()
+    
+    config = cargarConfigBDD()
+    if not config: sys.exit(1)
+
+    usuarioSIGA, passwordSIGA = cargarCredenciales()
+    if not usuarioSIGA: sys.exit(1)
+    
+    # Configuración del Driver
+    configurarNavegador()
+
+    if demonio:
+        ejecutarDemonio(modo, especificaciones)
+    elif not ejecutarCiclo(modo, especificaciones):
+        sys.exit(1)
+
+def inicializarImportacion(rutas):
+    """
+    Entrada de sólo importación (--importar): carga en la BDD snapshots o diarios
+    ya guardados (ver `importarArchivos`). No pide credenciales del SIGA ni
+    carga Selenium ni colorama, así que sirve para restauraciones y
+    reimportaciones tras cambios de esquema.
+    """
+    global config
+    
+    cambiarFechaActual()
+    
+    config = cargarConfigBDD()
+    if not config: sys.exit(1)
+    
+    reiniciarMetricas()
+    exito = importarArchivos(rutas)
+    exportarMetricas(exito)
+    if not exito:
+        sys.exit(1)
+
+def inicializarAPIEstatica():
+    """
+    Entrada de sólo publicación (--publicar-api): vuelve a generar la API estática
+    desde la BDD actual, ej: al instalar Sedona o tras borrar `directorioAPIEstatica`.
+    """
+    global config
+    
+    cambiarFechaActual()
+    
+    config = cargarConfigBDD()
+    if not config: sys.exit(1)
+    
+    if intentarPublicarAPIEstatica() is None:
+        sys.exit(1)
+
+def inicializarHistorial(especificaciones, paralelo=None, ejecuciones=None, rutas=None):
+    """
+    Entrada de consulta del historial de cupos: cupos de un ramo a lo largo de
+    las ejecuciones (--historial), paralelos que cambiaron entre dos ejecuciones
+    (--cambios) o carga del historial desde snapshots viejos (--cargar-historial).
+    El campus y periodo salen del primer --objetivo. No usa el SIGA ni la BDD.
+    """
+    cambiarFechaActual()
+    
+    if rutas:
+        if not cargarHistorialSnapshots(rutas):
+            sys.exit(1)
+        return
+    
+    campusHistorial, _, periodo = interpretarObjetivos(especificaciones or [f"{campus}:{jornada}"])[0]
+    nombreCampus = mapaCampus[campusHistorial]
+    try:
+        if paralelo:
+            sigla, _, numero = paralelo.partition(":")
+            puntos = historialParalelo(nombreCampus, periodo, sigla, numero or None)
+            print(f"{'Ejecución':>10}  {'Fecha':<20}{'Paralelo':<20}{'Cupos':>8}")
+            for ejecucion, fecha, clave, cupos in puntos:
+                print(f"{ejecucion:>10}  {fecha:<20}{clave:<20}{cupos if cupos is not None else '(eliminado)':>8}")
+        else:
+            desde, hasta = ejecuciones
+            cambios = cambiosHistorial(nombreCampus, periodo, desde, hasta)
+            print(f"{len(cambios)} paralelos cambiaron entre las ejecuciones {desde} y {hasta} de {nombreCampus} {periodo}")
+            for clave, (antes, despues) in cambios.items():
+                if antes is None:
+                    detalle = f"nuevo, {despues[0]} cupos"
+                elif despues is None:
+                    detalle = "eliminado"
+                else:
+                    partes = [f"cupos {antes[0]} -> {despues[0]}"] if antes[0] != despues[0] else []
+                    partes += ["horario cambió"] if antes[1] != despues[1] else []
+                    detalle = ", ".join(partes)
+                print(f"  {clave:<20}{detalle}")
+    except (OSError, ValueError) as e:
+        printInfo(f"No se pudo consultar el historial: {e}", "error")
+        sys.exit(1)
 
 #####################################################################################
 
@@ -818,20 +4119,202 @@ passwordSIGA = None
 # Parámetros Operativos
 campus = "7" # (1: CC, 4: Conce, 7: CSSJ, 2: Vitacura, 3: Viña)
 jornada = "1" # (1: diurno, 2: vespertino)
-baseDatosGlobal = None
-archivoJSONActual = None
+objetivosScraping = [] # Objetivos "campus:jornada[:periodo]" (o "todos"); vacío = sólo campus/jornada
 chromeDriverService = None
 opcionesChromeDriver = None
 fechaActual = None
+bloqueoDatos = threading.Lock()
+poolNavegadores = queue.Queue() # Navegadores tibios del modo demonio
+sesionesSIGA = set() # session_id de los navegadores con sesión del SIGA iniciada
+registroLog = logging.getLogger("piedmont")
+listenerLog = None
+patronANSI = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
+cacheHorarios = {}
+coloresConsola = {"normal": "", "info": "", "error": "", "advertencia": "", "exito": "", "reset": ""}
+
+# Mapeo de filas HTML de la tabla de horario a filas lógicas de la matriz (índices 0-9)
+mapaFilas = {
+    1: 0, 20: 1, 39: 2, 58: 3, 77: 4, 96: 5,
+    115: 6, 134: 7, 153: 8, 172: 9
+}
+
+# Mapeo de campus para logs
+mapaCampus = {"1": "Casa Central", "4": "Concepción", "7": "Santiago San Joaquín", "2": "Vitacura", "3": "Viña del Mar"}
+mapaJornadas = {"1": "diurno", "2": "vespertino"}
 
 # Configuración de Tiempos
 timeoutWeb = 2
 limite = 0
-intentosMax = 5
+intentosMax = 5 # Ciclos completos (scraping + importación)
+reintentosFila = 3 # Reintentos de una fila antes de dejarla para la segunda pasada
+retardoBaseReintento = 1 # Segundos antes del primer reintento (se duplica en cada uno)
+retardoMaxReintento = 30 # Tope del backoff en segundos
+
+# Logging
+nivelesLog = {"debug": logging.DEBUG, "info": logging.INFO, "advertencia": logging.WARNING, "error": logging.ERROR}
+nivelLog = "info" # Nivel mínimo a registrar ("debug" incluye el detalle por fila y por tabla SQL)
+
+# Checkpoints (diario NDJSON + snapshot JSON)
+intervaloFsync = 20 # Registros del diario entre cada fsync
+intervaloCompactacion = 500 # Registros del diario antes de compactarlo en el snapshot
+
+# Pipeline scraping -> BDD
+modoPipeline = False # Cargar a staging mientras se extrae, publicar al terminar
+tamanoColaPipeline = 200 # Paralelos en espera como máximo (memoria acotada)
+tamanoLotePipeline = 200 # Paralelos por commit del escritor
+
+# Scraping en paralelo
+trabajadoresScraping = 1 # Sesiones de navegador simultáneas (cada una procesa un fragmento de filas)
+retardoCortesia = 0 # Segundos de espera entre filas por trabajador
+escalonamientoTrabajadores = 3 # Segundos entre el inicio de cada trabajador
+
+# Navegador
+urlSIGA = "https://siga.usm.cl" # Base del portal (piedmont-replay.py la apunta a su servidor local)
+directorioGrabacion = None # Con --grabar DIR se guarda el HTML del listado y de cada horario visitado
+navegadorLigero = True # Bloquear imágenes/CSS/fuentes y desactivar GPU, extensiones y red en segundo plano
+recursosBloqueados = ["*.css", "*.png", "*.jpg", "*.jpeg", "*.gif", "*.ico", "*.svg", "*.woff", "*.woff2", "*.ttf", "*.otf"]
+
+# Modo demonio
+modoDemonio = False # Lo activa --demonio: los navegadores se reutilizan entre ejecuciones
+intervaloDemonio = 30 # Minutos entre el inicio de cada ejecución
+
+# Presupuesto de recursos (compartido por todos los objetivos de la ejecución)
+maxNavegadores = 4 # Navegadores abiertos a la vez, sumando todos los objetivos
+maxConexionesBDD = 2 # Conexiones simultáneas a la BDD (importaciones y escritores del pipeline)
+semaforoNavegadores = threading.BoundedSemaphore(maxNavegadores)
+semaforoBDD = threading.BoundedSemaphore(maxConexionesBDD)
+
+# Descarga directa de horarios (sin popups de Selenium)
+usarHTTPDirecto = True # Si falla una descarga, esa fila usa el popup como respaldo
+concurrenciaHTTP = 4 # Descargas simultáneas por trabajador
+ventanaHTTP = 50 # Filas precargadas por tanda
+timeoutHTTP = 15 # Segundos por petición
+
+# Caché de horarios (evita reabrir horarios de filas sin cambios)
+usarCacheHorarios = True
+archivoCacheHorarios = "cache_horarios.json"
+ttlCacheHorarios = 14 # Días que una entrada es válida sin volver a verificarse
+maxEntradasCache = 50000 # Entradas conservadas como máximo (se descartan las más antiguas)
+fraccionReverificacion = 0.05 # Fracción de aciertos que igual se vuelve a extraer en cada ejecución
+
+# Métricas
+archivoPrometheus = None # Ruta del textfile para node_exporter (ej: /var/lib/node_exporter/textfile/piedmont.prom); None = sólo reporte JSON
+bucketsMetricas = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300) # Límites (segundos) de los histogramas
+fasesResumenMetricas = 5 # Fases más lentas que se muestran al terminar
+metricas = {"temporizadores": {}, "contadores": {}, "inicio": time.time()}
+bloqueoMetricas = threading.Lock()
+
+# Configuración de BDD
+tamanoLoteBDD = 1000 # Filas por INSERT multi-fila / SELECT ... IN
+modoImportacion = "staging" # ("staging": generación nueva + publicación atómica, "diferencial": sólo cambios, "reescritura": DELETE + INSERT)
+tamanoLoteStaging = 2000 # Paralelos por commit al cargar una generación staging
+separadorGeneracion = "~" # Marca los códigos de semestre no publicados (ej: 2025-2~staging)
+bloquesPorDia = 10 # Bloques del horario por día (bits por día en `ocupacion_sala`)
+bytesOcupacion = 9 # Bytes del bitmap de ocupación: 7 días x 10 bloques = 70 bits
+
+# Importación de snapshots (--importar)
+tamanoBloqueLectura = 1 << 20 # Caracteres leídos por bloque al recorrer un snapshot JSON
+
+# Validación previa a la publicación (validacion/{campus}-{periodo}.json guarda la última publicada)
+usarValidacion = True
+forzarPublicacion = False # Lo activa --forzar-publicacion: los motivos sólo se advierten
+maxCuposInvalidos = 0.01 # Fracción de paralelos con cupos no numéricos
+maxSalasSospechosas = 0.01 # Fracción de celdas cuya sala parece un bloque u hora
+maxCaidaParalelos = 0.2 # Caída de paralelos o de celdas de horario respecto a la publicación anterior
+maxAumentoSinHorario = 0.15 # Aumento de la fracción de paralelos sin horario
+maxAumentoConflictos = 0.05 # Aumento de la fracción de celdas con la sala ocupada por otro paralelo
+maxCambioDistribucion = 0.2 # Variación total de la distribución de clases por día y bloque
+minCeldasDistribucion = 1000 # Celdas ocupadas necesarias para comparar la distribución
+patronSalasCompartidas = r"online|virtual|remot|sin sala|por (asignar|definir)" # Salas que varios paralelos usan a la vez sin conflicto
+patronSalaSospechosa = r"^\d{1,2}\s*-\s*\d{1,2}$|\d{1,2}[:.]\d{2}" # "1-2", "8:15"... (texto plegado)
+
+# Historial de cupos (historial/{campus}-{periodo}.ndjson)
+usarHistorial = True
+intervaloKeyframeHistorial = 20 # Ejecuciones entre cada estado completo (las demás guardan sólo los cambios)
+bloqueoHistorial = threading.Lock()
+
+# API estática (JSON precalculado para los selectores de la web)
+usarAPIEstatica = True
+directorioAPIEstatica = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sedona", "estatico")
+versionesAPIEstatica = 3 # Versiones conservadas (la publicada y las anteriores, mínimo 1)
+bloqueoAPIEstatica = threading.Lock()
 
 # Metadatos
 piedmontVersion = "v1.5-optimized"
 piedmontRevision = "20251211"
 
 if __name__ == "__main__":
-    inicializar()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Piedmont: Web-Scraper de asignaturas para el SIGA de la UTFSM.")
+    parser.add_argument(
+        "--solo-cupos", action="store_true",
+        help="Sólo actualizar los cupos del semestre ya importado (sin abrir horarios, salvo paralelos nuevos)."
+    )
+    parser.add_argument(
+        "--objetivo", action="append", metavar="CAMPUS:JORNADA[:PERIODO]",
+        help="Campus y jornada a procesar (repetible; 'todos' = todos los campus y jornadas). Ej: --objetivo 7:1 --objetivo 4:2"
+    )
+    parser.add_argument(
+        "--demonio", action="store_true",
+        help="Repetir la ejecución periódicamente, manteniendo los navegadores abiertos y con sesión entre ejecuciones."
+    )
+    parser.add_argument(
+        "--intervalo", type=float, metavar="MINUTOS",
+        help=f"Minutos entre ejecuciones en modo demonio (por defecto {intervaloDemonio})."
+    )
+    parser.add_argument(
+        "--grabar", metavar="DIR",
+        help="Guardar el HTML del listado y de cada horario en DIR, para reproducirlos con piedmont-replay.py."
+    )
+    parser.add_argument(
+        "--prometheus", metavar="ARCHIVO",
+        help="Escribir además las métricas de cada ejecución en ARCHIVO, en formato de texto de Prometheus."
+    )
+    parser.add_argument(
+        "--forzar-publicacion", action="store_true",
+        help="Publicar aunque la validación previa encuentre problemas (sólo se advierten)."
+    )
+    parser.add_argument(
+        "--api-estatica", metavar="DIR",
+        help="Directorio donde publicar la API estática (por defecto sedona/estatico)."
+    )
+    parser.add_argument(
+        "--publicar-api", action="store_true",
+        help="Sólo volver a generar la API estática desde la BDD actual, sin importar nada."
+    )
+    parser.add_argument(
+        "--importar", nargs="+", metavar="ARCHIVO",
+        help="Sólo importar a la BDD snapshots JSON (json/bdd_general-*.json) o diarios .ndjson ya guardados, sin abrir el SIGA."
+    )
+    parser.add_argument(
+        "--historial", metavar="SIGLA[:PARALELO]",
+        help="Mostrar los cupos de un ramo (o de un paralelo) a lo largo de las ejecuciones guardadas en historial/."
+    )
+    parser.add_argument(
+        "--cambios", nargs=2, type=int, metavar=("DESDE", "HASTA"),
+        help="Mostrar los paralelos cuyos cupos u horario cambiaron entre dos ejecuciones del historial."
+    )
+    parser.add_argument(
+        "--cargar-historial", nargs="+", metavar="ARCHIVO",
+        help="Construir el historial desde snapshots ya guardados (json/bdd_general-*.json), en orden de fecha."
+    )
+    args = parser.parse_args()
+    if args.intervalo:
+        intervaloDemonio = args.intervalo
+    if args.grabar:
+        directorioGrabacion = os.path.abspath(args.grabar)
+        usarCacheHorarios = False # Se graban todos los horarios, no sólo los que cambiaron
+    if args.prometheus:
+        archivoPrometheus = os.path.abspath(args.prometheus)
+    if args.forzar_publicacion:
+        forzarPublicacion = True
+    if args.api_estatica:
+        directorioAPIEstatica = os.path.abspath(args.api_estatica)
+    
+    if args.publicar_api:
+        inicializarAPIEstatica()
+    elif args.importar:
+        inicializarImportacion(args.importar)
+    elif args.historial or args.cambios or args.cargar_historial:
+        inicializarHistorial(args.objetivo, args.historial, args.cambios, args.cargar_historial)
+    else:
+        inicializar("cupos" if args.solo_cupos else "completo", args.objetivo, args.demonio)
\ No newline at end of file
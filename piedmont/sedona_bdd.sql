@@ -110,4 +110,61 @@ CREATE TABLE IF NOT EXISTS `horario` (
     REFERENCES `paralelo` (`id`)
     ON DELETE CASCADE
     ON UPDATE CASCADE
-) ENGINE = InnoDB;
\ No newline at end of file
+) ENGINE = InnoDB;
+
+-- -----------------------------------------------------
+-- Table `ocupacion_sala` (Derivada, la genera Piedmont al importar)
+-- -----------------------------------------------------
+-- Bitmap de la semana por sala: el bit (dia_semana - 1) * 10 + (bloque_inicio - 1)
+-- está en 1 si la sala tiene clases en ese bloque. 70 bits en 9 bytes (little-endian).
+CREATE TABLE IF NOT EXISTS `ocupacion_sala` (
+  `semestre_id` INT UNSIGNED NOT NULL,
+  `sala` VARCHAR(40) NOT NULL,             -- Ej: 'A001' (igual que horario.sala)
+  `ocupacion` BINARY(9) NOT NULL,
+  PRIMARY KEY (`semestre_id`, `sala`),
+  CONSTRAINT `fk_ocupacion_sala_semestre`
+    FOREIGN KEY (`semestre_id`)
+    REFERENCES `semestre` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE = InnoDB;
+
+-- -----------------------------------------------------
+-- Table `estadisticas_semestre` (Derivada, la genera Piedmont al importar)
+-- -----------------------------------------------------
+-- Totales y rankings del semestre que muestra estadisticas.php, en JSON.
+CREATE TABLE IF NOT EXISTS `estadisticas_semestre` (
+  `semestre_id` INT UNSIGNED NOT NULL,
+  `datos` JSON NOT NULL,
+  `generado` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`semestre_id`),
+  CONSTRAINT `fk_estadisticas_semestre_semestre`
+    FOREIGN KEY (`semestre_id`)
+    REFERENCES `semestre` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE = InnoDB;
+
+-- -----------------------------------------------------
+-- Table `indice_busqueda` (Derivada, la genera Piedmont al importar)
+-- -----------------------------------------------------
+-- Trigramas (sin tildes, en minúsculas) del código, nombre y profesores de cada
+-- asignatura. buscar_asignaturas.php busca las asignaturas que contienen todos los
+-- trigramas de la consulta, o las más parecidas si ninguna los tiene todos.
+CREATE TABLE IF NOT EXISTS `indice_busqueda` (
+  `semestre_id` INT UNSIGNED NOT NULL,
+  `termino` CHAR(3) NOT NULL,              -- Ej: 'cal', 'alc', 'lcu' (de 'Cálculo')
+  `asignatura_id` INT UNSIGNED NOT NULL,
+  PRIMARY KEY (`semestre_id`, `termino`, `asignatura_id`),
+  INDEX `fk_indice_busqueda_asignatura_idx` (`asignatura_id` ASC),
+  CONSTRAINT `fk_indice_busqueda_semestre`
+    FOREIGN KEY (`semestre_id`)
+    REFERENCES `semestre` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+  CONSTRAINT `fk_indice_busqueda_asignatura`
+    FOREIGN KEY (`asignatura_id`)
+    REFERENCES `asignatura` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE = InnoDB;
@@ -77,6 +77,7 @@ try {
                 FROM semestre s
                 JOIN campus c ON s.campus_id = c.id
                 WHERE c.nombre = ?
+                AND s.codigo NOT LIKE '%~%' -- Generaciones no publicadas de Piedmont (staging/retiro)
                 ORDER BY s.codigo DESC
             ");
             $stmt->execute([$campus]);
@@ -33,6 +33,98 @@ function normalizar_texto($texto) {
     return '%' . implode('%', $partes) . '%';
 }
 
+/**
+ * @brief Obtiene los trigramas de búsqueda de un texto, igual que los indexa Piedmont.
+ * Pliega tildes y mayúsculas, divide en palabras (letras y dígitos) y toma las secuencias
+ * de 3 caracteres de cada palabra; las palabras más cortas no aportan trigramas.
+ * @param string $texto Texto entrada.
+ * @return array Trigramas distintos.
+ */
+function trigramas_busqueda($texto) {
+    $texto = html_entity_decode($texto, ENT_QUOTES, 'UTF-8');
+    if (class_exists('Normalizer')) {
+        $texto = preg_replace('/\p{Mn}+/u', '', Normalizer::normalize($texto, Normalizer::FORM_D));
+    } else {
+        $texto = strtr($texto, ['á' => 'a', 'é' => 'e', 'í' => 'i', 'ó' => 'o', 'ú' => 'u', 'ü' => 'u', 'ñ' => 'n',
+                                'Á' => 'A', 'É' => 'E', 'Í' => 'I', 'Ó' => 'O', 'Ú' => 'U', 'Ü' => 'U', 'Ñ' => 'N']);
+    }
+    preg_match_all('/[\p{L}\p{N}]+/u', mb_strtolower($texto, 'UTF-8'), $palabras);
+
+    $trigramas = [];
+    foreach ($palabras[0] as $palabra) {
+        $largo = mb_strlen($palabra, 'UTF-8');
+        for ($i = 0; $i + 3 <= $largo; $i++) {
+            $trigramas[mb_substr($palabra, $i, 3, 'UTF-8')] = true;
+        }
+    }
+    return array_keys($trigramas);
+}
+
+/**
+ * @brief Busca las asignaturas candidatas en el índice de trigramas (tabla indice_busqueda).
+ * Las asignaturas que contienen todos los trigramas de la búsqueda son candidatas exactas
+ * (luego se filtran con LIKE). Si ninguna los contiene todos, se devuelven las más parecidas
+ * (con al menos la mitad de los trigramas) como resultados aproximados.
+ *
+ * @param PDO $pdo Objeto conexión.
+ * @param string $busqueda Texto buscado.
+ * @param string $campus Campus.
+ * @param string $semestre Semestre.
+ * @return array|null ['ids' => array, 'aproximados' => bool], o null si el índice no sirve
+ *                    para esta búsqueda (sin trigramas, o semestre sin indexar).
+ */
+function buscar_en_indice($pdo, $busqueda, $campus, $semestre) {
+    $trigramas = trigramas_busqueda($busqueda);
+    if (empty($trigramas)) {
+        return null;
+    }
+
+    try {
+        $stmt = $pdo->prepare("
+            SELECT s.id FROM semestre s
+            JOIN campus c ON s.campus_id = c.id
+            JOIN indice_busqueda i ON i.semestre_id = s.id
+            WHERE c.nombre = :campus AND s.codigo = :semestre
+            LIMIT 1
+        ");
+        $stmt->execute([':campus' => $campus, ':semestre' => $semestre]);
+        $semestre_id = $stmt->fetchColumn();
+        if ($semestre_id === false) {
+            return null;
+        }
+
+        $marcadores = [];
+        $params = [':semestre_id' => $semestre_id];
+        foreach ($trigramas as $i => $trigrama) {
+            $marcadores[] = ":t$i";
+            $params[":t$i"] = $trigrama;
+        }
+        $stmt = $pdo->prepare("
+            SELECT asignatura_id, COUNT(*) AS coincidencias
+            FROM indice_busqueda
+            WHERE semestre_id = :semestre_id AND termino IN (" . implode(', ', $marcadores) . ")
+            GROUP BY asignatura_id
+            ORDER BY coincidencias DESC
+        ");
+        $stmt->execute($params);
+        $coincidencias = $stmt->fetchAll(PDO::FETCH_KEY_PAIR);
+    } catch (PDOException $e) {
+        // Esquema sin la tabla indice_busqueda: se busca sin índice
+        error_log("Índice de búsqueda no disponible: " . $e->getMessage());
+        return null;
+    }
+
+    $total = count($trigramas);
+    $exactos = array_keys($coincidencias, $total);
+    if (!empty($exactos)) {
+        return ['ids' => $exactos, 'aproximados' => false];
+    }
+
+    $minimo = max(2, (int) ceil($total / 2));
+    $parecidos = array_keys(array_filter($coincidencias, fn($n) => $n >= $minimo));
+    return ['ids' => array_slice($parecidos, 0, 10), 'aproximados' => true];
+}
+
 /**
  * @brief Carga parámetros GET.
  * @throws Exception Si faltan parámetros.
@@ -69,7 +161,7 @@ function cargar_parametros() {
  * @param string $busqueda Texto buscado.
  * @param string $campus Campus.
  * @param string $semestre Semestre.
- * @return array Resultados planos de la DB.
+ * @return array ['resultados' => resultados planos de la DB, 'aproximados' => bool].
  */
 function buscar_asignaturas($pdo, $busqueda, $campus, $semestre) {
     // Detección de patrón "CODIGO-PARALELO" (Ej: MAT024-200)
@@ -101,6 +193,7 @@ function buscar_asignaturas($pdo, $busqueda, $campus, $semestre) {
         ':campus' => $campus,
         ':semestre' => $semestre
     ];
+    $aproximados = false;
 
     if ($es_paralelo) {
         // Búsqueda exacta de paralelo
@@ -108,14 +201,31 @@ function buscar_asignaturas($pdo, $busqueda, $campus, $semestre) {
         $params[':codigo'] = normalizar_exacto($matches[1]);
         $params[':paralelo'] = normalizar_exacto($matches[2]);
     } else {
-        // Búsqueda general (Nombre, Código o Profesor)
-        $busqueda_norm = normalizar_texto($busqueda);
-        $sql .= " AND (
-            a.codigo LIKE :busqueda 
-            OR a.nombre LIKE :busqueda 
-            OR pr.nombre LIKE :busqueda
-        )";
-        $params[':busqueda'] = $busqueda_norm;
+        // Búsqueda general (Nombre, Código o Profesor). El índice de trigramas acota las
+        // asignaturas candidatas; el LIKE sólo se evalúa sobre ellas.
+        $indice = buscar_en_indice($pdo, $busqueda, $campus, $semestre);
+        if ($indice !== null) {
+            if (empty($indice['ids'])) {
+                return ['resultados' => [], 'aproximados' => false];
+            }
+            $marcadores = [];
+            foreach ($indice['ids'] as $i => $id) {
+                $marcadores[] = ":id$i";
+                $params[":id$i"] = $id;
+            }
+            $sql .= " AND a.id IN (" . implode(', ', $marcadores) . ")";
+            $aproximados = $indice['aproximados'];
+        }
+
+        if (!$aproximados) {
+            $busqueda_norm = normalizar_texto($busqueda);
+            $sql .= " AND (
+                a.codigo LIKE :busqueda 
+                OR a.nombre LIKE :busqueda 
+                OR pr.nombre LIKE :busqueda
+            )";
+            $params[':busqueda'] = $busqueda_norm;
+        }
     }
 
     $sql .= " GROUP BY a.id, p.id, h.dia_semana, h.bloque_inicio";
@@ -123,7 +233,7 @@ function buscar_asignaturas($pdo, $busqueda, $campus, $semestre) {
     $stmt = $pdo->prepare($sql);
     $stmt->execute($params);
     
-    return $stmt->fetchAll(PDO::FETCH_ASSOC);
+    return ['resultados' => $stmt->fetchAll(PDO::FETCH_ASSOC), 'aproximados' => $aproximados];
 }
 
 /**
@@ -137,14 +247,19 @@ function buscar_asignaturas($pdo, $busqueda, $campus, $semestre) {
  * @param string $semestre Código del semestre para mostrar en el header y generar enlaces.
  * @param string $busqueda Término de búsqueda original para mostrar en el título.
  * @param bool $ocultar_vacios Flag para ocultar bloques horarios sin clases.
+ * @param bool $aproximados Si los resultados son aproximados (sin coincidencias exactas).
  * @return void Genera salida HTML directa.
  */
-function mostrar_resultados($resultados, $campus, $semestre, $busqueda, $ocultar_vacios) {
+function mostrar_resultados($resultados, $campus, $semestre, $busqueda, $ocultar_vacios, $aproximados = false) {
     if (empty($resultados)) {
         echo '<div class="alert alert-info mt-4">No se encontraron resultados para "' . htmlspecialchars($busqueda) . '"</div>';
         return;
     }
 
+    if ($aproximados) {
+        echo '<div class="alert alert-warning mt-4">No se encontraron resultados exactos para "' . htmlspecialchars($busqueda) . '". Se muestran resultados aproximados.</div>';
+    }
+
     echo '<div class="card mt-4">';
     echo '<div class="card-header bg-primary text-white">';
     echo '<h4 class="mb-0">Resultados para: "' . htmlspecialchars($busqueda) . '"</h4>';
@@ -302,8 +417,8 @@ function mostrar_horario($horarios, $campus, $semestre, $ocultar_vacios) {
 try {
     if (isset($_GET['codigo'], $_GET['campus'], $_GET['semestre'])) {
         $params = cargar_parametros();
-        $resultados = buscar_asignaturas($pdo, $params['busqueda'], $params['campus'], $params['semestre']);
-        mostrar_resultados($resultados, $params['campus'], $params['semestre'], $params['busqueda'], $params['ocultar_vacios']);
+        $busqueda = buscar_asignaturas($pdo, $params['busqueda'], $params['campus'], $params['semestre']);
+        mostrar_resultados($busqueda['resultados'], $params['campus'], $params['semestre'], $params['busqueda'], $params['ocultar_vacios'], $busqueda['aproximados']);
     }
 } catch (Exception $e) {
     error_log("Error en buscar_asignaturas.php: " . $e->getMessage());
@@ -118,6 +118,57 @@ function obtener_mapa_ocupacion($pdo, $campus, $semestre, $dia) {
     return $mapa;
 }
 
+/**
+ * @brief Obtiene salas y ocupación del día desde la tabla derivada `ocupacion_sala`.
+ * La tabla la genera Piedmont al importar: una fila por sala con un bitmap de 70 bits
+ * (7 días x 10 bloques), así que basta un recorrido por índice y pruebas de bits,
+ * sin unir horario/paralelo/asignatura.
+ *
+ * @param PDO $pdo Conexión a la base de datos.
+ * @param string $campus Nombre del campus.
+ * @param string $semestre Código del semestre.
+ * @param int $dia Número del día (1=Lunes, etc).
+ * @return array|null [lista de salas, mapa de ocupación] con el mismo formato que
+ *                    `obtener_salas_campus` y `obtener_mapa_ocupacion`, o null si la
+ *                    tabla no existe o no tiene datos del semestre.
+ */
+function obtener_ocupacion_precalculada($pdo, $campus, $semestre, $dia) {
+    $sql = "
+        SELECT o.sala, o.ocupacion
+        FROM ocupacion_sala o
+        JOIN semestre s ON o.semestre_id = s.id
+        JOIN campus c ON s.campus_id = c.id
+        WHERE c.nombre = :campus
+        AND s.codigo = :semestre
+        ORDER BY o.sala ASC
+    ";
+
+    try {
+        $stmt = $pdo->prepare($sql);
+        $stmt->execute([':campus' => $campus, ':semestre' => $semestre]);
+        $filas = $stmt->fetchAll(PDO::FETCH_KEY_PAIR);
+    } catch (PDOException $e) {
+        // BDD sin la tabla derivada (esquema anterior): se usa la consulta sobre horario
+        return null;
+    }
+
+    if (!$filas) {
+        return null;
+    }
+
+    $mapa = [];
+    foreach ($filas as $sala => $bitmap) {
+        for ($bloque = 1; $bloque <= 10; $bloque++) {
+            $bit = ($dia - 1) * 10 + ($bloque - 1);
+            if ((ord($bitmap[$bit >> 3]) >> ($bit & 7)) & 1) {
+                $mapa[$sala][] = $bloque;
+            }
+        }
+    }
+
+    return [array_map('strval', array_keys($filas)), $mapa];
+}
+
 /**
  * @brief Genera y renderiza la tabla HTML con los resultados.
  *
@@ -201,18 +252,30 @@ try {
         
         $params = cargar_parametros();
         
-        // Obtener listado maestro de salas
-        $salas = obtener_salas_campus($pdo, $params['campus'], $params['semestre']);
-
-        // Obtener mapa de ocupación (Eager Loading)
-        // Esto reduce cientos de consultas a una nomás
-        $mapa_ocupacion = obtener_mapa_ocupacion(
-            $pdo, 
-            $params['campus'], 
-            $params['semestre'], 
+        // Salas y ocupación precalculadas por el importador (una sola consulta indexada)
+        $precalculado = obtener_ocupacion_precalculada(
+            $pdo,
+            $params['campus'],
+            $params['semestre'],
             $params['dia']
         );
 
+        if ($precalculado !== null) {
+            [$salas, $mapa_ocupacion] = $precalculado;
+        } else {
+            // Obtener listado maestro de salas
+            $salas = obtener_salas_campus($pdo, $params['campus'], $params['semestre']);
+
+            // Obtener mapa de ocupación (Eager Loading)
+            // Esto reduce cientos de consultas a una nomás
+            $mapa_ocupacion = obtener_mapa_ocupacion(
+                $pdo, 
+                $params['campus'], 
+                $params['semestre'], 
+                $params['dia']
+            );
+        }
+
         // Renderizar
         generar_tabla_resultados(
             $salas, 
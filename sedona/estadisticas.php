@@ -37,135 +37,180 @@ function convertir_dia($numero) {
     return $dias[$numero - 1] ?? 'Desconocido';
 }
 
-// --- Consultas de Totales ---
+/**
+ * Obtiene las estadísticas precalculadas por Piedmont al importar un semestre.
+ * @param PDO $pdo Conexión a la BDD.
+ * @param string $campus Nombre del campus.
+ * @param string $semestre Código del semestre (ej: 2025-2).
+ * @return array|null Totales y rankings del semestre, o null si no están disponibles.
+ */
+function cargar_estadisticas_precalculadas($pdo, $campus, $semestre) {
+    try {
+        $stmt = $pdo->prepare("
+            SELECT e.datos
+            FROM estadisticas_semestre e
+            JOIN semestre s ON e.semestre_id = s.id
+            JOIN campus c ON s.campus_id = c.id
+            WHERE c.nombre = :campus AND s.codigo = :semestre
+        ");
+        $stmt->execute([':campus' => $campus, ':semestre' => $semestre]);
+        $datos = $stmt->fetchColumn();
+    } catch (PDOException $e) {
+        // Tabla aún no creada: se usan las consultas en vivo
+        return null;
+    }
+    if ($datos === false) {
+        return null;
+    }
+    $estadisticas = json_decode($datos, true);
+    return is_array($estadisticas) ? $estadisticas : null;
+}
+
+// Un semestre filtrado usa las estadísticas guardadas en la importación;
+// la vista global (o un semestre sin ellas) se calcula con las consultas en vivo
+$estadisticas = $hay_filtro ? cargar_estadisticas_precalculadas($pdo, $campus_filtro, $semestre_filtro) : null;
 
-// Total Asignaturas
-$sql = "SELECT COUNT(*) AS total FROM asignatura a" . ($hay_filtro ? $join_base_semestre . $where_clause : "");
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$total_asignaturas = $stmt->fetch(PDO::FETCH_ASSOC)['total'];
+if ($estadisticas !== null) {
+    $total_asignaturas = $estadisticas['asignaturas'];
+    $totalParalelos = $estadisticas['paralelos'];
+    $total_profesores = $estadisticas['profesores'];
+    $profesor_mas_paralelos = $estadisticas['profesor_mas_paralelos'];
+    $profesor_mas_asignaturas = $estadisticas['profesor_mas_asignaturas'];
+    $dia_mas_ocupado = $estadisticas['dia_mas_ocupado'];
+    $asignatura_mas_profesores = $estadisticas['asignatura_mas_profesores'];
+    $sala_mas_usada = $estadisticas['sala_mas_usada'];
+    $asignatura_mas_paralelos = $estadisticas['asignatura_mas_paralelos'];
+} else {
+    // --- Consultas de Totales ---
 
-// Total Paralelos
-$sql = "SELECT COUNT(*) AS total FROM paralelo p JOIN asignatura a ON p.asignatura_id = a.id" . ($hay_filtro ? $join_base_semestre . $where_clause : "");
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$totalParalelos = $stmt->fetch(PDO::FETCH_ASSOC)['total'];
+    // Total Asignaturas
+    $sql = "SELECT COUNT(*) AS total FROM asignatura a" . ($hay_filtro ? $join_base_semestre . $where_clause : "");
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $total_asignaturas = $stmt->fetch(PDO::FETCH_ASSOC)['total'];
 
-// Total Profesores (Excluyendo NN)
-if ($hay_filtro) {
-    // Si hay filtro, contamos solo los profesores activos en ese semestre/campus
+    // Total Paralelos
+    $sql = "SELECT COUNT(*) AS total FROM paralelo p JOIN asignatura a ON p.asignatura_id = a.id" . ($hay_filtro ? $join_base_semestre . $where_clause : "");
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $totalParalelos = $stmt->fetch(PDO::FETCH_ASSOC)['total'];
+
+    // Total Profesores (Excluyendo NN)
+    if ($hay_filtro) {
+        // Si hay filtro, contamos solo los profesores activos en ese semestre/campus
+        $sql = "
+            SELECT COUNT(DISTINCT pp.profesor_id) AS total 
+            FROM paralelo_profesor pp
+            JOIN paralelo p ON pp.paralelo_id = p.id
+            JOIN asignatura a ON p.asignatura_id = a.id
+            JOIN profesor pr ON pp.profesor_id = pr.id
+            $join_base_semestre
+            $where_clause
+            AND pr.nombre != 'NN'
+        ";
+    } else {
+        // Si es global, contamos todos los profesores registrados en la BDD
+        $sql = "SELECT COUNT(*) AS total FROM profesor WHERE nombre != 'NN'";
+    }
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $total_profesores = $stmt->fetch(PDO::FETCH_ASSOC)['total'];
+
+
+    // --- Consultas de Rankings (Top 1) ---
+
+    // Profesor con más paralelos (Excluyendo NN)
     $sql = "
-        SELECT COUNT(DISTINCT pp.profesor_id) AS total 
-        FROM paralelo_profesor pp
+        SELECT pr.nombre, COUNT(*) AS total_paralelos
+        FROM profesor pr
+        JOIN paralelo_profesor pp ON pr.id = pp.profesor_id
         JOIN paralelo p ON pp.paralelo_id = p.id
         JOIN asignatura a ON p.asignatura_id = a.id
-        JOIN profesor pr ON pp.profesor_id = pr.id
-        $join_base_semestre
-        $where_clause
-        AND pr.nombre != 'NN'
+        " . ($hay_filtro ? $join_base_semestre . $where_clause . " AND " : " WHERE ") . " pr.nombre != 'NN'
+        GROUP BY pr.id
+        ORDER BY total_paralelos DESC
+        LIMIT 1
     ";
-} else {
-    // Si es global, contamos todos los profesores registrados en la BDD
-    $sql = "SELECT COUNT(*) AS total FROM profesor WHERE nombre != 'NN'";
-}
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$total_profesores = $stmt->fetch(PDO::FETCH_ASSOC)['total'];
-
-
-// --- Consultas de Rankings (Top 1) ---
-
-// Profesor con más paralelos (Excluyendo NN)
-$sql = "
-    SELECT pr.nombre, COUNT(*) AS total_paralelos
-    FROM profesor pr
-    JOIN paralelo_profesor pp ON pr.id = pp.profesor_id
-    JOIN paralelo p ON pp.paralelo_id = p.id
-    JOIN asignatura a ON p.asignatura_id = a.id
-    " . ($hay_filtro ? $join_base_semestre . $where_clause . " AND " : " WHERE ") . " pr.nombre != 'NN'
-    GROUP BY pr.id
-    ORDER BY total_paralelos DESC
-    LIMIT 1
-";
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$profesor_mas_paralelos = $stmt->fetch(PDO::FETCH_ASSOC);
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $profesor_mas_paralelos = $stmt->fetch(PDO::FETCH_ASSOC);
 
-// Profesor con más asignaturas distintas (Excluyendo NN)
-$sql = "
-    SELECT pr.nombre, COUNT(DISTINCT a.id) AS total_asignaturas
-    FROM profesor pr
-    JOIN paralelo_profesor pp ON pr.id = pp.profesor_id
-    JOIN paralelo p ON pp.paralelo_id = p.id
-    JOIN asignatura a ON p.asignatura_id = a.id
-    " . ($hay_filtro ? $join_base_semestre . $where_clause . " AND " : " WHERE ") . " pr.nombre != 'NN'
-    GROUP BY pr.id
-    ORDER BY total_asignaturas DESC
-    LIMIT 1
-";
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$profesor_mas_asignaturas = $stmt->fetch(PDO::FETCH_ASSOC);
+    // Profesor con más asignaturas distintas (Excluyendo NN)
+    $sql = "
+        SELECT pr.nombre, COUNT(DISTINCT a.id) AS total_asignaturas
+        FROM profesor pr
+        JOIN paralelo_profesor pp ON pr.id = pp.profesor_id
+        JOIN paralelo p ON pp.paralelo_id = p.id
+        JOIN asignatura a ON p.asignatura_id = a.id
+        " . ($hay_filtro ? $join_base_semestre . $where_clause . " AND " : " WHERE ") . " pr.nombre != 'NN'
+        GROUP BY pr.id
+        ORDER BY total_asignaturas DESC
+        LIMIT 1
+    ";
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $profesor_mas_asignaturas = $stmt->fetch(PDO::FETCH_ASSOC);
 
-// Día con más bloques horarios
-$sql = "
-    SELECT h.dia_semana, COUNT(*) AS total_bloques
-    FROM horario h
-    JOIN paralelo p ON h.paralelo_id = p.id
-    JOIN asignatura a ON p.asignatura_id = a.id
-    " . ($hay_filtro ? $join_base_semestre . $where_clause : "") . "
-    GROUP BY h.dia_semana
-    ORDER BY total_bloques DESC
-    LIMIT 1
-";
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$dia_mas_ocupado = $stmt->fetch(PDO::FETCH_ASSOC);
+    // Día con más bloques horarios
+    $sql = "
+        SELECT h.dia_semana, COUNT(*) AS total_bloques
+        FROM horario h
+        JOIN paralelo p ON h.paralelo_id = p.id
+        JOIN asignatura a ON p.asignatura_id = a.id
+        " . ($hay_filtro ? $join_base_semestre . $where_clause : "") . "
+        GROUP BY h.dia_semana
+        ORDER BY total_bloques DESC
+        LIMIT 1
+    ";
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $dia_mas_ocupado = $stmt->fetch(PDO::FETCH_ASSOC);
 
-// Asignatura con más profesores distintos (Excluyendo NN)
-$sql = "
-    SELECT a.nombre, COUNT(DISTINCT pp.profesor_id) AS total_profesores
-    FROM asignatura a
-    JOIN paralelo p ON a.id = p.asignatura_id
-    JOIN paralelo_profesor pp ON p.id = pp.paralelo_id
-    JOIN profesor pr ON pp.profesor_id = pr.id
-    " . ($hay_filtro ? $join_base_semestre . $where_clause . " AND " : " WHERE ") . " pr.nombre != 'NN'
-    GROUP BY a.id
-    ORDER BY total_profesores DESC
-    LIMIT 1
-";
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$asignatura_mas_profesores = $stmt->fetch(PDO::FETCH_ASSOC);
+    // Asignatura con más profesores distintos (Excluyendo NN)
+    $sql = "
+        SELECT a.nombre, COUNT(DISTINCT pp.profesor_id) AS total_profesores
+        FROM asignatura a
+        JOIN paralelo p ON a.id = p.asignatura_id
+        JOIN paralelo_profesor pp ON p.id = pp.paralelo_id
+        JOIN profesor pr ON pp.profesor_id = pr.id
+        " . ($hay_filtro ? $join_base_semestre . $where_clause . " AND " : " WHERE ") . " pr.nombre != 'NN'
+        GROUP BY a.id
+        ORDER BY total_profesores DESC
+        LIMIT 1
+    ";
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $asignatura_mas_profesores = $stmt->fetch(PDO::FETCH_ASSOC);
 
-// Sala más utilizada
-$sql = "
-    SELECT h.sala, COUNT(*) AS usos 
-    FROM horario h
-    JOIN paralelo p ON h.paralelo_id = p.id
-    JOIN asignatura a ON p.asignatura_id = a.id
-    " . ($hay_filtro ? $join_base_semestre . $where_clause : "") . "
-    GROUP BY h.sala 
-    ORDER BY usos DESC 
-    LIMIT 1
-";
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$sala_mas_usada = $stmt->fetch(PDO::FETCH_ASSOC);
+    // Sala más utilizada
+    $sql = "
+        SELECT h.sala, COUNT(*) AS usos 
+        FROM horario h
+        JOIN paralelo p ON h.paralelo_id = p.id
+        JOIN asignatura a ON p.asignatura_id = a.id
+        " . ($hay_filtro ? $join_base_semestre . $where_clause : "") . "
+        GROUP BY h.sala 
+        ORDER BY usos DESC 
+        LIMIT 1
+    ";
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $sala_mas_usada = $stmt->fetch(PDO::FETCH_ASSOC);
 
-// Asignatura con mayor cantidad de paralelos
-$sql = "
-    SELECT a.nombre, COUNT(p.id) AS total_paralelos
-    FROM asignatura a
-    JOIN paralelo p ON a.id = p.asignatura_id
-    " . ($hay_filtro ? $join_base_semestre . $where_clause : "") . "
-    GROUP BY a.id
-    ORDER BY total_paralelos DESC
-    LIMIT 1
-";
-$stmt = $pdo->prepare($sql);
-$stmt->execute($params);
-$asignatura_mas_paralelos = $stmt->fetch(PDO::FETCH_ASSOC);
+    // Asignatura con mayor cantidad de paralelos
+    $sql = "
+        SELECT a.nombre, COUNT(p.id) AS total_paralelos
+        FROM asignatura a
+        JOIN paralelo p ON a.id = p.asignatura_id
+        " . ($hay_filtro ? $join_base_semestre . $where_clause : "") . "
+        GROUP BY a.id
+        ORDER BY total_paralelos DESC
+        LIMIT 1
+    ";
+    $stmt = $pdo->prepare($sql);
+    $stmt->execute($params);
+    $asignatura_mas_paralelos = $stmt->fetch(PDO::FETCH_ASSOC);
+}
 
 ?>
 <?php require_once 'header.php'; ?>
@@ -6,8 +6,58 @@ document.addEventListener('DOMContentLoaded', () => {
     const selectedCampus = urlParams.get('campus') || '';
     const selectedSemestre = urlParams.get('semestre') || '';
 
+    // --- API estática (JSON que Piedmont genera en cada importación) ---
+    // Se lee la versión publicada (version.json, sin caché) y los recursos se piden
+    // bajo el directorio de esa versión, así una página no mezcla dos publicaciones.
+    // Si no está disponible, se usa api.php
+    const rutaEstatica = 'estatico';
+    let versionEstatica = null;
+    let rutasCampus = null;
+    const rutasSemestre = {};
+    const paralelosCargados = {};
+
+    async function cargarVersionEstatica() {
+        const response = await fetch(`${rutaEstatica}/version.json`, { credentials: 'same-origin', cache: 'no-store' });
+        if (!response.ok) throw new Error('API estática no disponible: version.json');
+        return (await response.json()).version;
+    }
+
+    async function cargarEstatico(ruta) {
+        versionEstatica ??= cargarVersionEstatica().catch(error => {
+            versionEstatica = null;
+            throw error;
+        });
+        const version = await versionEstatica;
+        const response = await fetch(`${rutaEstatica}/${version}/${ruta}`, { credentials: 'same-origin' });
+        if (!response.ok) throw new Error(`API estática no disponible: ${ruta}`);
+        return response.json();
+    }
+
+    function rutaSemestre(campus, semestre) {
+        const ruta = rutasSemestre[campus]?.[semestre];
+        return ruta ? `${rutasCampus[campus]}/${ruta}` : null;
+    }
+
+    function llenarOpciones(select, opciones, etiqueta, sinOpciones) {
+        if (opciones.length === 0) {
+            select.replaceChildren(new Option(sinOpciones, ''));
+            return;
+        }
+        select.replaceChildren(new Option(etiqueta, ''), ...opciones.map(([valor, texto]) => new Option(texto, valor)));
+    }
+
     // --- Funciones de carga comunes ---
     async function cargarCampus(campusSeleccionado = '') {
+        try {
+            const campus = await cargarEstatico('campus.json');
+            rutasCampus = Object.fromEntries(campus.map(c => [c.nombre, c.ruta]));
+            llenarOpciones(campusSelect, campus.map(c => [c.nombre, c.nombre]), 'Seleccionar campus', 'Seleccionar campus');
+            campusSelect.value = campusSeleccionado;
+            return;
+        } catch (error) {
+            rutasCampus = null;
+        }
+
         try {
             const response = await fetch(`api.php?action=campus&selected=${encodeURIComponent(campusSeleccionado)}`, {
                 method: 'GET',
@@ -31,6 +81,19 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
         
+        if (rutasCampus && rutasCampus[campus]) {
+            try {
+                const semestres = await cargarEstatico(`${rutasCampus[campus]}/semestres.json`);
+                rutasSemestre[campus] = Object.fromEntries(semestres.map(s => [s.codigo, s.ruta]));
+                llenarOpciones(semestreSelect, semestres.map(s => [s.codigo, s.codigo]), 'Seleccionar semestre', 'No hay semestres disponibles');
+                semestreSelect.disabled = false;
+                semestreSelect.value = semestreSeleccionado;
+                return;
+            } catch (error) {
+                console.warn(error);
+            }
+        }
+
         try {
             const response = await fetch(`api.php?action=semestres&campus=${encodeURIComponent(campus)}&selected=${encodeURIComponent(semestreSeleccionado)}`, {
                 method: 'GET',
@@ -60,6 +123,19 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
         
+        const ruta = rutaSemestre(campusSelect.value, semestre);
+        if (ruta) {
+            try {
+                const asignaturas = await cargarEstatico(`${ruta}/asignaturas.json`);
+                llenarOpciones(asignaturaSelect, asignaturas.map(a => [a.id, `${a.codigo} - ${a.nombre}`]), 'Seleccionar asignatura', 'No hay asignaturas disponibles');
+                asignaturaSelect.disabled = false;
+                cargarParalelos();
+                return;
+            } catch (error) {
+                console.warn(error);
+            }
+        }
+
         try {
             const response = await fetch(`api.php?action=asignaturas&semestre=${encodeURIComponent(semestre)}`);
             asignaturaSelect.innerHTML = await response.text();
@@ -81,6 +157,21 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
         
+        const ruta = rutaSemestre(campusSelect.value, semestreSelect.value);
+        if (ruta) {
+            try {
+                // Un archivo por semestre con los paralelos de todas sus asignaturas
+                paralelosCargados[ruta] ??= cargarEstatico(`${ruta}/paralelos.json`);
+                const paralelos = (await paralelosCargados[ruta])[asignaturaId] || [];
+                llenarOpciones(paraleloSelect, paralelos.map(p => [p.id, p.paralelo]), 'Seleccionar paralelo', 'No hay paralelos disponibles');
+                paraleloSelect.disabled = false;
+                return;
+            } catch (error) {
+                delete paralelosCargados[ruta];
+                console.warn(error);
+            }
+        }
+
         try {
             const response = await fetch(`api.php?action=paralelos&asignatura_id=${encodeURIComponent(asignaturaId)}`);
             paraleloSelect.innerHTML = await response.text();